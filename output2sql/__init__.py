@@ -0,0 +1,41 @@
+# output2sql/__init__.py
+#
+"""
+Shared engine code for the output2sql scripts.
+
+The interactive loader (output2sql.interactive, run by python -m output2sql
+and the output2sql-*.py scripts) and batch mode import their upload
+machinery from here. The names below are imported from their modules on
+first access, so importing the package (or a light module in it) does not
+pull in pandas.
+"""
+import importlib
+
+_EXPORTS = {
+    "Backend": "output2sql.backends",
+    "build_insert_sql": "output2sql.upload",
+    "ConnectionPool": "output2sql.pool",
+    "DEFAULT_BATCH_SIZE": "output2sql.upload",
+    "get_backend": "output2sql.backends",
+    "parallel_upload": "output2sql.pool",
+    "PostgresBackend": "output2sql.backends",
+    "SQLiteBackend": "output2sql.backends",
+    "SqlServerBackend": "output2sql.backends",
+    "upload_chunks": "output2sql.upload",
+    "upload_in_batches": "output2sql.upload",
+    "UploadResult": "output2sql.upload",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,8 @@
+# output2sql/__main__.py
+#
+import sys
+
+from output2sql.interactive import run
+
+if __name__ == "__main__":
+    sys.exit(run())
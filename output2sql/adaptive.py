@@ -0,0 +1,155 @@
+# output2sql/adaptive.py
+#
+"""
+Adaptive batch and commit sizing.
+
+A fixed batch size and commit interval are a guess: too small and a bulk
+load spends its time on round trips and log flushes, too large and a busy
+server stalls on lock and log pressure. AdaptiveBatchSizer measures the
+load as it runs and steers both:
+
+  - Batch size (rows per bulk call) is hill-climbed: at the first commit
+    after every WINDOW_BATCHES batches the measured rows/sec, commit time
+    included, is compared with the previous window; the size keeps moving
+    by a factor of STEP while throughput improves and turns around when it
+    drops, within min_batch and max_batch.
+  - The commit interval follows the measured commit latency: a commit is
+    issued once the insert time since the last one is large enough that
+    the commit costs at most commit_overhead of it, but never later than
+    max_commit_rows rows or log_budget_bytes of uncommitted data (an
+    estimate of what the transaction log has to hold).
+
+Every change to either is logged.
+"""
+import logging
+import threading
+
+# --- Configuration ---
+DEFAULT_MIN_BATCH = 100
+DEFAULT_MAX_BATCH = 50_000
+DEFAULT_MAX_COMMIT_ROWS = 500_000
+DEFAULT_LOG_BUDGET_BYTES = 256 * 1024 * 1024
+DEFAULT_COMMIT_OVERHEAD = 0.05 # Target commit time as a fraction of insert time
+WINDOW_BATCHES = 4 # Batches measured before each batch-size decision
+STEP = 1.5 # Factor by which the batch size grows or shrinks
+TOLERANCE = 0.03 # Throughput changes smaller than this count as no change
+ROW_SIZE_SAMPLE = 20 # Rows sampled per batch to estimate its size in bytes
+
+
+def estimate_batch_bytes(rows):
+    """Rough size of a batch of row tuples, from the text length of a few sampled rows."""
+    if not rows:
+        return 0
+    step = max(len(rows) // ROW_SIZE_SAMPLE, 1)
+    sample = rows[::step][:ROW_SIZE_SAMPLE]
+    sampled = sum(len(str(value)) + 8 for row in sample for value in row if value is not None)
+    return sampled * len(rows) // len(sample)
+
+
+class AdaptiveBatchSizer:
+    """Chooses the next batch size and when to commit, from measured latencies."""
+
+    def __init__(self, initial_batch=1000, min_batch=DEFAULT_MIN_BATCH, max_batch=DEFAULT_MAX_BATCH,
+                 max_commit_rows=DEFAULT_MAX_COMMIT_ROWS, log_budget_bytes=DEFAULT_LOG_BUDGET_BYTES,
+                 commit_overhead=DEFAULT_COMMIT_OVERHEAD, label=None):
+        if not min_batch <= initial_batch <= max_batch:
+            raise ValueError(f"Initial batch size {initial_batch} is outside [{min_batch}, {max_batch}].")
+        self.batch_size = initial_batch
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.max_commit_rows = max_commit_rows
+        self.log_budget_bytes = log_budget_bytes
+        self.commit_overhead = commit_overhead
+        self.label = label
+        self.commit_latency = None # Moving average, seconds
+        self.commit_interval = None # Rows per commit, last logged
+        self._direction = 1
+        self._last_throughput = None
+        self._window_rows = 0
+        self._window_seconds = 0.0
+        self._window_batches = 0
+        self._uncommitted_rows = 0
+        self._uncommitted_bytes = 0
+        self._uncommitted_seconds = 0.0
+        self._threads = threading.local()
+
+    def clone(self, label=None):
+        """A fresh controller with the same settings and starting point, e.g. one per upload thread."""
+        return type(self)(self.batch_size, self.min_batch, self.max_batch, self.max_commit_rows,
+                          self.log_budget_bytes, self.commit_overhead, label or self.label)
+
+    def for_current_thread(self):
+        """
+        The calling thread's own clone, created on first use: concurrent
+        uploads each tune their connection separately and keep what they
+        learned from one slice to the next.
+        """
+        sizer = getattr(self._threads, 'sizer', None)
+        if sizer is None:
+            sizer = self._threads.sizer = self.clone(threading.current_thread().name)
+        return sizer
+
+    @property
+    def _prefix(self):
+        return f"[{self.label}] " if self.label else ""
+
+    # --- Measurements ---
+    def observe_batch(self, rows, seconds, nbytes):
+        """Records one successful bulk call of rows rows taking seconds."""
+        self._uncommitted_rows += rows
+        self._uncommitted_bytes += nbytes
+        self._uncommitted_seconds += seconds
+        self._window_rows += rows
+        self._window_seconds += seconds
+        self._window_batches += 1
+
+    def observe_commit(self, seconds, scheduled=True):
+        """
+        Records one commit; its latency sets how much work goes into the next
+        transaction. scheduled=False marks a commit the caller had to make
+        anyway (e.g. at the end of a chunk), which says nothing about the
+        interval.
+        """
+        rows = self._uncommitted_rows
+        self.commit_latency = seconds if self.commit_latency is None else 0.7 * self.commit_latency + 0.3 * seconds
+        self._window_seconds += seconds
+        self._uncommitted_rows = self._uncommitted_bytes = 0
+        self._uncommitted_seconds = 0.0
+        if scheduled and rows and (self.commit_interval is None or not 0.75 <= rows / self.commit_interval <= 1.33):
+            logging.info(f"{self._prefix}Commit interval {self.commit_interval or '-'} -> {rows} rows "
+                         f"(commit latency {self.commit_latency * 1000:.1f} ms).")
+            self.commit_interval = rows
+        if self._window_batches >= WINDOW_BATCHES:
+            self._adjust_batch_size()
+
+    def discard_uncommitted(self):
+        """Forgets work that was rolled back."""
+        self._uncommitted_rows = self._uncommitted_bytes = 0
+        self._uncommitted_seconds = 0.0
+
+    # --- Decisions ---
+    def should_commit(self):
+        if self.commit_latency is None:
+            return True # Measure a commit before trusting any interval
+        if self._uncommitted_rows >= self.max_commit_rows or self._uncommitted_bytes >= self.log_budget_bytes:
+            return True
+        return self._uncommitted_seconds * self.commit_overhead >= self.commit_latency
+
+    def _adjust_batch_size(self):
+        throughput = self._window_rows / self._window_seconds if self._window_seconds else 0.0
+        self._window_rows = self._window_batches = 0
+        self._window_seconds = 0.0
+        if self._last_throughput is not None and throughput < self._last_throughput * (1 - TOLERANCE):
+            self._direction = -self._direction # Last move made things worse; go back the other way
+        previous = self._last_throughput
+        self._last_throughput = throughput
+
+        old = self.batch_size
+        new = int(old * STEP) if self._direction > 0 else int(old / STEP)
+        new = max(self.min_batch, min(self.max_batch, new))
+        if new == old:
+            self._direction = -self._direction # At a bound; explore inwards next time
+            return
+        self.batch_size = new
+        logging.info(f"{self._prefix}Batch size {old} -> {new} ({throughput:,.0f} rows/sec"
+                     f"{f', previous window {previous:,.0f}' if previous is not None else ''}).")
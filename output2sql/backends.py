@@ -0,0 +1,356 @@
+# output2sql/backends.py
+#
+"""
+Bulk-load backends.
+
+Each backend knows how to connect to its target and how to push a batch of
+row tuples through that target's fastest bulk path:
+  - SQL Server: pyodbc executemany with fast_executemany, or BULK INSERT of a
+    staged CSV file when a staging directory shared with the server is set
+  - PostgreSQL: COPY ... FROM STDIN (psycopg2)
+  - SQLite:     executemany inside one transaction per batch
+
+They also know their dialect's literals and transaction statements, for
+scripts exported to be run offline (see output2sql.sqlexport).
+
+Driver modules are imported when a connection is first opened, so only the
+driver for the configured target needs to be installed.
+"""
+import csv
+import io
+import logging
+import os
+import re
+import sys
+import uuid
+
+# --- Configuration ---
+COPY_NULL = r'\N' # PostgreSQL's conventional NULL marker; a literal \N string is written quoted
+POSTGRES_TYPES = ( # SQL Server type names from schema inference -> PostgreSQL
+    (r'\bTINYINT\b', 'SMALLINT'),
+    (r'\bBIT\b', 'BOOLEAN'),
+    (r'\bDATETIME\b', 'TIMESTAMP'),
+    (r'\bFLOAT\b', 'DOUBLE PRECISION'),
+    (r'\b(?:N?VARCHAR)\(MAX\)', 'TEXT'),
+    (r'\bNVARCHAR\b', 'VARCHAR'),
+)
+SQLCMD_TEXT_ESCAPES = ( # Inside N'...' literals in scripts run by sqlcmd
+    ("'", "''"),
+    ('$(', "$' + N'("),
+    ('\r', "' + NCHAR(13) + N'"),
+    ('\n', "' + NCHAR(10) + N'"),
+)
+SQLITE_PRAGMAS = ('PRAGMA journal_mode=WAL', 'PRAGMA synchronous=NORMAL')
+DRIVER_MODULES = ('pyodbc', 'psycopg2', 'sqlite3') # Each has a DB-API Error base class
+
+
+def driver_errors():
+    """
+    The DB-API Error classes of the database drivers imported so far, for an
+    except clause. A driver that was never imported cannot have raised, so
+    none has to be imported just to catch its errors.
+    """
+    return tuple(sys.modules[name].Error for name in DRIVER_MODULES if name in sys.modules)
+
+
+def _plain_name(table_name):
+    """Table name without schema, brackets or quotes, usable inside another identifier."""
+    return re.sub(r'\W', '_', table_name.split('.')[-1].strip('[]"'))
+
+
+def _replace_text(values, replacements):
+    """
+    Applies (old, new) replacements to a Series of str. The values are
+    scanned once, and only replacements whose old text occurs are run.
+    """
+    text = ''.join(values.dropna().to_numpy(dtype=object))
+    for old, new in replacements:
+        if old in text:
+            values = values.str.replace(old, new, regex=False)
+    return values
+
+
+def _update_insert_sql(backend, table_name, staging_table, column_names, key_columns):
+    """Upsert for databases without MERGE: UPDATE ... FROM the staged rows, then INSERT the new ones."""
+    quote = backend.quote
+    match = ' AND '.join(f"{table_name}.{quote(col)} = s.{quote(col)}" for col in key_columns)
+    updates = ', '.join(f"{quote(col)} = s.{quote(col)}" for col in column_names if col not in key_columns)
+    columns = ', '.join(quote(col) for col in column_names)
+    values = ', '.join(f"s.{quote(col)}" for col in column_names)
+    statements = []
+    if updates:
+        statements.append(f"UPDATE {table_name} SET {updates} FROM {staging_table} AS s WHERE {match}")
+    statements.append(f"INSERT INTO {table_name} ({columns}) SELECT {values} FROM {staging_table} AS s "
+                      f"WHERE NOT EXISTS (SELECT 1 FROM {table_name} WHERE {match})")
+    return statements
+
+
+class Backend:
+    """
+    Generic DB-API backend: qmark INSERT statements sent through
+    cursor.executemany (with fast_executemany when the driver has it).
+    Used as is for connections supplied by the caller.
+    """
+    name = 'dbapi'
+
+    def connect(self):
+        raise NotImplementedError(f"{type(self).__name__} has no connection target configured.")
+
+    def quote(self, identifier):
+        return f'[{identifier}]'
+
+    def prepare(self, table_name, column_names):
+        """Returns the statement write_batch will use for this table and column list."""
+        columns = ', '.join(self.quote(col) for col in column_names)
+        placeholders = ', '.join('?' for _ in column_names)
+        return f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+
+    def open_cursor(self, cnxn):
+        cursor = cnxn.cursor()
+        if hasattr(cursor, 'fast_executemany'):
+            cursor.fast_executemany = True
+        return cursor
+
+    def write_batch(self, cursor, statement, rows):
+        cursor.executemany(statement, rows)
+
+    def describe(self, statement):
+        return statement
+
+    def column_type(self, sql_type):
+        """Translates a SQL Server column definition from schema inference into this dialect."""
+        return sql_type
+
+    def create_table_sql(self, table_name, column_definitions):
+        """
+        CREATE TABLE statement that does nothing when the table already exists.
+        column_definitions is a list of (column name, SQL Server type definition).
+        """
+        columns = ",\n    ".join(f"{self.quote(col)} {self.column_type(sql_type)}"
+                                  for col, sql_type in column_definitions)
+        return (f"IF OBJECT_ID(N'{table_name}', N'U') IS NULL\n"
+                f"CREATE TABLE {table_name} (\n    {columns}\n);")
+
+    # --- Staging and Merge (delta loads) ---
+    def staging_table_name(self, table_name):
+        """Session-private table that changed rows are bulk loaded into before being merged."""
+        return '#' + _plain_name(table_name) + '_stage'
+
+    def create_staging_sql(self, staging_table, table_name):
+        return f"SELECT * INTO {staging_table} FROM {table_name} WHERE 1 = 0"
+
+    def drop_staging_sql(self, staging_table):
+        return f"DROP TABLE {staging_table}"
+
+    def merge_sql(self, table_name, staging_table, column_names, key_columns):
+        """
+        Statements that apply the staged rows to table_name: rows whose
+        key_columns match are updated, the others inserted.
+        """
+        on = ' AND '.join(f"t.{self.quote(col)} = s.{self.quote(col)}" for col in key_columns)
+        updates = ', '.join(f"t.{self.quote(col)} = s.{self.quote(col)}"
+                            for col in column_names if col not in key_columns)
+        columns = ', '.join(self.quote(col) for col in column_names)
+        values = ', '.join(f"s.{self.quote(col)}" for col in column_names)
+        return [f"MERGE INTO {table_name} WITH (HOLDLOCK) AS t USING {staging_table} AS s ON {on}"
+                + (f" WHEN MATCHED THEN UPDATE SET {updates}" if updates else "")
+                + f" WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({values});"]
+
+    # --- Script Export ---
+    # Scripts in the SQL Server dialect are run with sqlcmd: UTF-8 with a byte order mark (which sqlcmd
+    # needs to read the file as UTF-8), GO ending each batch
+    script_bom = True
+    script_preamble = ('SET NOCOUNT ON;', 'SET XACT_ABORT ON;') # An error rolls back the whole transaction
+    batch_separator = 'GO'
+    begin_sql = 'BEGIN TRANSACTION;'
+    commit_sql = 'COMMIT TRANSACTION;'
+    boolean_literals = ('1', '0')
+
+    def text_literals(self, values):
+        """
+        Unicode string literals for a Series of str. sqlcmd would read a GO
+        line or a $(variable) inside a literal as its own, so line breaks and
+        '$(' are spliced in from outside the quotes.
+        """
+        return "N'" + _replace_text(values, SQLCMD_TEXT_ESCAPES) + "'"
+
+
+class SqlServerBackend(Backend):
+    """
+    SQL Server through pyodbc. Batches are bound as parameter arrays with
+    fast_executemany. When staging_dir is set, batches are instead written to
+    a CSV file there and loaded with BULK INSERT; server_staging_dir is the
+    same directory as seen by the server (e.g. a UNC path) and defaults to
+    staging_dir. BULK INSERT loads columns in table order, so the table must
+    have been created from the same schema, and empty strings load as NULL.
+    """
+    name = 'sqlserver'
+
+    def __init__(self, connection_string=None, staging_dir=None, server_staging_dir=None):
+        self.connection_string = connection_string
+        self.staging_dir = staging_dir
+        self.server_staging_dir = server_staging_dir or staging_dir
+
+    def connect(self):
+        import pyodbc
+        return pyodbc.connect(self.connection_string)
+
+    def prepare(self, table_name, column_names):
+        if self.staging_dir:
+            return table_name
+        return super().prepare(table_name, column_names)
+
+    def write_batch(self, cursor, statement, rows):
+        if not self.staging_dir:
+            cursor.executemany(statement, rows)
+            return
+
+        file_name = f"output2sql_{uuid.uuid4().hex}.csv"
+        local_path = os.path.join(self.staging_dir, file_name)
+        server_path = os.path.join(self.server_staging_dir, file_name).replace("'", "''")
+        with open(local_path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f, lineterminator='\n').writerows(rows)
+        try:
+            cursor.execute(
+                f"BULK INSERT {statement} FROM '{server_path}' WITH ("
+                "FORMAT = 'CSV', FIELDQUOTE = '\"', FIELDTERMINATOR = ',', "
+                "ROWTERMINATOR = '0x0a', CODEPAGE = '65001', KEEPNULLS, TABLOCK)"
+            )
+        finally:
+            os.remove(local_path)
+
+    def describe(self, statement):
+        if self.staging_dir:
+            return f"BULK INSERT {statement} via staging directory {self.staging_dir}"
+        return f"{statement} (fast_executemany)"
+
+
+class PostgresBackend(Backend):
+    """PostgreSQL through psycopg2; each batch is streamed with COPY ... FROM STDIN."""
+    name = 'postgresql'
+
+    def __init__(self, dsn=None):
+        self.dsn = dsn
+
+    def connect(self):
+        import psycopg2
+        return psycopg2.connect(self.dsn)
+
+    def quote(self, identifier):
+        return '"' + identifier.replace('"', '""') + '"'
+
+    def prepare(self, table_name, column_names):
+        columns = ', '.join(self.quote(col) for col in column_names)
+        return f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+
+    def write_batch(self, cursor, statement, rows):
+        # None is written as the COPY NULL marker so empty strings stay empty strings
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        for row in rows:
+            if COPY_NULL in row:
+                # Only an unquoted \N is NULL in CSV COPY, so the literal string is written quoted
+                buffer.write(','.join(COPY_NULL if value is None else '"' + str(value).replace('"', '""') + '"'
+                                      for value in row) + '\n')
+            else:
+                writer.writerow([COPY_NULL if value is None else value for value in row])
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+
+    def column_type(self, sql_type):
+        for pattern, replacement in POSTGRES_TYPES:
+            sql_type = re.sub(pattern, replacement, sql_type)
+        return sql_type
+
+    def create_table_sql(self, table_name, column_definitions):
+        columns = ",\n    ".join(f"{self.quote(col)} {self.column_type(sql_type)}"
+                                  for col, sql_type in column_definitions)
+        return f"CREATE TABLE IF NOT EXISTS {table_name} (\n    {columns}\n);"
+
+    def staging_table_name(self, table_name):
+        return _plain_name(table_name) + '_stage'
+
+    def create_staging_sql(self, staging_table, table_name):
+        return f"CREATE TEMP TABLE {staging_table} (LIKE {table_name} INCLUDING DEFAULTS)"
+
+    def merge_sql(self, table_name, staging_table, column_names, key_columns):
+        return _update_insert_sql(self, table_name, staging_table, column_names, key_columns)
+
+    # --- Script Export ---
+    script_bom = False
+    script_preamble = ()
+    batch_separator = None
+    begin_sql = 'BEGIN;'
+    commit_sql = 'COMMIT;'
+    boolean_literals = ('TRUE', 'FALSE')
+
+    def text_literals(self, values):
+        return "'" + _replace_text(values, (("'", "''"),)) + "'"
+
+
+class SQLiteBackend(Backend):
+    """
+    SQLite file database: executemany inside one transaction per batch, with
+    WAL journaling so concurrent readers do not block the load. Useful for
+    testing and benchmarking the whole pipeline offline.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path=':memory:', timeout=30):
+        self.path = path
+        self.timeout = timeout
+
+    def connect(self):
+        import sqlite3
+        cnxn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            cnxn.execute(pragma)
+        return cnxn
+
+    def quote(self, identifier):
+        return '"' + identifier.replace('"', '""') + '"'
+
+    def create_table_sql(self, table_name, column_definitions):
+        # SQLite accepts the SQL Server type names as declared types
+        columns = ",\n    ".join(f"{self.quote(col)} {sql_type}" for col, sql_type in column_definitions)
+        return f"CREATE TABLE IF NOT EXISTS {table_name} (\n    {columns}\n);"
+
+    def staging_table_name(self, table_name):
+        return _plain_name(table_name) + '_stage'
+
+    def create_staging_sql(self, staging_table, table_name):
+        return f"CREATE TEMP TABLE {staging_table} AS SELECT * FROM {table_name} WHERE 0"
+
+    def merge_sql(self, table_name, staging_table, column_names, key_columns):
+        return _update_insert_sql(self, table_name, staging_table, column_names, key_columns)
+
+    # --- Script Export ---
+    script_bom = False
+    script_preamble = ()
+    batch_separator = None
+    begin_sql = 'BEGIN;'
+    commit_sql = 'COMMIT;'
+    boolean_literals = ('1', '0')
+
+    def text_literals(self, values):
+        return "'" + _replace_text(values, (("'", "''"),)) + "'"
+
+
+def get_backend(target, staging_dir=None, server_staging_dir=None):
+    """
+    Picks the fastest loader for a connection target:
+      postgresql://... or postgres://...   -> PostgresBackend (COPY)
+      sqlite:///path, *.db, *.sqlite        -> SQLiteBackend
+      anything else (ODBC connection string) -> SqlServerBackend
+    """
+    lowered = target.lower()
+    if lowered.startswith(('postgresql://', 'postgres://')):
+        backend = PostgresBackend(target)
+    elif lowered.startswith('sqlite:///'):
+        backend = SQLiteBackend(target[len('sqlite:///'):])
+    elif lowered.endswith(('.db', '.sqlite', '.sqlite3')) or target == ':memory:':
+        backend = SQLiteBackend(target)
+    else:
+        backend = SqlServerBackend(target, staging_dir=staging_dir, server_staging_dir=server_staging_dir)
+    logging.info(f"Selected {backend.name} bulk-load backend.")
+    return backend
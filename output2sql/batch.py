@@ -0,0 +1,640 @@
+# output2sql/batch.py
+#
+"""
+Headless batch mode: loads a whole set of files without any prompts.
+
+    python -m output2sql "contacts*.csv" "car_data*.json" --create-table --yes
+    python -m output2sql "extracts/*.csv" --table "contacts*=contacts" --target loads.db
+
+Files are profiled, parsed and coerced in a process pool (--parse-workers)
+while a bounded number of database writer threads (--db-writers) upload the
+results, each over its own connection. Files larger than --stream-threshold
+(or every file, with --pipeline) are streamed chunk by chunk by their writer
+instead of being parsed whole, with reading and coercion running ahead of
+the upload in background threads (see output2sql.pipeline); with
+--range-workers a streamed CSV file is instead cut into byte ranges that
+are profiled and parsed in that many processes (see output2sql.parallelcsv).
+Compressed files (.csv.gz, .json.zst, .bz2, .xz) are matched and read like
+the others, decompressed as a stream (see output2sql.compressed).
+
+With --watch the arguments are directories instead, watched until stopped:
+files arriving anywhere below them are loaded once they are completely
+written, and never twice (see output2sql.watch).
+A summary table with per-file row counts, timings and failures is printed
+at the end; the exit status is non-zero if any file failed.
+
+Progress is checkpointed per file at every commit. After an interruption,
+re-running the same command with --resume continues each file after its last
+committed record and skips files that were already loaded completely.
+Records the database rejects are written, with the error, to a per-file
+reject file under --reject-dir. Schemas and parsed data are kept in the parse
+cache (output2sql.cache), so unchanged files are not parsed again. Stage
+timings, commit latencies and peak memory are written to a JSON metrics file
+under .output2sql/metrics (--metrics-file); --profile adds a cProfile dump. With
+--adaptive each writer tunes its batch size and commit interval to the
+throughput it measures (see output2sql.adaptive). With --delta only rows
+that are new or changed since the last load are sent (see output2sql.delta).
+With --export-sql DIR nothing is loaded: each file is written to a SQL
+script under DIR as multi-row INSERT statements, to be run offline with
+sqlcmd in the target's dialect (see output2sql.sqlexport).
+"""
+import argparse
+import fnmatch
+import glob
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from output2sql.adaptive import (DEFAULT_LOG_BUDGET_BYTES, DEFAULT_MAX_BATCH, DEFAULT_MAX_COMMIT_ROWS,
+                                 DEFAULT_MIN_BATCH, AdaptiveBatchSizer)
+from output2sql.backends import get_backend
+from output2sql.cache import CACHE_DIR, ParseCache
+from output2sql.checkpoint import CHECKPOINT_DIR, Checkpoint
+from output2sql.compressed import data_extension, estimated_data_size
+from output2sql.compact import compact_dataframe
+from output2sql.delta import DELTA_DIR, delta_upload
+from output2sql.config import UPLOAD_TARGET
+from output2sql.metrics import (METRICS_DIR, get_metrics, is_metrics_file, metrics_path_for, profile_run, stage,
+                                start_run, write_metrics)
+from output2sql.parallelcsv import iter_parallel_csv_chunks
+from output2sql.pipeline import DEFAULT_QUEUE_SIZE, iter_pipelined_chunks
+from output2sql.pool import ConnectionPool
+from output2sql.readers import DEFAULT_CHUNK_SIZE, iter_file_chunks, read_file
+from output2sql.rejects import REJECT_DIR, RejectFile, is_reject_file, reject_path_for
+from output2sql.schema import profile_file, sanitize_column_name, table_name_for_file
+from output2sql.sqlexport import DEFAULT_TRANSACTION_STATEMENTS, export_chunks, export_dataframe, script_path_for
+from output2sql.upload import DEFAULT_BATCH_SIZE, upload_chunks, upload_in_batches
+from output2sql.watch import DEFAULT_SCAN_INTERVAL, DEFAULT_SETTLE_SECONDS, WatchDaemon
+
+# --- Configuration ---
+SUPPORTED_EXTENSIONS = ('.csv', '.json')
+DEFAULT_PARSE_WORKERS = os.cpu_count() or 1
+DEFAULT_DB_WRITERS = 2
+DEFAULT_RANGE_WORKERS = 1
+DEFAULT_STREAM_THRESHOLD = 100 * 1024 * 1024
+
+
+@dataclass
+class FileReport:
+    """Outcome of loading one file, as shown in the summary table."""
+    file_path: str
+    table_name: str
+    rows_read: int = 0
+    rows_uploaded: int = 0
+    rows_failed: int = 0
+    rows_unchanged: int = 0 # Skipped by --delta
+    reject_file: str = ''
+    export_files: str = '' # Scripts written by --export-sql
+    memory_before: int = 0 # Bytes held by the parsed DataFrame, before and after --compact
+    memory_after: int = 0
+    parse_seconds: float = 0.0
+    upload_seconds: float = 0.0
+    status: str = 'pending'
+    error: str = ''
+
+    @property
+    def ok(self):
+        return self.status in ('ok', 'skipped')
+
+
+# --- File Selection ---
+def expand_patterns(patterns):
+    """Expands file globs into a sorted list of distinct supported data files, compressed or not."""
+    files = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) or ([pattern] if os.path.isfile(pattern) else [])
+        if not matches:
+            logging.warning(f"No files match '{pattern}'.")
+        files.update(f for f in matches if os.path.isfile(f) and data_extension(f) in SUPPORTED_EXTENSIONS
+                     and not is_metrics_file(f) and not is_reject_file(f))
+    return sorted(files)
+
+
+def parse_table_map(entries):
+    """Parses PATTERN=TABLE arguments into (pattern, table) pairs, tried in order."""
+    table_map = []
+    for entry in entries or []:
+        pattern, sep, table = entry.partition('=')
+        if not sep or not pattern or not table:
+            raise ValueError(f"Invalid table mapping '{entry}'; expected PATTERN=TABLE.")
+        table_map.append((pattern, table))
+    return table_map
+
+
+def parse_key_map(entries):
+    """
+    Parses [TABLE=]COLUMN[,COLUMN...] arguments into {table: [columns]};
+    entries without a table apply to every table ('*').
+    """
+    key_map = {}
+    for entry in entries or []:
+        table, sep, columns = entry.rpartition('=')
+        keys = [col.strip() for col in columns.split(',') if col.strip()]
+        if (sep and not table) or not keys:
+            raise ValueError(f"Invalid key columns '{entry}'; expected [TABLE=]COLUMN[,COLUMN...].")
+        key_map[table or '*'] = keys
+    return key_map
+
+
+def resolve_table_name(file_path, table_map):
+    """First mapping whose pattern matches the file name (or path) wins; else the file name is used."""
+    for pattern, table in table_map:
+        if fnmatch.fnmatch(os.path.basename(file_path), pattern) or fnmatch.fnmatch(file_path, pattern):
+            return table
+    return table_name_for_file(file_path)
+
+
+# --- Workers ---
+def _parse_file(file_path, sample_rows, chunk_size, stream, use_cache=True, compact=False, range_workers=1):
+    """
+    Process-pool task: profiles the file (a streamed CSV file in
+    range_workers processes of its own) and, unless it is to be streamed,
+    reads and coerces it, going through the parse cache when use_cache is
+    set, and with compact converts it to compact column types. Returns
+    (schema, DataFrame or None, seconds, stage metrics, CompactionReport or
+    None), the metrics being merged into the parent's run.
+    """
+    started = time.perf_counter()
+    metrics = start_run('parse')
+    cache = ParseCache() if use_cache else None
+    schema = cache.load_schema(file_path, sample_rows) if cache else None
+    if schema is None:
+        schema = profile_file(file_path, sample_rows=sample_rows, chunk_size=chunk_size,
+                              processes=range_workers if stream else 1)
+        if schema and cache:
+            cache.store_schema(file_path, schema, sample_rows)
+    if not schema:
+        raise ValueError("No columns found in file.")
+    if stream:
+        return schema, None, time.perf_counter() - started, metrics.to_dict()['stages'], None
+
+    compaction = None
+    df = cache.load_data(file_path, sample_rows) if cache else None
+    if df is None:
+        df = read_file(file_path, schema, chunk_size=chunk_size)
+        if compact:
+            compaction = compact_dataframe(df)
+        if cache:
+            cache.store_data(file_path, df, sample_rows)
+    elif compact:
+        compaction = compact_dataframe(df)
+    return schema, df, time.perf_counter() - started, metrics.to_dict()['stages'], compaction
+
+
+class BatchLoader:
+    """Runs the parse process pool and the database writer threads for one batch."""
+
+    def __init__(self, backend, table_map=None, create_table=False, parse_workers=DEFAULT_PARSE_WORKERS,
+                 db_writers=DEFAULT_DB_WRITERS, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE,
+                 sample_rows=None, stream_threshold=DEFAULT_STREAM_THRESHOLD, resume=False,
+                 reject_dir=REJECT_DIR, reject_format='csv', use_cache=True, queue_size=DEFAULT_QUEUE_SIZE,
+                 pipeline_all=False, sizer=None, compact=False, delta=False, key_map=None, delta_reset=False,
+                 target=None, range_workers=DEFAULT_RANGE_WORKERS, export_dir=None,
+                 transaction_statements=DEFAULT_TRANSACTION_STATEMENTS, split_bytes=None):
+        self.backend = backend
+        self.table_map = table_map or []
+        self.create_table = create_table
+        self.parse_workers = parse_workers
+        self.db_writers = db_writers
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.sample_rows = sample_rows
+        self.stream_threshold = stream_threshold
+        self.resume = resume
+        self.reject_dir = reject_dir
+        self.reject_format = reject_format
+        self.use_cache = use_cache
+        self.queue_size = queue_size
+        self.pipeline_all = pipeline_all
+        self.sizer = sizer
+        self.compact = compact
+        self.delta = delta
+        self.key_map = key_map or {}
+        self.delta_reset = delta_reset
+        self.target = target
+        self.range_workers = range_workers
+        self.export_dir = export_dir
+        self.transaction_statements = transaction_statements
+        self.split_bytes = split_bytes
+        self._ddl_lock = threading.Lock()
+        self._created_tables = set()
+
+    def _ensure_table(self, cnxn, table_name, schema):
+        """Creates the table from the inferred schema if it does not exist yet (once per table)."""
+        with self._ddl_lock:
+            if table_name in self._created_tables:
+                return
+            column_definitions = [(sanitize_column_name(col), profile.sql_definition())
+                                  for col, profile in schema.items()]
+            ddl = self.backend.create_table_sql(table_name, column_definitions)
+            cursor = cnxn.cursor()
+            try:
+                cursor.execute(ddl)
+            finally:
+                cursor.close()
+            cnxn.commit()
+            self._created_tables.add(table_name)
+            logging.info(f"Ensured table '{table_name}' exists.")
+
+    def _checkpoint(self, report):
+        """
+        The file's checkpoint: kept when resuming, otherwise reset so the
+        load starts from the first record. An export loads nothing, so it
+        gets a fresh checkpoint that is never saved.
+        """
+        if self.export_dir:
+            return Checkpoint(report.file_path, report.table_name)
+        checkpoint = Checkpoint.load(report.file_path, report.table_name)
+        if not self.resume:
+            checkpoint.reset()
+            reject_path = reject_path_for(report.file_path, report.table_name, self.reject_dir, self.reject_format)
+            if os.path.exists(reject_path):
+                os.remove(reject_path)
+        return checkpoint
+
+    def _should_stream(self, report, checkpoint):
+        # Resumed files are streamed so reading can start at the checkpointed offset
+        return (self.pipeline_all or checkpoint.resumable
+                or estimated_data_size(report.file_path) > self.stream_threshold)
+
+    def _submit_parse(self, parsers, report, checkpoint):
+        return parsers.submit(_parse_file, report.file_path, self.sample_rows, self.chunk_size,
+                              self._should_stream(report, checkpoint), self.use_cache, self.compact,
+                              self.range_workers)
+
+    def _iter_chunks(self, report, schema, resume_arguments):
+        """The file's chunks, read and coerced the way the loader is configured to."""
+        if self.range_workers > 1 and data_extension(report.file_path) == '.csv':
+            return iter_parallel_csv_chunks(report.file_path, schema, chunk_size=self.chunk_size,
+                                            processes=self.range_workers, **resume_arguments)
+        if self.queue_size > 0:
+            return iter_pipelined_chunks(report.file_path, schema, chunk_size=self.chunk_size,
+                                         queue_size=self.queue_size, **resume_arguments)
+        return iter_file_chunks(report.file_path, schema, chunk_size=self.chunk_size, **resume_arguments)
+
+    def _export_file(self, report, schema, df, column_names, label):
+        """Writes the file to its SQL script under export_dir instead of loading it."""
+        path = script_path_for(report.table_name, self.export_dir, report.file_path)
+        header = None
+        if self.create_table:
+            header = self.backend.create_table_sql(report.table_name, [
+                (sanitize_column_name(col), profile.sql_definition()) for col, profile in schema.items()])
+        options = dict(backend=self.backend, header=header, transaction_statements=self.transaction_statements,
+                       split_bytes=self.split_bytes, label=label)
+        with stage('export', nbytes=os.path.getsize(report.file_path)) as call:
+            if df is None:
+                result = export_chunks(self._iter_chunks(report, schema, {}), path, report.table_name,
+                                       column_names, **options)
+            else:
+                result = export_dataframe(df, path, report.table_name, column_names, chunk_size=self.chunk_size,
+                                          **options)
+            call.rows = result.rows
+        report.rows_read = report.rows_uploaded = result.rows
+        report.upload_seconds = result.seconds
+        report.export_files = ', '.join(result.paths)
+        report.status = 'ok'
+
+    def _write_file(self, report, parse_future, pool, checkpoint, slots=None):
+        """Writer-thread task: uploads one parsed (or to-be-streamed) file, then frees its slot."""
+        try:
+            schema, df, report.parse_seconds, parse_stages, compaction = parse_future.result()
+            get_metrics().merge_stages(parse_stages)
+            column_names = [sanitize_column_name(col) for col in schema]
+            label = os.path.basename(report.file_path)
+            if compaction:
+                report.memory_before, report.memory_after = compaction.bytes_before, compaction.bytes_after
+                logging.info(f"[{label}] In-memory size {compaction.summary()}:\n{compaction.format_table()}")
+            if self.export_dir:
+                self._export_file(report, schema, df, column_names, label)
+                return
+            rejects = RejectFile(reject_path_for(report.file_path, report.table_name,
+                                                 self.reject_dir, self.reject_format))
+            file_bytes = os.path.getsize(report.file_path)
+            sizer = self.sizer.for_current_thread() if self.sizer else None
+            started = time.perf_counter()
+            with pool.connection() as cnxn, rejects, stage('upload', nbytes=file_bytes) as call:
+                if self.create_table:
+                    self._ensure_table(cnxn, report.table_name, schema)
+                if df is None:
+                    # A delta load re-reads the whole file; the row-hash index skips what is already loaded
+                    resume_arguments = checkpoint.resume_arguments() if not self.delta else {}
+                    if checkpoint.resumable and not self.delta:
+                        logging.info(f"Resuming {report.file_path} after record {checkpoint.rows_committed}.")
+                    chunks = self._iter_chunks(report, schema, resume_arguments)
+                if self.delta:
+                    key_columns = self.key_map.get(report.table_name, self.key_map.get('*', []))
+                    result = delta_upload(cnxn, chunks if df is None else [df], report.table_name, column_names,
+                                          key_columns=key_columns, batch_size=self.batch_size,
+                                          backend=self.backend, label=label, rejects=rejects, sizer=sizer,
+                                          target=self.target, reset=self.delta_reset)
+                elif df is None:
+                    result = upload_chunks(cnxn, chunks, report.table_name, column_names,
+                                           batch_size=self.batch_size, backend=self.backend, label=label,
+                                           on_commit=checkpoint.record, rejects=rejects, sizer=sizer)
+                else:
+                    result = upload_in_batches(cnxn, df, report.table_name, batch_size=self.batch_size,
+                                               column_names=column_names, backend=self.backend, label=label,
+                                               on_commit=checkpoint.record, rejects=rejects, sizer=sizer)
+                report.rows_read = len(df) if df is not None else result.rows + result.failed + result.skipped
+                call.rows = result.rows
+            checkpoint.mark_complete()
+            report.upload_seconds = time.perf_counter() - started
+            report.rows_uploaded = result.rows
+            report.rows_failed = result.failed
+            report.rows_unchanged = result.skipped
+            report.reject_file = rejects.path if rejects.count else ''
+            report.status = 'ok' if not result.failed else 'partial'
+        except Exception as e:
+            report.status = 'failed'
+            report.error = str(e)
+            logging.error(f"Loading {report.file_path} into '{report.table_name}' failed: {e}", exc_info=True)
+        finally:
+            if slots:
+                slots.release()
+
+    def table_for(self, file_path):
+        return resolve_table_name(file_path, self.table_map)
+
+    def _skip_loaded(self, report):
+        report.status = 'skipped'
+        report.error = 'already loaded'
+        logging.info(f"Skipping {report.file_path}: already loaded into '{report.table_name}'.")
+
+    def load_file(self, file_path, pool, parsers):
+        """
+        Loads one file in the calling thread and returns its FileReport. It
+        is parsed in parsers (a process pool) and written over a connection
+        from pool; both belong to the caller and outlive the file, so a
+        long-running caller (see output2sql.watch) keeps its connections warm.
+        """
+        report = FileReport(file_path, self.table_for(file_path))
+        checkpoint = self._checkpoint(report)
+        if checkpoint.complete:
+            self._skip_loaded(report)
+            return report
+        self._write_file(report, self._submit_parse(parsers, report, checkpoint), pool, checkpoint)
+        return report
+
+    def run(self, files):
+        """Loads every file and returns a FileReport per file, in input order."""
+        reports = [FileReport(f, resolve_table_name(f, self.table_map)) for f in files]
+        pool = ConnectionPool(self.backend.connect, self.db_writers)
+        # Bounds the number of parsed DataFrames held in memory while waiting for a writer
+        slots = threading.BoundedSemaphore(self.parse_workers + self.db_writers)
+        writer_futures = []
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.db_writers, thread_name_prefix='writer') as writers:
+                # Spawned: the parse processes start their own range-parsing pools (--range-workers)
+                with ProcessPoolExecutor(max_workers=self.parse_workers,
+                                         mp_context=multiprocessing.get_context('spawn')) as parsers:
+                    for report in reports:
+                        checkpoint = self._checkpoint(report)
+                        if checkpoint.complete:
+                            self._skip_loaded(report)
+                            continue
+                        slots.acquire()
+                        parse_future = self._submit_parse(parsers, report, checkpoint)
+                        parse_future.add_done_callback(
+                            lambda future, report=report, checkpoint=checkpoint: writer_futures.append(
+                                writers.submit(self._write_file, report, future, pool, checkpoint, slots)))
+            for future in writer_futures:
+                future.result()
+        finally:
+            pool.close_all()
+        return reports
+
+
+# --- Reporting ---
+def format_summary(reports, elapsed):
+    """Renders the per-file results as a plain-text table."""
+    headers = ('File', 'Table', 'Read', 'Uploaded', 'Unchanged', 'Failed', 'Parse s', 'Upload s', 'Status')
+    rows = [
+        (r.file_path, r.table_name, f"{r.rows_read:,}", f"{r.rows_uploaded:,}", f"{r.rows_unchanged:,}",
+         f"{r.rows_failed:,}", f"{r.parse_seconds:.2f}", f"{r.upload_seconds:.2f}",
+         r.status if not r.error else f"{r.status}: {r.error}")
+        for r in reports
+    ]
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    lines = ['  '.join(str(cell).ljust(width) for cell, width in zip(row, widths)) for row in [headers, *rows]]
+    lines.insert(1, '  '.join('-' * width for width in widths))
+    total_rows = sum(r.rows_uploaded for r in reports)
+    failed_files = sum(1 for r in reports if not r.ok)
+    lines.append('')
+    lines.append(f"{len(reports)} files, {total_rows:,} records uploaded in {elapsed:.2f}s "
+                 f"({total_rows / elapsed if elapsed else 0:,.0f} rows/sec), {failed_files} with failures.")
+    return '\n'.join(lines)
+
+
+# --- Command Line ---
+def setup_logging(log_file):
+    """Sets up logging to a file and console, as the interactive script does."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler()
+        ]
+    )
+    logging.info(f"Logging started. Log file: {log_file}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='output2sql',
+        description="Load CSV and JSON files into SQL tables without prompts.")
+    parser.add_argument('patterns', nargs='+',
+                        help="File names or globs, e.g. 'contacts*.csv'; with --watch, directories.")
+    parser.add_argument('--table', action='append', metavar='PATTERN=TABLE', dest='tables',
+                        help="Load files matching PATTERN into TABLE (repeatable). "
+                             "Default: table named after the file.")
+    parser.add_argument('--target', default=UPLOAD_TARGET,
+                        help="ODBC connection string, postgresql:// URL or SQLite database path "
+                             "(default: OUTPUT2SQL_TARGET or the configured SQL Server).")
+    parser.add_argument('--create-table', action='store_true',
+                        help="Create each table from the inferred schema if it does not exist.")
+    parser.add_argument('-y', '--yes', action='store_true', help="Answer yes to every question.")
+    parser.add_argument('--parse-workers', type=int, default=DEFAULT_PARSE_WORKERS,
+                        help="Processes used for parsing and type coercion (default: %(default)s).")
+    parser.add_argument('--db-writers', type=int, default=DEFAULT_DB_WRITERS,
+                        help="Concurrent database connections (default: %(default)s).")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Rows per bulk call; with --adaptive the starting point (default: %(default)s).")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="Tune batch size and commit interval from measured insert and commit latency.")
+    parser.add_argument('--min-batch', type=int, default=DEFAULT_MIN_BATCH,
+                        help="Smallest batch --adaptive may choose (default: %(default)s).")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                        help="Largest batch --adaptive may choose (default: %(default)s).")
+    parser.add_argument('--max-commit-rows', type=int, default=DEFAULT_MAX_COMMIT_ROWS,
+                        help="Most rows --adaptive leaves uncommitted (default: %(default)s).")
+    parser.add_argument('--log-budget-mb', type=float, default=DEFAULT_LOG_BUDGET_BYTES / 2**20,
+                        help="Most data, in MB, --adaptive leaves uncommitted in the transaction log "
+                             "(default: %(default)s).")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Records per chunk when reading (default: %(default)s).")
+    parser.add_argument('--sample-rows', type=int, default=None,
+                        help="Profile only the first N records of each file (default: whole file).")
+    parser.add_argument('--stream-threshold', type=int, default=DEFAULT_STREAM_THRESHOLD,
+                        help="Files holding more than this many bytes of data (estimated for compressed files) "
+                             "are streamed (default: %(default)s).")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Stream every file through the read/coerce/upload pipeline instead of parsing it whole.")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Chunks buffered between pipeline stages; 0 runs the stages in turn "
+                             "(default: %(default)s).")
+    parser.add_argument('--range-workers', type=int, default=DEFAULT_RANGE_WORKERS,
+                        help="Processes that profile and parse byte ranges of each streamed CSV file in "
+                             "parallel; 1 reads it in one pass (default: %(default)s).")
+    parser.add_argument('--compact', action='store_true',
+                        help="Hold parsed files as categoricals, downcast numbers and Arrow strings, "
+                             "and log memory use before and after.")
+    parser.add_argument('--delta', action='store_true',
+                        help="Send only rows that are new or changed since the last load, using a row-hash "
+                             "index per table.")
+    parser.add_argument('--key', action='append', metavar='[TABLE=]COLUMNS', dest='keys',
+                        help="Key columns (comma-separated) that identify a row for --delta, for TABLE or for "
+                             "every table (repeatable). Changed rows are then merged instead of added; a row "
+                             "repeating a key earlier in the same load is rejected.")
+    parser.add_argument('--delta-reset', action='store_true',
+                        help="Rebuild the row-hash indexes from this load, e.g. after the tables were changed "
+                             "by other means.")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep watching the directories given and load every file that arrives in them.")
+    parser.add_argument('--interval', type=float, default=DEFAULT_SCAN_INTERVAL,
+                        help="Seconds between directory scans with --watch (default: %(default)s).")
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="Seconds a file must go unchanged before --watch loads it (default: %(default)s).")
+    parser.add_argument('--once', action='store_true',
+                        help="With --watch, load what is there (once settled) and exit instead of watching on.")
+    parser.add_argument('--export-sql', metavar='DIR', dest='export_dir',
+                        help="Write each file to a SQL script in DIR (multi-row INSERT statements in the "
+                             "--target dialect, after CREATE TABLE with --create-table) instead of loading it.")
+    parser.add_argument('--transaction-statements', type=int, default=DEFAULT_TRANSACTION_STATEMENTS,
+                        help="INSERT statements per transaction in --export-sql scripts; 0 writes no "
+                             "transactions (default: %(default)s).")
+    parser.add_argument('--split-mb', type=float, default=None,
+                        help="Split --export-sql scripts into numbered parts of about this many MB.")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue interrupted loads from their checkpoints and skip files already loaded.")
+    parser.add_argument('--reject-dir', default=REJECT_DIR,
+                        help="Directory for files of rejected records (default: %(default)s).")
+    parser.add_argument('--reject-format', choices=('csv', 'ndjson'), default='csv',
+                        help="Format of the reject files (default: %(default)s).")
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        help="Always parse files instead of using the schema and parse cache.")
+    parser.add_argument('--staging-dir', help="SQL Server BULK INSERT staging directory.")
+    parser.add_argument('--log-file', default=f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+    parser.add_argument('--metrics-file',
+                        help="JSON file for the run's stage timings and commit latencies "
+                             "(default: the log file name with .metrics.json, under "
+                             f"{METRICS_DIR}).")
+    parser.add_argument('--profile', metavar='FILE', help="Dump cProfile stats for the run to FILE.")
+    return parser
+
+
+def run_watch(loader, args, metrics):
+    """Runs watch mode until stopped (SIGTERM or Ctrl-C) or, with --once, until the directories are drained."""
+    metrics_file = args.metrics_file or metrics_path_for(args.log_file)
+    daemon = WatchDaemon(loader, args.patterns, interval=args.interval, settle_seconds=args.settle,
+                         exclude=(CACHE_DIR, CHECKPOINT_DIR, DELTA_DIR, METRICS_DIR))
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    with profile_run(args.profile):
+        daemon.run(once=args.once)
+    metrics.set_value('watch', daemon.status())
+    write_metrics(metrics_file)
+    print('\n' + daemon.format_status())
+    return 0 if not daemon.totals['failed'] else 1
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logging(args.log_file)
+    logging.info("Starting output2sql batch mode.")
+
+    if args.watch and args.export_dir:
+        print("--watch loads files as they arrive and cannot be combined with --export-sql.")
+        return 2
+    if args.watch:
+        files = []
+        missing = [d for d in args.patterns if not os.path.isdir(d)]
+        if missing:
+            print(f"--watch needs directories; not a directory: {', '.join(missing)}")
+            return 2
+    else:
+        files = expand_patterns(args.patterns)
+        if not files:
+            print("No matching .csv or .json files found.")
+            logging.info("No data files found. Exiting.")
+            return 1
+
+    try:
+        table_map = parse_table_map(args.tables)
+        key_map = parse_key_map(args.keys)
+    except ValueError as e:
+        print(e)
+        return 2
+
+    if args.watch:
+        print(f"Files arriving in {', '.join(args.patterns)} will be loaded until stopped (Ctrl-C).")
+    elif args.export_dir:
+        print(f"{len(files)} files to export to SQL scripts in {args.export_dir}:")
+        for f in files:
+            print(f"  {f} -> {script_path_for(resolve_table_name(f, table_map), args.export_dir, f)}")
+    else:
+        print(f"{len(files)} files to load:")
+        for f in files:
+            print(f"  {f} -> {resolve_table_name(f, table_map)}")
+    if not args.yes:
+        response = input("Proceed with the upload? (y/n): ").lower()
+        if response != 'y':
+            print("Exiting without data upload.")
+            logging.info("User chose not to upload data. Exiting.")
+            return 1
+
+    sizer = None
+    if args.adaptive:
+        try:
+            sizer = AdaptiveBatchSizer(args.batch_size, args.min_batch, args.max_batch, args.max_commit_rows,
+                                       int(args.log_budget_mb * 2**20))
+        except ValueError as e:
+            print(e)
+            return 2
+
+    metrics = start_run('output2sql-batch')
+    backend = get_backend(args.target, staging_dir=args.staging_dir)
+    loader = BatchLoader(backend, table_map=table_map, create_table=args.create_table,
+                         parse_workers=args.parse_workers, db_writers=args.db_writers,
+                         batch_size=args.batch_size, chunk_size=args.chunk_size,
+                         sample_rows=args.sample_rows, stream_threshold=args.stream_threshold,
+                         resume=args.resume or args.watch, reject_dir=args.reject_dir, reject_format=args.reject_format,
+                         use_cache=args.use_cache, queue_size=args.queue_size, pipeline_all=args.pipeline,
+                         sizer=sizer, compact=args.compact, delta=args.delta, key_map=key_map,
+                         delta_reset=args.delta_reset, target=args.target, range_workers=args.range_workers,
+                         export_dir=args.export_dir, transaction_statements=args.transaction_statements,
+                         split_bytes=int(args.split_mb * 2**20) if args.split_mb else None)
+    if args.watch:
+        return run_watch(loader, args, metrics)
+    started = time.perf_counter()
+    with profile_run(args.profile):
+        reports = loader.run(files)
+    metrics.set_value('files', [asdict(r) for r in reports])
+    write_metrics(args.metrics_file or metrics_path_for(args.log_file))
+    summary = format_summary(reports, time.perf_counter() - started)
+    for r in reports:
+        logging.info(f"{r.file_path} -> {r.table_name}: {r.rows_uploaded} uploaded, {r.rows_failed} failed, "
+                     f"{r.status}{': ' + r.error if r.error else ''}")
+    print('\n' + summary)
+    for r in reports:
+        if r.reject_file:
+            print(f"{r.rows_failed:,} rejected records from {r.file_path} written to {r.reject_file}")
+        if r.export_files:
+            print(f"{r.rows_uploaded:,} records from {r.file_path} exported to {r.export_files}")
+    return 0 if all(r.ok for r in reports) else 1
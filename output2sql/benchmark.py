@@ -0,0 +1,368 @@
+# output2sql/benchmark.py
+#
+"""
+Reproducible throughput benchmarks.
+
+Generates synthetic files shaped like our exports (see output2sql.synthetic)
+and times the schema inference, read and upload paths on each, against a
+throwaway SQLite database or any other target get_backend accepts:
+
+    python -m output2sql.benchmark --rows 10k,100k,1M --label before-change
+    python -m output2sql.benchmark --rows 10k,100k,1M --label after-change
+    python -m output2sql.benchmark --compare benchmarks/before-change.json benchmarks/after-change.json
+
+Every stage runs in a fresh worker process, so its peak RSS is its own and
+not left over from an earlier stage. Results (rows/sec, MB/sec, peak memory
+and the stage breakdown from output2sql.metrics) are saved as JSON under
+--results-dir; --compare prints the change per case and stage and exits
+non-zero when throughput dropped by more than --threshold percent.
+--parse-processes N profiles and reads CSV files in N processes (see
+output2sql.parallelcsv); running the suite with 1, 2, 4, ... shows how
+parsing scales with cores.
+
+Startup cost is measured too: each entry module is imported in a fresh
+interpreter and the time taken, and the heavy modules (pandas, drivers)
+the import pulled in, are saved with the results and compared like the
+stages. --stages imports measures only that.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from output2sql.backends import get_backend
+from output2sql.metrics import peak_rss_bytes, start_run
+from output2sql.parallelcsv import iter_parallel_csv_chunks
+from output2sql.readers import DEFAULT_CHUNK_SIZE, iter_file_chunks
+from output2sql.schema import profile_file, sanitize_column_name
+from output2sql.synthetic import DEFAULT_SEED, write_synthetic_file
+from output2sql.upload import DEFAULT_BATCH_SIZE, upload_chunks
+
+# --- Configuration ---
+RESULTS_DIR = 'benchmarks'
+DATA_DIR = os.path.join('.output2sql', 'bench-data')
+QUICK_ROWS = '10k,100k'
+FULL_ROWS = '10k,100k,1M,10M,50M'
+DEFAULT_DATASETS = 'contacts,cars'
+DEFAULT_LAYOUTS = 'csv,ndjson,concatenated'
+STAGES = ('infer', 'read', 'upload')
+IMPORT_MODULES = ('output2sql.interactive', 'output2sql.batch', 'pandas') # Entry points, and pandas for scale
+HEAVY_MODULES = ('numpy', 'pandas', 'pyarrow', 'pyodbc', 'psycopg2', 'sqlalchemy')
+IMPORT_REPEAT = 5 # Fresh interpreters per module; the fastest import is kept
+IMPORT_NOISE_SECONDS = 0.005 # Import slowdowns smaller than this are not reported as regressions
+REGRESSION_THRESHOLD = 10.0 # Percent drop in rows/sec reported as a regression
+ROW_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_rows(text):
+    """Parses '10k,1M,50M' into [10000, 1000000, 50000000]."""
+    sizes = []
+    for part in text.split(','):
+        part = part.strip().lower()
+        multiplier = ROW_SUFFIXES.get(part[-1:], 1)
+        sizes.append(int(float(part.rstrip('km')) * multiplier))
+    return sizes
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# --- Stage Runners (executed in worker processes) ---
+def _run_stage(stage_name, file_path, schema, target, chunk_size, batch_size, processes=1):
+    """
+    Worker-process body: runs one stage on file_path and returns its timing,
+    peak RSS and the output2sql.metrics stage breakdown. The infer stage also
+    returns the schema it inferred, which the other stages are given. With
+    processes above 1 CSV files are profiled and read in that many processes.
+    """
+    baseline_rss = peak_rss_bytes()
+    metrics = start_run(f"benchmark {stage_name}")
+    started, cpu_started = time.perf_counter(), time.process_time()
+    rows = 0
+
+    if stage_name == 'infer':
+        schema = profile_file(file_path, chunk_size=chunk_size, processes=processes)
+        rows = max((profile.count for profile in schema.values()), default=0)
+    elif stage_name == 'read':
+        if processes > 1 and file_path.endswith('.csv'):
+            chunks = iter_parallel_csv_chunks(file_path, schema, chunk_size=chunk_size, processes=processes)
+        else:
+            chunks = iter_file_chunks(file_path, schema, chunk_size=chunk_size)
+        for chunk in chunks:
+            rows += len(chunk)
+    elif stage_name == 'upload':
+        rows = _upload_file(file_path, schema, target, chunk_size, batch_size)
+    else:
+        raise ValueError(f"Unknown stage '{stage_name}'.")
+
+    seconds = time.perf_counter() - started
+    size = os.path.getsize(file_path)
+    return {
+        'rows': rows,
+        'bytes': size,
+        'seconds': round(seconds, 6),
+        'cpu_seconds': round(time.process_time() - cpu_started, 6),
+        'rows_per_sec': round(rows / seconds, 1) if seconds else None,
+        'mb_per_sec': round(size / seconds / 1e6, 3) if seconds else None,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'baseline_rss_bytes': baseline_rss,
+        'breakdown': metrics.to_dict()['stages'],
+        'schema': schema if stage_name == 'infer' else None,
+    }
+
+
+def _upload_file(file_path, schema, target, chunk_size, batch_size):
+    """Streams file_path into a new table on target, drops the table again and returns the rows uploaded."""
+    backend = get_backend(target)
+    table_name = f"bench_{os.getpid()}_{int(time.time())}"
+    column_names = [sanitize_column_name(col) for col in schema]
+    column_definitions = [(col, profile.sql_definition()) for col, profile in zip(column_names, schema.values())]
+    cnxn = backend.connect()
+    try:
+        cursor = cnxn.cursor()
+        cursor.execute(backend.create_table_sql(table_name, column_definitions))
+        cursor.close()
+        cnxn.commit()
+        chunks = iter_file_chunks(file_path, schema, chunk_size=chunk_size)
+        with contextlib.redirect_stdout(io.StringIO()): # Progress lines would drown the results
+            result = upload_chunks(cnxn, chunks, table_name, column_names, batch_size=batch_size, backend=backend)
+        cursor = cnxn.cursor()
+        cursor.execute(f"DROP TABLE {backend.quote(table_name)}")
+        cursor.close()
+        cnxn.commit()
+        return result.rows
+    finally:
+        cnxn.close()
+
+
+def run_stage_isolated(stage_name, file_path, schema, target, chunk_size, batch_size, processes=1):
+    """Runs one stage in a fresh process so peak memory is measured per stage."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_run_stage, stage_name, file_path, schema, target, chunk_size, batch_size,
+                               processes).result()
+
+
+# --- Import Cost ---
+def measure_import(module, repeat=IMPORT_REPEAT):
+    """
+    Imports module in repeat fresh interpreters. Returns the fastest import
+    time and the HEAVY_MODULES that the import loaded.
+    """
+    code = (f"import sys, time; started = time.perf_counter(); import {module}; "
+            f"print(time.perf_counter() - started); print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_root, os.environ.get('PYTHONPATH')])))
+    times = []
+    for _ in range(max(repeat, 1)):
+        completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+        seconds, heavy = completed.stdout.splitlines()
+        times.append(float(seconds))
+    return {'seconds': round(min(times), 6), 'heavy_modules': heavy.split(',') if heavy else []}
+
+
+def measure_imports(modules=IMPORT_MODULES, repeat=IMPORT_REPEAT):
+    """Measures and prints the import cost of each module; returns {module: result}."""
+    results = {}
+    for module in modules:
+        results[module] = result = measure_import(module, repeat)
+        print(f"import {module:<31} {result['seconds'] * 1000:>9.1f} ms  "
+              f"loads {', '.join(result['heavy_modules']) or 'no heavy modules'}")
+    return results
+
+
+# --- Suite ---
+def run_suite(sizes, datasets, layouts, stages, target=None, data_dir=DATA_DIR, chunk_size=None,
+              batch_size=None, seed=None, repeat=1, processes=1):
+    """
+    Generates the files and runs every stage on each, repeat times, keeping
+    the fastest run. Returns the list of case results.
+    """
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    seed = DEFAULT_SEED if seed is None else seed
+    cases = []
+    with tempfile.TemporaryDirectory(prefix='output2sql-bench-') as scratch:
+        for rows in sizes:
+            for dataset in datasets:
+                for layout in layouts:
+                    file_path = write_synthetic_file(data_dir, dataset, layout, rows, seed)
+                    case = {'dataset': dataset, 'layout': layout, 'rows': rows, 'file': os.path.basename(file_path),
+                            'bytes': os.path.getsize(file_path), 'stages': {}}
+                    schema = None
+                    if 'infer' not in stages:
+                        schema = profile_file(file_path, chunk_size=chunk_size)
+                    for stage_name in stages:
+                        stage_target = target or os.path.join(scratch, f"bench_{dataset}_{layout}_{rows}.db")
+                        runs = [run_stage_isolated(stage_name, file_path, schema, stage_target, chunk_size,
+                                                   batch_size, processes) for _ in range(max(repeat, 1))]
+                        result = min(runs, key=lambda run: run['seconds'])
+                        result['runs'] = len(runs)
+                        schema = result.pop('schema') or schema
+                        case['stages'][stage_name] = result
+                        print(f"{dataset:<9} {layout:<13} {rows:>11,} {stage_name:<7} "
+                              f"{result['rows_per_sec'] or 0:>12,.0f} rows/s {result['mb_per_sec'] or 0:>8.2f} MB/s "
+                              f"peak {(result['peak_rss_bytes'] or 0) / 1e6:>8.1f} MB")
+                    cases.append(case)
+    return cases
+
+
+def save_results(cases, results_dir, label, settings, imports=None):
+    """Writes the suite results with the environment they were measured in; returns the path."""
+    os.makedirs(results_dir, exist_ok=True)
+    label = label or datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(results_dir, f"{label}.json")
+    state = {
+        'label': label,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'settings': settings,
+        'imports': imports or {},
+        'cases': cases,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    return path
+
+
+# --- Comparison ---
+def _case_key(case):
+    return case['dataset'], case['layout'], case['rows']
+
+
+def compare_results(baseline_path, current_path, threshold=REGRESSION_THRESHOLD):
+    """
+    Prints rows/sec and peak memory of two result files side by side.
+    Returns the number of (case, stage) pairs whose throughput dropped by
+    more than threshold percent.
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(current_path, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    baseline_cases = {_case_key(case): case for case in baseline['cases']}
+
+    print(f"Baseline: {baseline['label']} ({baseline.get('revision') or 'unknown revision'})")
+    print(f"Current:  {current['label']} ({current.get('revision') or 'unknown revision'})\n")
+    print(f"{'Case':<42} {'Stage':<7} {'Before rows/s':>14} {'After rows/s':>14} {'Change':>8} {'Peak MB':>16}")
+    regressions = 0
+    for case in current['cases']:
+        before_case = baseline_cases.get(_case_key(case))
+        if before_case is None:
+            continue
+        name = f"{case['dataset']} {case['layout']} {case['rows']:,}"
+        for stage_name, after in case['stages'].items():
+            before = before_case['stages'].get(stage_name)
+            if not before or not before['rows_per_sec'] or not after['rows_per_sec']:
+                continue
+            change = (after['rows_per_sec'] - before['rows_per_sec']) / before['rows_per_sec'] * 100
+            flag = ''
+            if change < -threshold:
+                regressions += 1
+                flag = '  REGRESSION'
+            memory = f"{(before['peak_rss_bytes'] or 0) / 1e6:.0f} -> {(after['peak_rss_bytes'] or 0) / 1e6:.0f}"
+            print(f"{name:<42} {stage_name:<7} {before['rows_per_sec']:>14,.0f} {after['rows_per_sec']:>14,.0f} "
+                  f"{change:>+7.1f}% {memory:>16}{flag}")
+    before_imports = baseline.get('imports', {})
+    for module, after in current.get('imports', {}).items():
+        before = before_imports.get(module)
+        if not before or not before['seconds']:
+            continue
+        change = (after['seconds'] - before['seconds']) / before['seconds'] * 100
+        flag = ''
+        if change > threshold and after['seconds'] - before['seconds'] > IMPORT_NOISE_SECONDS:
+            regressions += 1
+            flag = '  REGRESSION'
+        name = f"import {module}"
+        print(f"{name:<42} {'':<7} {before['seconds'] * 1000:>11.1f} ms {after['seconds'] * 1000:>11.1f} ms "
+              f"{change:>+7.1f}%{flag}")
+    print(f"\n{regressions} regressions beyond {threshold}%.")
+    return regressions
+
+
+# --- Command Line ---
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m output2sql.benchmark',
+                                     description="Benchmark schema inference, reading and uploading on synthetic data.")
+    parser.add_argument('--rows', default=QUICK_ROWS,
+                        help="Comma-separated file sizes in records, e.g. 10k,1M (default: %(default)s).")
+    parser.add_argument('--full', action='store_true', help=f"Run every size: {FULL_ROWS}.")
+    parser.add_argument('--datasets', default=DEFAULT_DATASETS, help="contacts and/or cars (default: %(default)s).")
+    parser.add_argument('--layouts', default=DEFAULT_LAYOUTS,
+                        help="csv, ndjson, concatenated and/or array (default: %(default)s).")
+    parser.add_argument('--stages', default=','.join(STAGES + ('imports',)),
+                        help="Stages to time; imports is the startup cost of the entry points (default: %(default)s).")
+    parser.add_argument('--import-repeat', type=int, default=IMPORT_REPEAT,
+                        help="Fresh interpreters per module when timing imports (default: %(default)s).")
+    parser.add_argument('--target', help="Database to upload to (default: a fresh SQLite file per case).")
+    parser.add_argument('--chunk-size', type=int, help="Records per chunk when reading.")
+    parser.add_argument('--batch-size', type=int, help="Rows per bulk call when uploading.")
+    parser.add_argument('--parse-processes', type=int, default=1,
+                        help="Processes profiling and reading each CSV file (default: %(default)s).")
+    parser.add_argument('--seed', type=int, help="Seed for the synthetic data.")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="Runs per stage; the fastest is kept, which steadies small cases (default: %(default)s).")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="Where generated files are kept (default: %(default)s).")
+    parser.add_argument('--results-dir', default=RESULTS_DIR, help="Where results are saved (default: %(default)s).")
+    parser.add_argument('--label', help="Name of the results file (default: a timestamp).")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help="Compare two results files instead of running the suite.")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Throughput drop, in percent, reported as a regression (default: %(default)s).")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.compare:
+        return 1 if compare_results(*args.compare, threshold=args.threshold) else 0
+
+    sizes = parse_rows(FULL_ROWS if args.full else args.rows)
+    datasets = [d.strip() for d in args.datasets.split(',')]
+    layouts = [layout.strip() for layout in args.layouts.split(',')]
+    stages = [s.strip() for s in args.stages.split(',')]
+    unknown = [s for s in stages if s not in STAGES + ('imports',)]
+    if unknown:
+        print(f"Unknown stages: {', '.join(unknown)} (expected {', '.join(STAGES + ('imports',))}).")
+        return 2
+    imports = measure_imports(repeat=args.import_repeat) if 'imports' in stages else None
+    stages = [s for s in stages if s != 'imports']
+
+    settings = {'rows': sizes, 'datasets': datasets, 'layouts': layouts, 'stages': stages,
+                'target': args.target or 'sqlite (fresh file per case)', 'chunk_size': args.chunk_size,
+                'batch_size': args.batch_size, 'parse_processes': args.parse_processes, 'seed': args.seed,
+                'repeat': args.repeat, 'import_repeat': args.import_repeat}
+    cases = run_suite(sizes, datasets, layouts, stages, target=args.target, data_dir=args.data_dir,
+                      chunk_size=args.chunk_size, batch_size=args.batch_size, seed=args.seed, repeat=args.repeat,
+                      processes=args.parse_processes) if stages else []
+    path = save_results(cases, args.results_dir, args.label, settings, imports)
+    print(f"\nResults saved to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+# output2sql/cache.py
+#
+"""
+Persistent schema and parse cache.
+
+Profiling a file and parsing it into a coerced DataFrame are the slow parts
+of a run, and both are repeated every time the same file is loaded. The
+cache keeps, per version of a source file, the inferred schema (for each
+sample size used) and optionally a columnar copy of the coerced data, so a
+repeat run on an unchanged file skips CSV/JSON parsing entirely.
+
+A version is identified by the file's absolute path, size, modification time
+and content fingerprint; touching or rewriting the file simply misses the
+cache. Data is stored as Parquet when pyarrow is installed and as a pandas
+pickle otherwise. The total size is capped and least recently used entries
+are evicted first.
+
+    python -m output2sql.cache --list
+    python -m output2sql.cache --invalidate contacts2.csv
+    python -m output2sql.cache --clear
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from dataclasses import asdict
+
+import pandas as pd
+
+from output2sql.checkpoint import file_fingerprint
+from output2sql.schema import ColumnProfile
+
+# --- Configuration ---
+CACHE_DIR = os.environ.get('OUTPUT2SQL_CACHE_DIR', os.path.join('.output2sql', 'cache'))
+CACHE_SIZE_LIMIT = int(os.environ.get('OUTPUT2SQL_CACHE_SIZE', 1024 * 1024 * 1024)) # Bytes, all entries together
+DATA_FORMAT = 'parquet' if importlib.util.find_spec('pyarrow') else 'pickle'
+META_FILE = 'meta.json'
+
+
+def _json_value(value):
+    # numpy scalars (e.g. a column minimum) are not JSON serialisable
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def _sample_tag(sample_rows):
+    return 'all' if sample_rows is None else str(sample_rows)
+
+
+class ParseCache:
+    """On-disk cache of inferred schemas and parsed data, keyed by source file version."""
+
+    def __init__(self, directory=CACHE_DIR, size_limit=CACHE_SIZE_LIMIT):
+        self.directory = directory
+        self.size_limit = size_limit
+        self._keys = {}
+
+    # --- Keys and Entries ---
+    def key(self, file_path):
+        """Cache key for the current version of file_path (path, size, mtime and content hash)."""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        version = (path, stat.st_size, stat.st_mtime_ns)
+        if version not in self._keys:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(repr(version).encode())
+            digest.update(file_fingerprint(path).encode())
+            self._keys[version] = digest.hexdigest()
+        return self._keys[version]
+
+    def _entry_dir(self, file_path):
+        return os.path.join(self.directory, self.key(file_path))
+
+    def _touch(self, entry_dir, file_path):
+        """
+        Marks the entry as just used. On first use its metadata is written and
+        entries for older versions of the same file are dropped.
+        """
+        meta_path = os.path.join(entry_dir, META_FILE)
+        if not os.path.exists(meta_path):
+            self.invalidate(file_path)
+            os.makedirs(entry_dir, exist_ok=True)
+            stat = os.stat(file_path)
+            meta = {'source': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=2)
+        else:
+            os.utime(meta_path)
+
+    def _write_atomic(self, path, write):
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        write(temp_path)
+        os.replace(temp_path, path)
+
+    # --- Schema ---
+    def load_schema(self, file_path, sample_rows=None):
+        """Returns the cached {column: ColumnProfile} for this version of the file, or None."""
+        entry_dir = self._entry_dir(file_path)
+        path = os.path.join(entry_dir, f"schema-{_sample_tag(sample_rows)}.json")
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable cached schema {path}: {e}")
+            return None
+        self._touch(entry_dir, file_path)
+        logging.info(f"Schema for {file_path} loaded from cache.")
+        return {profile['name']: ColumnProfile(**profile) for profile in saved}
+
+    def store_schema(self, file_path, profiles, sample_rows=None):
+        entry_dir = self._entry_dir(file_path)
+        self._touch(entry_dir, file_path)
+        state = [asdict(profile) for profile in profiles.values()]
+
+        def write(temp_path):
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, default=_json_value)
+
+        self._write_atomic(os.path.join(entry_dir, f"schema-{_sample_tag(sample_rows)}.json"), write)
+        self.evict()
+
+    # --- Data ---
+    def _data_path(self, entry_dir, sample_rows, data_format):
+        return os.path.join(entry_dir, f"data-{_sample_tag(sample_rows)}.{data_format}")
+
+    def load_data(self, file_path, sample_rows=None):
+        """
+        Returns the cached coerced DataFrame for this version of the file and
+        the schema inferred with sample_rows, or None.
+        """
+        entry_dir = self._entry_dir(file_path)
+        for data_format in ('parquet', 'pickle'):
+            path = self._data_path(entry_dir, sample_rows, data_format)
+            if not os.path.exists(path):
+                continue
+            try:
+                df = pd.read_parquet(path) if data_format == 'parquet' else pd.read_pickle(path)
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable cached data {path}: {e}")
+                continue
+            self._touch(entry_dir, file_path)
+            logging.info(f"{len(df)} records of {file_path} loaded from cache ({data_format}).")
+            return df
+        return None
+
+    def store_data(self, file_path, df, sample_rows=None):
+        """Stores a columnar copy of the coerced DataFrame (Parquet when possible, else pickle)."""
+        entry_dir = self._entry_dir(file_path)
+        self._touch(entry_dir, file_path)
+        df = df.reset_index(drop=True)
+        try:
+            if DATA_FORMAT != 'parquet':
+                raise ImportError("pyarrow is not installed")
+            self._write_atomic(self._data_path(entry_dir, sample_rows, 'parquet'),
+                               lambda temp_path: df.to_parquet(temp_path, index=False))
+        except (ImportError, TypeError, ValueError) as e:
+            if DATA_FORMAT == 'parquet':
+                logging.info(f"Caching {file_path} as pickle; Parquet could not store it: {e}")
+            self._write_atomic(self._data_path(entry_dir, sample_rows, 'pickle'), df.to_pickle)
+        self.evict()
+
+    # --- Maintenance ---
+    def entries(self):
+        """Lists the cache entries as dictionaries, most recently used first."""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for key in os.listdir(self.directory):
+            entry_dir = os.path.join(self.directory, key)
+            meta_path = os.path.join(entry_dir, META_FILE)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                last_used = os.path.getmtime(meta_path)
+                size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+            except (OSError, ValueError):
+                continue # Being written or removed by another process
+            entries.append({**meta, 'key': key, 'path': entry_dir, 'bytes': size, 'last_used': last_used})
+        entries.sort(key=lambda entry: entry['last_used'], reverse=True)
+        return entries
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in size_limit. Returns the count removed."""
+        entries = self.entries()
+        total = sum(entry['bytes'] for entry in entries)
+        removed = 0
+        while total > self.size_limit and len(entries) > 1:
+            oldest = entries.pop()
+            shutil.rmtree(oldest['path'], ignore_errors=True)
+            total -= oldest['bytes']
+            removed += 1
+            logging.info(f"Evicted cache entry for {oldest['source']} ({oldest['bytes']:,} bytes).")
+        return removed
+
+    def invalidate(self, file_path=None):
+        """Removes every cached version of file_path, or the whole cache when it is None. Returns the count removed."""
+        source = os.path.abspath(file_path) if file_path else None
+        removed = 0
+        for entry in self.entries():
+            if source is None or entry['source'] == source:
+                shutil.rmtree(entry['path'], ignore_errors=True)
+                removed += 1
+        return removed
+
+
+# --- Command Line ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m output2sql.cache',
+                                     description="Inspect or invalidate the output2sql schema and parse cache.")
+    parser.add_argument('--dir', default=CACHE_DIR, help="Cache directory (default: %(default)s).")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--list', action='store_true', help="List cached files.")
+    action.add_argument('--invalidate', nargs='+', metavar='FILE', help="Drop every cached version of FILE.")
+    action.add_argument('--clear', action='store_true', help="Empty the cache.")
+    args = parser.parse_args(argv)
+
+    cache = ParseCache(args.dir)
+    if args.list:
+        entries = cache.entries()
+        for entry in entries:
+            last_used = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['last_used']))
+            print(f"{entry['source']}  {entry['bytes']:,} bytes  last used {last_used}")
+        print(f"{len(entries)} entries, {sum(entry['bytes'] for entry in entries):,} bytes in {cache.directory}")
+    elif args.invalidate:
+        for file_path in args.invalidate:
+            print(f"{file_path}: {cache.invalidate(file_path)} cache entries removed.")
+    else:
+        print(f"{cache.invalidate()} cache entries removed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
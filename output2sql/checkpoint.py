@@ -0,0 +1,136 @@
+# output2sql/checkpoint.py
+#
+"""
+Checkpoint manifests for resumable loads.
+
+One small JSON file per (source file, table) records the source's content
+fingerprint and how far the load has got: the number of records committed
+and where the chunk holding the next record starts in the file. It is
+rewritten (atomically) at every commit, so after a failure at row 3,000,000
+a resumed load seeks straight to that chunk and carries on instead of
+re-inserting everything from row zero.
+
+The manifest is written just after each commit, so a crash between the two
+can replay at most one batch on resume.
+"""
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+# --- Configuration ---
+CHECKPOINT_DIR = os.environ.get('OUTPUT2SQL_CHECKPOINT_DIR', os.path.join('.output2sql', 'checkpoints'))
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+FINGERPRINT_BLOCKS = 16 # Blocks hashed, spread evenly through the file
+
+
+def file_fingerprint(file_path):
+    """
+    Cheap content fingerprint: file size plus a BLAKE2 hash of FINGERPRINT_BLOCKS
+    blocks spread evenly through the file (always including the first and
+    last). Appends, truncations and rewrites change it without reading the
+    whole file.
+    """
+    size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode())
+    with open(file_path, 'rb') as f:
+        if size <= FINGERPRINT_BLOCK_SIZE * FINGERPRINT_BLOCKS:
+            digest.update(f.read())
+        else:
+            step = (size - FINGERPRINT_BLOCK_SIZE) // (FINGERPRINT_BLOCKS - 1)
+            for i in range(FINGERPRINT_BLOCKS):
+                f.seek(i * step)
+                digest.update(f.read(FINGERPRINT_BLOCK_SIZE))
+    return f"{size}-{digest.hexdigest()}"
+
+
+def manifest_name(source, table):
+    """
+    File name of the manifest for source and table: readable names plus a
+    hash of the source's absolute path, so same-named files in different
+    directories get manifests of their own.
+    """
+    source_key = hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()[:10]
+    return f"{table}__{os.path.basename(source)}-{source_key}.json"
+
+
+@dataclass
+class Checkpoint:
+    """Progress of loading one source file into one table."""
+    source: str
+    table: str
+    fingerprint: str = ''
+    rows_committed: int = 0
+    chunk_offset: int = None # Byte offset of the chunk holding the next record
+    chunk_first_row: int = 0 # Row number of that chunk's first record
+    complete: bool = False
+    updated_at: str = ''
+    path: str = field(default='', repr=False)
+
+    @classmethod
+    def load(cls, source, table, directory=CHECKPOINT_DIR):
+        """
+        Returns the checkpoint for source and table. A missing manifest, or one
+        written for different file contents, gives a fresh checkpoint at row 0.
+        """
+        path = os.path.join(directory, manifest_name(source, table))
+        fingerprint = file_fingerprint(source)
+        checkpoint = cls(source=os.path.abspath(source), table=table, fingerprint=fingerprint, path=path)
+        if not os.path.exists(path):
+            return checkpoint
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+            return checkpoint
+        if saved.get('fingerprint') != fingerprint or saved.get('source') != checkpoint.source:
+            logging.warning(f"Checkpoint {path} was written for different contents of {source}; starting over.")
+            return checkpoint
+        saved.pop('path', None)
+        return cls(**saved, path=path)
+
+    @property
+    def resumable(self):
+        return self.rows_committed > 0 and not self.complete
+
+    def resume_arguments(self):
+        """Keyword arguments for iter_file_chunks that continue after the last committed record."""
+        if self.chunk_offset is None:
+            return {'skip_rows': self.rows_committed}
+        return {'start_offset': self.chunk_offset, 'start_row': self.chunk_first_row,
+                'skip_rows': self.rows_committed - self.chunk_first_row}
+
+    def record(self, chunk, next_row):
+        """
+        on_commit callback for the upload functions: everything before next_row
+        (a source row number) is committed.
+        """
+        self.rows_committed = next_row
+        if 'source_offset' in chunk.attrs:
+            self.chunk_offset = chunk.attrs['source_offset']
+            self.chunk_first_row = chunk.attrs['source_first_row']
+        self.save()
+
+    def mark_complete(self):
+        self.complete = True
+        self.save()
+
+    def reset(self):
+        """Forgets previous progress, e.g. when the user chooses to reload from the start."""
+        self.rows_committed, self.chunk_offset, self.chunk_first_row, self.complete = 0, None, 0, False
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def save(self):
+        self.updated_at = datetime.now().isoformat(timespec='seconds')
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        state = asdict(self)
+        state.pop('path')
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,139 @@
+# output2sql/compact.py
+#
+"""
+Compact in-memory representation for loaded DataFrames.
+
+Read as text, every value is a separate Python string, so a state or
+manufacturer column repeating a few dozen values millions of times costs
+tens of bytes per row. compact_dataframe() rewrites columns in place:
+
+  - text columns with few distinct values become categoricals (one small
+    integer code per row plus each distinct string once); the upload
+    converts each category to a driver value once and expands by code
+    (see upload.column_to_native)
+  - remaining text columns use Arrow-backed strings when pyarrow is
+    installed
+  - nullable integers are downcast to the smallest type holding the
+    observed range, and floats to float32 where that loses nothing
+
+Memory use before and after, per column, is returned as a CompactionReport.
+"""
+import importlib.util
+import logging
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from output2sql.metrics import stage
+
+# --- Configuration ---
+CATEGORY_MAX_RATIO = 0.5 # Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_DISTINCT = 100_000 # ...and at most this many distinct values
+CATEGORY_SAMPLE_ROWS = 10_000 # Rows checked first, so near-unique columns are ruled out cheaply
+ARROW_STRINGS = importlib.util.find_spec('pyarrow') is not None
+INTEGER_DTYPES = (
+    ('Int8', -2**7, 2**7 - 1),
+    ('Int16', -2**15, 2**15 - 1),
+    ('Int32', -2**31, 2**31 - 1),
+)
+
+
+@dataclass
+class CompactionReport:
+    """Memory use of each column before and after compaction, in bytes, and the new dtypes."""
+    before: dict = field(default_factory=dict)
+    after: dict = field(default_factory=dict)
+    dtypes: dict = field(default_factory=dict)
+
+    @property
+    def bytes_before(self):
+        return sum(self.before.values())
+
+    @property
+    def bytes_after(self):
+        return sum(self.after.values())
+
+    def summary(self):
+        saved = 1 - self.bytes_after / self.bytes_before if self.bytes_before else 0.0
+        return (f"{self.bytes_before / 2**20:,.1f} MB -> {self.bytes_after / 2**20:,.1f} MB "
+                f"({saved:.0%} smaller)")
+
+    def format_table(self):
+        """One line per column: dtype, bytes before and after."""
+        width = max((len(str(col)) for col in self.before), default=6)
+        lines = [f"{'column':<{width}}  {'dtype':<16} {'before':>12} {'after':>12}"]
+        for col, before in self.before.items():
+            lines.append(f"{str(col):<{width}}  {self.dtypes[col]:<16} {before:>12,} {self.after[col]:>12,}")
+        lines.append(f"{'total':<{width}}  {'':<16} {self.bytes_before:>12,} {self.bytes_after:>12,}")
+        return '\n'.join(lines)
+
+
+def _is_text(series):
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _compact_text(series):
+    present = series.dropna()
+    if present.empty:
+        return series
+    if pd.api.types.infer_dtype(present, skipna=True) != 'string':
+        return series # Mixed values (e.g. raw JSON lists) are left alone
+    sample = present.iloc[:CATEGORY_SAMPLE_ROWS]
+    if len(present) <= CATEGORY_SAMPLE_ROWS or sample.nunique() <= CATEGORY_MAX_RATIO * len(sample):
+        distinct = present.nunique()
+        if distinct <= CATEGORY_MAX_DISTINCT and distinct <= CATEGORY_MAX_RATIO * len(series):
+            return series.astype('category')
+    if ARROW_STRINGS:
+        return series.astype(pd.StringDtype('pyarrow'))
+    return series
+
+
+def _compact_integer(series):
+    present = series.dropna()
+    if present.empty:
+        return series
+    low, high = present.min(), present.max()
+    for dtype, dtype_low, dtype_high in INTEGER_DTYPES:
+        if dtype_low <= low and high <= dtype_high:
+            return series.astype(dtype)
+    return series
+
+
+def _compact_float(series):
+    narrowed = series.astype('float32')
+    # Only when every value survives the round trip: DECIMAL columns must not lose digits
+    same = (narrowed.astype('float64') == series) | series.isna()
+    return narrowed if bool(same.all()) else series
+
+
+def compact_column(series):
+    """Returns the column in its most compact lossless representation."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return series
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype):
+        return series
+    if pd.api.types.is_integer_dtype(dtype):
+        return _compact_integer(series)
+    if dtype == np.float64:
+        return _compact_float(series)
+    if _is_text(series):
+        return _compact_text(series)
+    return series
+
+
+def compact_dataframe(df):
+    """
+    Converts the columns of df in place to compact representations and
+    returns a CompactionReport of memory use before and after.
+    """
+    report = CompactionReport()
+    with stage('compact', rows=len(df)):
+        for col in df.columns:
+            report.before[col] = int(df[col].memory_usage(index=False, deep=True))
+            df[col] = compact_column(df[col])
+            report.after[col] = int(df[col].memory_usage(index=False, deep=True))
+            report.dtypes[col] = str(df[col].dtype)
+    logging.info(f"Compacted DataFrame of {len(df)} rows: {report.summary()}.")
+    return report
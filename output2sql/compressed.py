@@ -0,0 +1,99 @@
+# output2sql/compressed.py
+#
+"""
+Compressed input files.
+
+Upstream exports often arrive as contacts.csv.gz, car_data.json.zst or
+extract.csv.bz2. The readers open every data file through open_data(),
+which decompresses as a stream, block by block as the reader asks for
+bytes, so the uncompressed file never touches the disk and reading only
+the head of a file (the CSV header, a schema sample, the JSON layout probe)
+decompresses only the head.
+
+  - .gz, .bz2 and .xz use the standard library
+  - .zst needs the zstandard package (or Python 3.14's compression.zstd)
+
+Byte offsets (chunk source_offset, checkpoints) count uncompressed bytes.
+A compressed stream cannot be entered in the middle, so resuming
+decompresses and discards everything before the offset, and a compressed
+CSV file is parsed in one process rather than in byte ranges.
+"""
+import bz2
+import gzip
+import io
+import lzma
+import os
+
+# --- Configuration ---
+COMPRESSION_CODECS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+COMPRESSION_RATIO = 8 # Assumed for text exports when a compressed file's data size has to be estimated
+SKIP_BLOCK_SIZE = 1024 * 1024 # Bytes decompressed and discarded at a time when skipping to an offset
+
+
+def split_compression(file_path):
+    """Returns (file_path without its compression suffix, codec or None), e.g. ('a.csv', 'gzip') for 'a.csv.gz'."""
+    root, extension = os.path.splitext(file_path)
+    codec = COMPRESSION_CODECS.get(extension.lower())
+    return (root, codec) if codec else (file_path, None)
+
+
+def is_compressed(file_path):
+    return split_compression(file_path)[1] is not None
+
+
+def data_extension(file_path):
+    """Extension of the data inside the file, lower case: '.csv' for both 'a.csv' and 'a.CSV.gz'."""
+    return os.path.splitext(split_compression(file_path)[0])[1].lower()
+
+
+def estimated_data_size(file_path):
+    """Size of the data in bytes: the file size, or for a compressed file an estimate of its uncompressed size."""
+    size = os.path.getsize(file_path)
+    return size * COMPRESSION_RATIO if is_compressed(file_path) else size
+
+
+def _open_zstd(file_path):
+    try:
+        from compression import zstd # Python 3.14+
+        return zstd.open(file_path, 'rb')
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(f"Reading {file_path} needs the zstandard package (pip install zstandard).") from e
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True))
+
+
+def _skip(f, offset):
+    """Moves a stream opened by open_data forward to offset; streams that cannot seek are read and discarded."""
+    if f.seekable():
+        f.seek(offset)
+        return
+    while offset > 0:
+        skipped = len(f.read(min(offset, SKIP_BLOCK_SIZE)))
+        if not skipped:
+            return
+        offset -= skipped
+
+
+def open_data(file_path, offset=0, text=False):
+    """
+    Opens a data file for reading from byte offset of its data,
+    decompressing on the fly when its name ends in a compression suffix.
+    Binary by default; text=True decodes UTF-8, leaving line endings as they are.
+    """
+    codec = split_compression(file_path)[1]
+    if codec == 'gzip':
+        f = gzip.open(file_path, 'rb')
+    elif codec == 'bz2':
+        f = bz2.open(file_path, 'rb')
+    elif codec == 'xz':
+        f = lzma.open(file_path, 'rb')
+    elif codec == 'zstd':
+        f = _open_zstd(file_path)
+    else:
+        f = open(file_path, 'rb')
+    if offset:
+        _skip(f, offset)
+    return io.TextIOWrapper(f, encoding='utf-8', newline='') if text else f # No newline translation
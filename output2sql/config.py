@@ -0,0 +1,15 @@
+# output2sql/config.py
+#
+"""Connection settings shared by the interactive script and the batch command line."""
+import os
+
+# --- Configuration ---
+SQL_CONNECTION_STRING = (
+    'DRIVER={ODBC Driver 17 for SQL Server};'
+    'SERVER=MORNINGSTAR\\DCW_PROTO;'
+    'DATABASE=DCW_PLANT;'
+    'UID=dcwpydev;'
+    'PWD=AL7DD308AZVRMY2Y76KG'
+)
+# ODBC connection string, postgresql:// URL or SQLite database path; overridable per environment
+UPLOAD_TARGET = os.environ.get('OUTPUT2SQL_TARGET', SQL_CONNECTION_STRING)
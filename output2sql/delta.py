@@ -0,0 +1,335 @@
+# output2sql/delta.py
+#
+"""
+Delta loading: send only the rows that are new or changed since the last load.
+
+Every row is reduced to a 64-bit hash of its values (hash_rows). For each
+target table a RowHashIndex on disk keeps, sorted, the key hash and the row
+hash of every row loaded so far: 16 bytes a row, so ten million rows take
+160 MB on disk and a re-run of an unchanged file costs a hash scan and a
+binary search instead of a reload.
+
+  - Without key columns the key is the row itself: a row whose hash is in
+    the index is skipped, anything else is inserted. An edited record
+    arrives as a new row next to the old one.
+  - With key columns (e.g. an id, or name + address) a row whose key is
+    unknown is inserted directly, and a row whose key is known but whose
+    values differ is bulk loaded into a staging table and applied with
+    MERGE (UPDATE + INSERT where the database has no MERGE).
+
+The index is the record of what is in the table. It is updated with every
+committed row, also when a load fails part way, so rows that made it in are
+not sent again. A table changed by other means should have its index
+removed (delete the file, or load once with reset=True).
+"""
+import hashlib
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from output2sql.backends import Backend
+from output2sql.metrics import stage
+from output2sql.schema import sanitize_column_name
+from output2sql.upload import (DEFAULT_BATCH_SIZE, UploadResult, _reject_row, dataframe_to_rows, upload_chunks,
+                               upload_in_batches)
+
+# --- Configuration ---
+DELTA_DIR = os.environ.get('OUTPUT2SQL_DELTA_DIR', os.path.join('.output2sql', 'delta'))
+HASH_MULTIPLIER = np.uint64(0x100000001B3) # Combines column hashes into a row hash (FNV prime)
+DUPLICATE_KEY_ERROR = 'Key repeats a row already sent in this load' # Reject reason for repeated keys
+
+
+def hash_rows(df):
+    """
+    64-bit hash of each row's values, as a uint64 array. Stable across the
+    representations a column may have between runs (object, string or
+    categorical text; Int8 to Int64; float32 or float64): integers are
+    hashed as Int64 and floats as float64, which hash numpy int64 and
+    float64 columns the same as before.
+    """
+    combined = np.zeros(len(df), dtype=np.uint64)
+    for _, series in df.items():
+        dtype = series.dtype
+        if (pd.api.types.is_signed_integer_dtype(dtype)
+                or (pd.api.types.is_unsigned_integer_dtype(dtype) and dtype.itemsize < 8)):
+            series = series.astype('Int64') # Narrow negatives hash differently from Int64 ones
+        elif pd.api.types.is_float_dtype(series.dtype):
+            series = series.astype('float64')
+        combined = (combined * HASH_MULTIPLIER) ^ pd.util.hash_pandas_object(series, index=False).to_numpy()
+    return combined
+
+
+def index_path_for(table_name, target=None, directory=DELTA_DIR):
+    """
+    Index file for table_name in target. The target (connection string,
+    URL or database path) enters the name only as a hash, so credentials
+    never reach the disk.
+    """
+    name = re.sub(r'[^\w.-]', '_', table_name)
+    if target:
+        name += '-' + hashlib.sha1(target.encode('utf-8')).hexdigest()[:10]
+    return os.path.join(directory, name + '.npz')
+
+
+class RowHashIndex:
+    """Sorted key hashes and the row hash last loaded for each key, for one target table."""
+
+    def __init__(self, path, key_columns=()):
+        self.path = path
+        self.key_columns = list(key_columns)
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    @classmethod
+    def load(cls, path, key_columns=()):
+        """The index stored at path, or an empty one if there is none or it was built on other key columns."""
+        index = cls(path, key_columns)
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as stored:
+            stored_keys = [str(col) for col in stored['key_columns']]
+            if stored_keys != index.key_columns:
+                logging.warning(f"Row-hash index {path} was built on key columns {stored_keys or 'none'}, "
+                                f"not {index.key_columns or 'none'}; starting a new index.")
+                return index
+            index.keys, index.hashes = stored['keys'], stored['hashes']
+        logging.info(f"Loaded row-hash index {path} ({len(index):,} rows).")
+        return index
+
+    def __len__(self):
+        return len(self.keys)
+
+    def classify(self, keys, hashes):
+        """Returns boolean masks (new, changed) for rows with the given key and row hashes."""
+        if not len(self.keys):
+            unknown = np.ones(len(keys), dtype=bool)
+            return unknown, ~unknown
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        known = self.keys[positions] == keys
+        return ~known, known & (self.hashes[positions] != hashes)
+
+    def update(self, keys, hashes):
+        """Adds or replaces entries; for a key given more than once the last row hash wins."""
+        all_keys = np.concatenate([self.keys, keys])[::-1]
+        all_hashes = np.concatenate([self.hashes, hashes])[::-1]
+        self.keys, first = np.unique(all_keys, return_index=True)
+        self.hashes = all_hashes[first]
+
+    def save(self):
+        """Writes the index atomically, so an interrupted save leaves the previous one intact."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez(f, keys=self.keys, hashes=self.hashes, key_columns=np.array(self.key_columns, dtype=str))
+        os.replace(temp_path, self.path)
+
+
+class DeltaFilter:
+    """
+    Splits chunks into new, changed and unchanged rows against a
+    RowHashIndex, and remembers the rows it let through so the index can be
+    updated once they are committed. With key columns, rows repeating a key
+    already let through in this load are dropped, and passed as a DataFrame
+    to on_duplicate if given.
+    """
+
+    def __init__(self, index, column_names, key_columns=(), on_duplicate=None):
+        self.index = index
+        self.on_duplicate = on_duplicate
+        self.key_positions = []
+        for key in key_columns:
+            if key not in column_names:
+                raise ValueError(f"Key column '{key}' is not one of the columns: {', '.join(column_names)}.")
+            self.key_positions.append(column_names.index(key))
+        self.unchanged = 0
+        self.duplicates = 0
+        self._seen_keys = np.empty(0, dtype=np.uint64) # Keys sent so far in this load
+        self._sent = {'new': [], 'changed': []} # (labels, keys, hashes) per chunk
+
+    def split(self, chunk):
+        """Returns (new rows, changed rows) of chunk; unchanged rows are counted and dropped."""
+        with stage('delta_hash', rows=len(chunk)):
+            hashes = hash_rows(chunk)
+            keys = hash_rows(chunk.iloc[:, self.key_positions]) if self.key_positions else hashes
+            new, changed = self.index.classify(keys, hashes)
+            self.unchanged += int((~new & ~changed).sum())
+            if self.key_positions:
+                # A key may be sent once per load; MERGE rejects a staging table with duplicate keys
+                repeated = pd.Series(keys).duplicated().to_numpy() | np.isin(keys, self._seen_keys)
+                repeated &= new | changed
+                self.duplicates += int(repeated.sum())
+                if self.on_duplicate and repeated.any():
+                    self.on_duplicate(chunk[repeated])
+                new, changed = new & ~repeated, changed & ~repeated
+                self._seen_keys = np.union1d(self._seen_keys, keys[new | changed])
+            for kind, mask in (('new', new), ('changed', changed)):
+                if mask.any():
+                    self._sent[kind].append((chunk.index.to_numpy()[mask], keys[mask], hashes[mask]))
+        return chunk[new], chunk[changed]
+
+    def record(self, kind, committed_through=None, rejected=()):
+        """
+        Adds the rows of kind ('new' or 'changed') that were committed, i.e.
+        with an index label below committed_through (all if None) and not
+        rejected, to the index.
+        """
+        if not self._sent[kind]:
+            return 0
+        labels, keys, hashes = (np.concatenate(parts) for parts in zip(*self._sent[kind]))
+        committed = ~np.isin(labels, np.asarray(rejected, dtype=labels.dtype))
+        if committed_through is not None:
+            committed &= labels < committed_through
+        self.index.update(keys[committed], hashes[committed])
+        self._sent[kind] = []
+        return int(committed.sum())
+
+
+class StagingTable:
+    """
+    Changed rows on their way into table_name. They are bulk loaded into the
+    backend's staging table as they arrive (add), so no more than one flush
+    of them is ever held in memory, and applied with MERGE once all are in
+    (merge). The staging table is created by the first add and dropped by
+    close; the rows staged and rejected add up in result.
+    """
+
+    def __init__(self, cnxn, table_name, column_names, key_columns, batch_size=DEFAULT_BATCH_SIZE, backend=None,
+                 label=None, rejects=None):
+        self.cnxn = cnxn
+        self.table_name = table_name
+        self.column_names = column_names
+        self.key_columns = key_columns
+        self.batch_size = batch_size
+        self.backend = backend or Backend()
+        self.label = label
+        self.rejects = rejects
+        self.name = self.backend.staging_table_name(table_name)
+        self.result = UploadResult()
+        self._created = False
+
+    def _execute(self, statements):
+        cursor = self.cnxn.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            self.cnxn.commit()
+        finally:
+            cursor.close()
+
+    def add(self, df):
+        """Bulk loads the rows of df into the staging table."""
+        if not self._created:
+            self._execute([self.backend.create_staging_sql(self.name, self.table_name)])
+            self._created = True
+        self.result.merge(upload_in_batches(self.cnxn, df, self.name, batch_size=self.batch_size,
+                                            column_names=self.column_names, backend=self.backend,
+                                            label=self.label, rejects=self.rejects))
+
+    def merge(self):
+        """Applies the staged rows to the table."""
+        if not self._created:
+            return
+        with stage('merge', rows=self.result.rows):
+            self._execute(self.backend.merge_sql(self.table_name, self.name, self.column_names, self.key_columns))
+        prefix = f"[{self.label}] " if self.label else ""
+        logging.info(f"{prefix}Merged {self.result.rows} rows into '{self.table_name}' via {self.name}.")
+
+    def close(self):
+        if self._created:
+            self._execute([self.backend.drop_staging_sql(self.name)])
+            self._created = False
+
+
+def delta_upload(cnxn, chunks, table_name, column_names, key_columns=(), batch_size=DEFAULT_BATCH_SIZE,
+                 backend=None, label=None, rejects=None, sizer=None, target=None, directory=DELTA_DIR,
+                 reset=False):
+    """
+    Uploads only the new and changed rows of an iterable of DataFrame chunks
+    to table_name, comparing against the table's row-hash index (kept per
+    target under directory; reset=True starts it afresh). New rows are
+    streamed straight into the table. Changed rows (only possible with
+    key_columns) are loaded into a staging table, batch_size rows or more at
+    a time as they arrive, and merged once the new ones are in. With
+    key_columns and an empty index every row goes through the merge, so
+    rows the table already holds are updated rather than duplicated. A row
+    repeating a key sent earlier in the same load is not sent; it is
+    written to rejects and counted as failed. Returns an UploadResult whose
+    skipped count holds the unchanged rows.
+    """
+    backend = backend or Backend()
+    key_columns = [sanitize_column_name(key) for key in key_columns]
+    path = index_path_for(table_name, target, directory)
+    index = RowHashIndex(path, key_columns) if reset else RowHashIndex.load(path, key_columns)
+    repeated = UploadResult()
+    prefix = f"[{label}] " if label else ""
+
+    def reject_repeated(rows):
+        for row_label, values in zip(rows.index, dataframe_to_rows(rows)):
+            _reject_row(rejects, column_names, row_label, values, DUPLICATE_KEY_ERROR, prefix)
+        repeated.failed += len(rows)
+        repeated.rejected.extend(rows.index)
+
+    delta = DeltaFilter(index, column_names, key_columns, on_duplicate=reject_repeated)
+    merge_all = bool(key_columns) and not len(index)
+    staging = StagingTable(cnxn, table_name, column_names, key_columns, batch_size, backend, label, rejects)
+    held = [] # Changed rows not yet in the staging table
+    progress = {'through': -1}
+
+    def stage_held(minimum=1):
+        if sum(len(part) for part in held) >= minimum:
+            staging.add(pd.concat(held))
+            held.clear()
+
+    def split(chunk):
+        """Stages the changed rows of chunk (all its rows while merging all) and returns the new ones."""
+        new, changed = delta.split(chunk)
+        if merge_all:
+            new, changed = new.iloc[:0], new
+        if len(changed):
+            held.append(changed)
+            stage_held(batch_size)
+        return new
+
+    def new_rows():
+        for chunk in chunks:
+            new = split(chunk)
+            if len(new):
+                yield new
+
+    def on_commit(df, next_row):
+        progress['through'] = next_row
+
+    logging.info(f"{prefix}Delta load into '{table_name}' against {len(index):,} indexed rows"
+                 f"{f' keyed on {key_columns}' if key_columns else ''}"
+                 f"{'; merging every row until the index is built' if merge_all else ''}.")
+    result = UploadResult()
+    try:
+        if merge_all:
+            for chunk in chunks:
+                split(chunk)
+        else:
+            try:
+                upload_chunks(cnxn, new_rows(), table_name, column_names, batch_size=batch_size, backend=backend,
+                              label=label, on_commit=on_commit, rejects=rejects, sizer=sizer, result=result)
+            finally:
+                # Also after a failure: whatever was committed must not be sent again
+                delta.record('new', progress['through'], result.rejected)
+                index.save()
+        stage_held()
+        staging.merge()
+    finally:
+        staging.close()
+
+    result.merge(staging.result)
+    result.merge(repeated)
+    delta.record('new' if merge_all else 'changed', rejected=staging.result.rejected)
+    index.save()
+    result.skipped = delta.unchanged
+    if delta.duplicates:
+        logging.warning(f"{prefix}{delta.duplicates} rows repeat a key already sent in this load and were rejected.")
+    logging.info(f"{prefix}Delta load into '{table_name}': {result.rows} rows sent "
+                 f"({staging.result.rows} merged), {result.skipped} unchanged skipped, {result.failed} failed.")
+    return result
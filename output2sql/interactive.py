@@ -0,0 +1,660 @@
+# output2sql/interactive.py
+#
+"""
+The interactive loader: lists the data files in the current directory,
+infers the chosen file's record format, writes the CREATE TABLE snippet and,
+once the table exists, uploads the records. Run with python -m output2sql
+(or either of the output2sql-*.py scripts); given file patterns, the same
+command runs headless batch mode instead (see output2sql.batch).
+
+Startup stays fast because only light modules are imported up front.
+pandas, NumPy and the engine modules built on them are imported by the
+functions that need them, once the user has picked a file, and a database
+driver (pyodbc, psycopg2) only when the upload connects. The file list
+appears within milliseconds, and a run the user answers "n" to never
+touches the server.
+"""
+import logging
+import os
+import sys
+from datetime import datetime
+
+from output2sql.adaptive import AdaptiveBatchSizer
+from output2sql.backends import driver_errors, get_backend
+from output2sql.checkpoint import Checkpoint
+from output2sql.compressed import COMPRESSION_CODECS, data_extension, estimated_data_size, is_compressed
+from output2sql.config import UPLOAD_TARGET
+from output2sql.metrics import (get_metrics, is_metrics_file, metrics_path_for, profile_run, stage, start_run,
+                                write_metrics)
+from output2sql.rejects import RejectFile, is_reject_file, reject_path_for
+
+# --- Configuration ---
+LOG_FILE_NAME = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+METRICS_FILE_NAME = metrics_path_for(LOG_FILE_NAME) # Per-stage timings, commit latencies, peak RSS
+PROFILE_FILE_NAME = None # e.g. LOG_FILE_NAME.replace('.log', '.prof') to dump cProfile stats for the run
+BULK_INSERT_STAGING_DIR = None # Directory shared with SQL Server; when set, batches are loaded with BULK INSERT
+BULK_INSERT_SERVER_DIR = None # The staging directory as seen by the server (e.g. a UNC path), if different
+UPLOAD_BATCH_SIZE = 1000 # Rows sent per bulk call (executemany, COPY or BULK INSERT); the starting point if adaptive
+ADAPTIVE_BATCHING = False # Tune batch size and commit interval from measured insert and commit latency
+ADAPTIVE_MIN_BATCH = 100 # Bounds for the tuned batch size
+ADAPTIVE_MAX_BATCH = 50000
+ADAPTIVE_MAX_COMMIT_ROWS = 500000 # Most rows left uncommitted at once
+TRANSACTION_LOG_BUDGET_BYTES = 256 * 1024 * 1024 # Most (estimated) data left uncommitted at once
+UPLOAD_WORKERS = 1 # Concurrent connections used for uploading; 1 uploads serially
+STREAM_CHUNK_SIZE = 50000 # Records read, coerced and uploaded per chunk in streaming mode
+STREAMING_THRESHOLD_BYTES = 100 * 1024 * 1024 # Files larger than this are streamed
+PARSE_PROCESSES = 1 # Processes parsing byte ranges of a CSV file in parallel, e.g. os.cpu_count(); 1 parses here
+PIPELINE_QUEUE_SIZE = 2 # Chunks buffered between the read, coerce and upload stages; 0 runs them in turn
+PIPELINE_ALL_FILES = False # Stream every file through the pipeline instead of reading it whole first
+SCHEMA_SAMPLE_ROWS = None # Records profiled to infer the schema; None profiles the whole file
+CACHE_SCHEMAS = True # Reuse the inferred schema while the file is unchanged (see python -m output2sql.cache)
+CACHE_PARSED_DATA = False # Also keep a copy of the coerced data (Parquet, else pickle) so repeat runs skip parsing
+COMPACT_DATAFRAMES = False # Categoricals for repetitive text, downcast numbers, Arrow strings; memory use is reported
+DELTA_LOAD = False # Send only records that are new or changed since the last load (row-hash index per table)
+DELTA_KEY_COLUMNS = None # e.g. ['name', 'address']: records with a known key and new values are merged (MERGE)
+EXPORT_SQL_SCRIPT = False # Instead of uploading, write the records into {table}.sql after the DDL, to run with sqlcmd
+EXPORT_TRANSACTION_STATEMENTS = 50 # INSERT statements (up to 1000 records each) per transaction; 0 for none
+EXPORT_SPLIT_BYTES = None # e.g. 512 * 1024 * 1024 to split the script into {table}.001.sql, {table}.002.sql, ...
+REJECT_FORMAT = 'csv' # Rejected records go to rejects/<table>__<file>.rejects.csv ('ndjson' also works)
+
+_parse_cache = None
+
+# --- Logging Setup ---
+def setup_logging():
+    """Sets up logging to a file and console."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE_NAME),
+            logging.StreamHandler()
+        ]
+    )
+    logging.info(f"Logging started. Log file: {LOG_FILE_NAME}")
+
+# --- File Operations ---
+def list_data_files():
+    """
+    Reads the current working directory and provides a numbered list
+    (alphabetical by filename) of all .csv and .json files, including
+    compressed ones (e.g. .csv.gz, .json.zst), which are read without
+    being decompressed to disk.
+    """
+    logging.info("Scanning current directory for .csv and .json files...")
+    files = [f for f in os.listdir('.')
+             if data_extension(f) in ('.csv', '.json') and not is_metrics_file(f) and not is_reject_file(f)
+             and os.path.isfile(f)]
+    files.sort()
+
+    if not files:
+        logging.warning("No .csv or .json files found in the current directory.")
+        return []
+
+    print(f"\nAvailable .csv and .json files ({', '.join(COMPRESSION_CODECS)} compressed too):")
+    for i, file in enumerate(files):
+        print(f"{i + 1}. {file}")
+    logging.info(f"Found {len(files)} data files.")
+    return files
+
+def select_file(files):
+    """Asks the user to select a file from the list."""
+    while True:
+        try:
+            choice = int(input("Enter the number of the file you want to process: "))
+            if 1 <= choice <= len(files):
+                selected_file = files[choice - 1]
+                logging.info(f"User selected file: {selected_file}")
+                return selected_file
+            else:
+                print("Invalid choice. Please enter a number within the range.")
+        except ValueError:
+            print("Invalid input. Please enter a number.")
+
+# --- Schema Inference ---
+def get_parse_cache():
+    """The parse cache, created on first use."""
+    global _parse_cache
+    if _parse_cache is None:
+        from output2sql.cache import ParseCache
+        _parse_cache = ParseCache()
+    return _parse_cache
+
+def infer_schema(file_path):
+    """
+    Reads the file and determines the record format (column names and inferred types).
+    Every column is profiled in a single pass over the file (or over its first
+    SCHEMA_SAMPLE_ROWS records). Returns a dictionary mapping column names to
+    ColumnProfiles, which carry the inferred Python type and a sized SQL type.
+    """
+    from output2sql.schema import profile_file
+
+    logging.info(f"Inferring schema for file: {file_path}")
+    parse_cache = get_parse_cache()
+
+    try:
+        schema = parse_cache.load_schema(file_path, SCHEMA_SAMPLE_ROWS) if CACHE_SCHEMAS else None
+        if schema is None:
+            schema = profile_file(file_path, sample_rows=SCHEMA_SAMPLE_ROWS, chunk_size=STREAM_CHUNK_SIZE,
+                                  processes=PARSE_PROCESSES)
+            if schema and CACHE_SCHEMAS:
+                parse_cache.store_schema(file_path, schema, SCHEMA_SAMPLE_ROWS)
+        if not schema:
+            raise ValueError("No columns found in file.")
+
+        column_types = {col: profile.sql_definition() for col, profile in schema.items()}
+        logging.info(f"Inferred schema for {file_path}: {column_types}")
+        return schema
+
+    except Exception as e:
+        logging.error(f"Error inferring schema for {file_path}: {e}", exc_info=True)
+        print(f"Error inferring schema: {e}")
+        return None
+
+def display_schema(schema):
+    """Displays the inferred record format to the user."""
+    if not schema:
+        return
+
+    print("\n--- Inferred Record Format ---")
+    for column, profile in schema.items():
+        print(f"  {column}: {profile.py_type.__name__} ({profile.sql_definition()})")
+    print("----------------------------")
+    logging.info("Displayed inferred schema to user.")
+
+# --- SQL Snippet Generation ---
+def read_text(file_path):
+    """Returns the contents of a text file."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def generate_create_table_sql(file_path, schema):
+    """
+    Creates a SQL snippet to create a table using the filename for the table name.
+    Column types are sized from the profiled data (e.g. SMALLINT, DECIMAL(p, s),
+    VARCHAR(n), DATE) and NOT NULL is added where the whole file had no nulls.
+    """
+    from output2sql.schema import sanitize_column_name, table_name_for_file
+
+    if not schema:
+        return None, None
+
+    table_name = table_name_for_file(file_path)
+    logging.info(f"Generating CREATE TABLE SQL for table: {table_name}")
+
+    columns_sql = []
+    for column_name, profile in schema.items():
+        sql_type = profile.sql_definition()
+        # Sanitize column name for SQL (e.g., replace spaces, special chars)
+        sanitized_column_name = f"[{sanitize_column_name(column_name)}]"
+        columns_sql.append(f"{sanitized_column_name} {sql_type}")
+
+    create_table_sql = f"CREATE TABLE {table_name} (\n    " + ",\n    ".join(columns_sql) + "\n);"
+    sql_file_name = f"{table_name}.sql"
+
+    try:
+        if os.path.exists(sql_file_name) and read_text(sql_file_name) == create_table_sql:
+            logging.info(f"SQL CREATE TABLE snippet in {sql_file_name} is unchanged")
+            print(f"\nSQL CREATE TABLE snippet unchanged in {sql_file_name}")
+        else:
+            with open(sql_file_name, 'w', encoding='utf-8') as f:
+                f.write(create_table_sql)
+            logging.info(f"SQL CREATE TABLE snippet written to {sql_file_name}")
+            print(f"\nSQL CREATE TABLE snippet generated and saved to {sql_file_name}")
+        print("\n--- Generated SQL CREATE TABLE Snippet ---")
+        print(create_table_sql)
+        print("------------------------------------------")
+        return create_table_sql, table_name
+    except Exception as e:
+        logging.error(f"Error writing SQL snippet to file: {e}", exc_info=True)
+        print(f"Error writing SQL snippet: {e}")
+        return None, None
+
+# --- Data Loading and Upload ---
+def get_upload_backend():
+    """Returns the bulk-load backend for UPLOAD_TARGET (the fastest loader for that database)."""
+    return get_backend(UPLOAD_TARGET, staging_dir=BULK_INSERT_STAGING_DIR,
+                       server_staging_dir=BULK_INSERT_SERVER_DIR)
+
+def get_batch_sizer():
+    """Returns the adaptive batch and commit sizing controller, or None when ADAPTIVE_BATCHING is off."""
+    if not ADAPTIVE_BATCHING:
+        return None
+    return AdaptiveBatchSizer(UPLOAD_BATCH_SIZE, ADAPTIVE_MIN_BATCH, ADAPTIVE_MAX_BATCH,
+                              ADAPTIVE_MAX_COMMIT_ROWS, TRANSACTION_LOG_BUDGET_BYTES)
+
+def report_compaction(report):
+    """Logs the per-column memory footprint and prints the total before and after compaction."""
+    logging.info(f"DataFrame memory footprint by column:\n{report.format_table()}")
+    print(f"DataFrame memory footprint: {report.summary()}.")
+
+def read_data_to_dataframe(file_path, schema):
+    """
+    Reads the data from the file and creates a compatible pandas DataFrame.
+    An unchanged file that was parsed before is loaded from the parse cache.
+    CSV files are split into byte ranges parsed in PARSE_PROCESSES processes.
+    With COMPACT_DATAFRAMES the columns are converted to compact types and
+    the memory footprint before and after is reported.
+    """
+    import pandas as pd
+    from output2sql.compact import compact_dataframe
+    from output2sql.parallelcsv import read_csv_parallel
+    from output2sql.readers import coerce_dataframe, read_file
+
+    logging.info(f"Reading data from {file_path} into DataFrame...")
+    parse_cache = get_parse_cache()
+    file_extension = data_extension(file_path)
+    df = None
+
+    try:
+        df = parse_cache.load_data(file_path, SCHEMA_SAMPLE_ROWS) if CACHE_PARSED_DATA else None
+        if df is not None:
+            print(f"Using the cached copy of {file_path}; it has not changed since it was last parsed.")
+        else:
+            if file_extension == '.csv' and PARSE_PROCESSES > 1:
+                # Byte ranges of the file parsed and coerced in worker processes, in file order
+                df = read_csv_parallel(file_path, schema, chunk_size=STREAM_CHUNK_SIZE, processes=PARSE_PROCESSES)
+
+            elif file_extension == '.csv':
+                # Read CSV, ensuring all columns are read as strings initially
+                # Then convert to inferred types
+                df = pd.read_csv(file_path, dtype=str, encoding='utf-8')
+                coerce_dataframe(df, schema, source=file_path)
+
+            elif file_extension == '.json':
+                # Single pass through the streaming reader, coerced to the inferred schema
+                df = read_file(file_path, schema, chunk_size=STREAM_CHUNK_SIZE)
+            else:
+                raise ValueError(f"Unsupported file type: {file_extension}")
+
+            if COMPACT_DATAFRAMES:
+                report_compaction(compact_dataframe(df))
+            if CACHE_PARSED_DATA:
+                parse_cache.store_data(file_path, df, SCHEMA_SAMPLE_ROWS)
+
+        logging.info(f"Successfully read {len(df)} records into DataFrame from {file_path}.")
+        return df
+
+    except Exception as e:
+        logging.error(f"Error reading data into DataFrame from {file_path}: {e}", exc_info=True)
+        print(f"Error reading data into DataFrame: {e}")
+        return None
+
+def raise_worker_errors(result):
+    """
+    Raises a RuntimeError naming the first failure if any slice of a pooled
+    upload failed, so the load is reported as failed and its checkpoint is
+    not marked complete.
+    """
+    for error in result.errors:
+        logging.error(f"Upload worker error: {error}")
+    if result.errors:
+        raise RuntimeError(f"{len(result.errors)} of {UPLOAD_WORKERS} upload workers failed "
+                           f"after {result.rows} records were committed: {result.errors[0]}")
+
+def upload_dataframe_to_sql(df, table_name, checkpoint=None, rejects=None):
+    """
+    Uploads the DataFrame data to the specified SQL Server table in batches
+    of UPLOAD_BATCH_SIZE records, committing after every batch, or with
+    ADAPTIVE_BATCHING in batches and transactions sized to the measured
+    throughput. With UPLOAD_WORKERS > 1 the DataFrame is split into that
+    many slices which are inserted concurrently over separate connections;
+    their commits are not checkpointed, and a failed slice fails the upload.
+    With DELTA_LOAD only new and changed records are sent, over one
+    connection. A serial upload records its progress in checkpoint after
+    every commit. Records the server rejects are written to rejects (a
+    RejectFile), which is closed at the end.
+    """
+    from output2sql.delta import delta_upload
+    from output2sql.pool import parallel_upload, split_dataframe
+    from output2sql.schema import sanitize_column_name
+    from output2sql.upload import upload_in_batches
+
+    if df is None or df.empty:
+        logging.warning("No data in DataFrame to upload.")
+        print("No data to upload.")
+        return 0
+
+    logging.info(f"Attempting to connect to SQL Server and upload {len(df)} records to table '{table_name}'.")
+    cnxn = None
+
+    try:
+        column_names = [sanitize_column_name(col) for col in df.columns]
+        backend = get_upload_backend()
+        if DELTA_LOAD:
+            cnxn = backend.connect()
+            result = delta_upload(cnxn, [df], table_name, column_names, key_columns=DELTA_KEY_COLUMNS or (),
+                                  batch_size=UPLOAD_BATCH_SIZE, backend=backend, rejects=rejects,
+                                  sizer=get_batch_sizer(), target=UPLOAD_TARGET)
+        elif UPLOAD_WORKERS > 1:
+            result = parallel_upload(backend.connect, split_dataframe(df, UPLOAD_WORKERS), table_name,
+                                     column_names, workers=UPLOAD_WORKERS, batch_size=UPLOAD_BATCH_SIZE,
+                                     backend=backend, rejects=rejects, sizer=get_batch_sizer())
+            raise_worker_errors(result)
+        else:
+            cnxn = backend.connect()
+            result = upload_in_batches(cnxn, df, table_name, batch_size=UPLOAD_BATCH_SIZE,
+                                       column_names=column_names, backend=backend,
+                                       on_commit=checkpoint.record if checkpoint else None, rejects=rejects,
+                                       sizer=get_batch_sizer())
+        if checkpoint:
+            checkpoint.mark_complete()
+
+        logging.info(f"Successfully uploaded total of {result.rows} records to table '{table_name}' "
+                     f"({result.rows_per_sec:,.0f} rows/sec).")
+        print(f"\nSuccessfully uploaded a total of {result.rows} records to table '{table_name}' "
+              f"({result.rows_per_sec:,.0f} rows/sec).")
+        if result.skipped:
+            print(f"{result.skipped} records were unchanged since the last load and were skipped.")
+        if result.failed:
+            print(f"{result.failed} records could not be inserted; "
+                  f"see {rejects.path if rejects else LOG_FILE_NAME} for details.")
+        return result.rows
+
+    except driver_errors() as e:
+        logging.error(f"SQL Server connection or operation error: {e}", exc_info=True)
+        print(f"SQL Server connection or operation error: {e}")
+        return 0
+    except Exception as e:
+        logging.error(f"An unexpected error occurred during upload: {e}", exc_info=True)
+        print(f"An unexpected error occurred: {e}")
+        return 0
+    finally:
+        if cnxn:
+            cnxn.close()
+        if rejects:
+            rejects.close()
+        logging.info("SQL Server connection closed.")
+
+def iter_chunks(file_path, schema, resume_arguments=None):
+    """
+    The file's chunks of STREAM_CHUNK_SIZE records, coerced to the schema.
+    With PARSE_PROCESSES above 1 CSV files are parsed in that many worker
+    processes, which run ahead of the caller, so no pipeline threads are
+    needed; otherwise, with PIPELINE_QUEUE_SIZE set, reading and coercion
+    run ahead in background threads.
+    """
+    from output2sql.parallelcsv import iter_parallel_csv_chunks
+    from output2sql.pipeline import iter_pipelined_chunks
+    from output2sql.readers import iter_file_chunks
+
+    resume_arguments = resume_arguments or {}
+    if PARSE_PROCESSES > 1 and data_extension(file_path) == '.csv':
+        return iter_parallel_csv_chunks(file_path, schema, chunk_size=STREAM_CHUNK_SIZE,
+                                        processes=PARSE_PROCESSES, **resume_arguments)
+    if PIPELINE_QUEUE_SIZE > 0:
+        return iter_pipelined_chunks(file_path, schema, chunk_size=STREAM_CHUNK_SIZE,
+                                     queue_size=PIPELINE_QUEUE_SIZE, **resume_arguments)
+    return iter_file_chunks(file_path, schema, chunk_size=STREAM_CHUNK_SIZE, **resume_arguments)
+
+def stream_file_to_sql(file_path, schema, table_name, checkpoint=None, rejects=None):
+    """
+    Streaming mode for large CSV and JSON files: reads, coerces and uploads
+    STREAM_CHUNK_SIZE records at a time so memory stays flat regardless of
+    file size, reporting progress after every chunk. With PARSE_PROCESSES
+    above 1 CSV files are parsed in that many worker processes; otherwise,
+    with PIPELINE_QUEUE_SIZE set, reading and coercion run ahead of the
+    upload in background threads. Either way parsing and inserting overlap.
+    With a checkpoint the file is read from its last committed record
+    onwards, and a serial upload keeps the checkpoint up to date after every
+    commit; a pooled upload (UPLOAD_WORKERS > 1) fails if any worker does,
+    leaving the checkpoint incomplete. With DELTA_LOAD the
+    whole file is read and only new and changed records are sent. Rejected
+    records are written to rejects.
+    """
+    from output2sql.delta import delta_upload
+    from output2sql.pool import parallel_upload
+    from output2sql.schema import sanitize_column_name
+    from output2sql.upload import upload_chunks
+
+    logging.info(f"Streaming {file_path} to table '{table_name}' in chunks of {STREAM_CHUNK_SIZE} records.")
+    cnxn = None
+
+    try:
+        column_names = [sanitize_column_name(col) for col in schema]
+        resume_arguments = checkpoint.resume_arguments() if checkpoint and not DELTA_LOAD else {}
+        chunks = iter_chunks(file_path, schema, resume_arguments)
+        backend = get_upload_backend()
+        if DELTA_LOAD:
+            cnxn = backend.connect()
+            result = delta_upload(cnxn, chunks, table_name, column_names, key_columns=DELTA_KEY_COLUMNS or (),
+                                  batch_size=UPLOAD_BATCH_SIZE, backend=backend, rejects=rejects,
+                                  sizer=get_batch_sizer(), target=UPLOAD_TARGET)
+        elif UPLOAD_WORKERS > 1:
+            result = parallel_upload(backend.connect, chunks, table_name, column_names,
+                                     workers=UPLOAD_WORKERS, batch_size=UPLOAD_BATCH_SIZE, backend=backend,
+                                     rejects=rejects, sizer=get_batch_sizer())
+            raise_worker_errors(result)
+        else:
+            cnxn = backend.connect()
+            result = upload_chunks(cnxn, chunks, table_name, column_names,
+                                   batch_size=UPLOAD_BATCH_SIZE, backend=backend,
+                                   on_commit=checkpoint.record if checkpoint else None, rejects=rejects,
+                                   sizer=get_batch_sizer())
+        if checkpoint:
+            checkpoint.mark_complete()
+
+        logging.info(f"Successfully streamed total of {result.rows} records to table '{table_name}' "
+                     f"({result.rows_per_sec:,.0f} rows/sec).")
+        print(f"\nSuccessfully uploaded a total of {result.rows} records to table '{table_name}' "
+              f"({result.rows_per_sec:,.0f} rows/sec).")
+        if result.skipped:
+            print(f"{result.skipped} records were unchanged since the last load and were skipped.")
+        if result.failed:
+            print(f"{result.failed} records could not be inserted; "
+                  f"see {rejects.path if rejects else LOG_FILE_NAME} for details.")
+        return result.rows
+
+    except driver_errors() as e:
+        logging.error(f"SQL Server connection or operation error: {e}", exc_info=True)
+        print(f"SQL Server connection or operation error: {e}")
+        return 0
+    except Exception as e:
+        logging.error(f"An unexpected error occurred during streaming upload: {e}", exc_info=True)
+        print(f"An unexpected error occurred: {e}")
+        return 0
+    finally:
+        if cnxn:
+            cnxn.close()
+        if rejects:
+            rejects.close()
+        logging.info("SQL Server connection closed.")
+
+def export_file_to_sql_script(file_path, schema, table_name, create_sql):
+    """
+    Offline mode for targets that can only be loaded by running a script:
+    streams the file, STREAM_CHUNK_SIZE records at a time, into the
+    {table_name}.sql script after its CREATE TABLE statement, as multi-row
+    INSERT statements grouped into transactions of
+    EXPORT_TRANSACTION_STATEMENTS (split into numbered parts of
+    EXPORT_SPLIT_BYTES if set). Returns the number of records written.
+    """
+    from output2sql.schema import sanitize_column_name
+    from output2sql.sqlexport import export_chunks
+
+    try:
+        column_names = [sanitize_column_name(col) for col in schema]
+        chunks = iter_chunks(file_path, schema)
+        backend = get_upload_backend()
+        result = export_chunks(chunks, f"{table_name}.sql", table_name, column_names,
+                               backend=backend, header=create_sql,
+                               transaction_statements=EXPORT_TRANSACTION_STATEMENTS,
+                               split_bytes=EXPORT_SPLIT_BYTES)
+        print(f"\nExported {result.rows} records as {result.statements} INSERT statements to "
+              f"{', '.join(result.paths)} ({result.rows_per_sec:,.0f} rows/sec).")
+        if backend.batch_separator:
+            print(f"Run it on the server with sqlcmd, e.g.: sqlcmd -S <server> -d <database> -i {result.paths[0]}")
+        return result.rows
+    except Exception as e:
+        logging.error(f"An unexpected error occurred during SQL script export: {e}", exc_info=True)
+        print(f"An unexpected error occurred: {e}")
+        return 0
+
+# --- Main Program Flow ---
+def ask_yes_no(prompt):
+    """Asks a y/n question until a valid answer is given; returns 'y' or 'n'."""
+    while True:
+        response = input(prompt).lower()
+        if response in ['y', 'n']:
+            return response
+        print("Invalid response. Please enter 'y' or 'n'.")
+
+def main():
+    setup_logging()
+    logging.info("Starting output2sql.py program.")
+
+    # 1) Read the current working directory and provide a numbered list
+    with stage('list_data_files'):
+        files = list_data_files()
+    if not files:
+        print("Exiting. No data files found.")
+        logging.info("No data files found. Exiting.")
+        return
+
+    selected_file = select_file(files)
+    if not selected_file:
+        print("No file selected. Exiting.")
+        logging.info("No file selected. Exiting.")
+        return
+
+    # 2) Read the file and determine the record format and display it
+    get_metrics().set_value('file', selected_file)
+    get_metrics().set_value('file_bytes', os.path.getsize(selected_file))
+    with stage('infer_schema', nbytes=os.path.getsize(selected_file)):
+        inferred_schema = infer_schema(selected_file)
+    if not inferred_schema:
+        print("Could not determine file schema. Exiting.")
+        logging.error("Could not determine file schema. Exiting.")
+        return
+
+    display_schema(inferred_schema)
+
+    # 3) Ask the user to press any key to continue
+    input("\nPress Enter to continue with SQL snippet generation...")
+    logging.info("User pressed Enter to continue.")
+
+    # 4) Create a SQL snippet to create a table
+    create_sql, table_name = generate_create_table_sql(selected_file, inferred_schema)
+    if not create_sql:
+        print("Could not generate SQL CREATE TABLE snippet. Exiting.")
+        logging.error("Could not generate SQL CREATE TABLE snippet. Exiting.")
+        return
+
+    # Offline targets get the data in the script as well, instead of an upload
+    if EXPORT_SQL_SCRIPT:
+        with stage('export_file_to_sql_script', nbytes=os.path.getsize(selected_file)) as call:
+            call.rows = export_file_to_sql_script(selected_file, inferred_schema, table_name, create_sql)
+        logging.info(f"SQL script export completed. {call.rows} records exported.")
+        logging.info("output2sql.py program finished.")
+        return
+
+    # 5) Ask the user if the table has been created on the sql server
+    while True:
+        table_created_response = input("\nHas the table been created on the SQL server? (y/n): ").lower()
+        if table_created_response in ['y', 'n']:
+            break
+        else:
+            print("Invalid response. Please enter 'y' or 'n'.")
+
+    if table_created_response == 'n':
+        print("Please create the table on the SQL server first using the generated SQL snippet.")
+        print("Exiting without data upload.")
+        logging.info("User indicated table not created. Exiting without data upload.")
+        return
+
+    get_metrics().set_value('table', table_name)
+
+    # An earlier load of this file that stopped part way can pick up where it left off
+    checkpoint = Checkpoint.load(selected_file, table_name)
+    resume = False
+    if checkpoint.resumable and UPLOAD_WORKERS > 1 and not DELTA_LOAD:
+        # Pooled slices commit out of order, so there is no single record to resume after
+        print(f"\nA previous upload of {selected_file} to '{table_name}' stopped after "
+              f"{checkpoint.rows_committed} records, but uploads with UPLOAD_WORKERS > 1 cannot resume; "
+              f"starting from the beginning.")
+        logging.info(f"Checkpoint found at record {checkpoint.rows_committed}; not resumable with "
+                     f"{UPLOAD_WORKERS} upload workers.")
+    elif checkpoint.resumable:
+        print(f"\nA previous upload of {selected_file} to '{table_name}' stopped after "
+              f"{checkpoint.rows_committed} records (last update {checkpoint.updated_at}).")
+        resume = ask_yes_no("Do you want to resume from there? (y/n): ") == 'y'
+        logging.info(f"Checkpoint found at record {checkpoint.rows_committed}; resume: {resume}.")
+    if not resume:
+        checkpoint.reset()
+    reject_path = reject_path_for(selected_file, table_name, fmt=REJECT_FORMAT)
+    if not resume and os.path.exists(reject_path):
+        os.remove(reject_path)
+    rejects = RejectFile(reject_path)
+
+    # Large (and resumed) files are streamed: read, coerced and uploaded chunk by chunk
+    file_size = os.path.getsize(selected_file)
+    data_size = estimated_data_size(selected_file) # Compressed files are judged by their (estimated) data size
+    if resume or PIPELINE_ALL_FILES or data_size > STREAMING_THRESHOLD_BYTES:
+        if resume or PIPELINE_ALL_FILES:
+            print(f"\n{selected_file} will be streamed from record {checkpoint.rows_committed + 1} "
+                  f"in chunks of {STREAM_CHUNK_SIZE} records.")
+        else:
+            print(f"\n{selected_file} holds {'about ' if is_compressed(selected_file) else ''}"
+                  f"{data_size / (1024 * 1024):,.0f} MB of data and will be streamed "
+                  f"in chunks of {STREAM_CHUNK_SIZE} records.")
+        logging.info(f"{selected_file} ({file_size} bytes) selected for streaming mode.")
+        if ask_yes_no("Do you want to proceed with uploading this data to the SQL table? (y/n): ") == 'y':
+            with stage('stream_file_to_sql', nbytes=file_size) as call:
+                uploaded_count = stream_file_to_sql(selected_file, inferred_schema, table_name, checkpoint, rejects)
+                call.rows = uploaded_count
+            logging.info(f"Data upload process completed. {uploaded_count} records uploaded.")
+            print(f"\nProgram finished. Total records uploaded: {uploaded_count}")
+        else:
+            print("User chose not to upload data. Exiting.")
+            logging.info("User chose not to upload data. Exiting.")
+        logging.info("output2sql.py program finished.")
+        return
+
+    # If 'y', read the data and create a compatible dataframe
+    with stage('read_data_to_dataframe', nbytes=file_size) as call:
+        df = read_data_to_dataframe(selected_file, inferred_schema)
+        call.rows = 0 if df is None else len(df)
+    if df is None:
+        print("Failed to read data into DataFrame. Exiting.")
+        logging.error("Failed to read data into DataFrame. Exiting.")
+        return
+
+    # 6) Advise the user of the number of records read into the dataframe
+    print(f"\n{len(df)} records read into the DataFrame.")
+    logging.info(f"{len(df)} records read into DataFrame.")
+
+    proceed_upload = ask_yes_no("Do you want to proceed with uploading this data to the SQL table? (y/n): ")
+
+    # 7) If the user responds 'y', upload the data
+    if proceed_upload == 'y':
+        with stage('upload_dataframe_to_sql') as call:
+            uploaded_count = upload_dataframe_to_sql(df, table_name, checkpoint, rejects)
+            call.rows = uploaded_count
+        logging.info(f"Data upload process completed. {uploaded_count} records uploaded.")
+        print(f"\nProgram finished. Total records uploaded: {uploaded_count}")
+    else:
+        print("User chose not to upload data. Exiting.")
+        logging.info("User chose not to upload data. Exiting.")
+
+    logging.info("output2sql.py program finished.")
+
+def run(argv=None):
+    """
+    Entry point of python -m output2sql and the output2sql-*.py scripts:
+    batch mode when file patterns are given, otherwise the interactive
+    loader. Returns the exit status.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        # File patterns given on the command line: run headless batch mode instead
+        from output2sql.batch import main as batch_main
+        return batch_main(argv)
+    start_run('output2sql')
+    try:
+        with profile_run(PROFILE_FILE_NAME):
+            main()
+    finally:
+        write_metrics(METRICS_FILE_NAME)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
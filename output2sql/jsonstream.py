@@ -0,0 +1,120 @@
+# output2sql/jsonstream.py
+#
+"""
+Incremental JSON record reader.
+
+Handles the three layouts our exports come in without loading the whole file:
+  - array:         [ {...}, {...}, ... ]
+  - ndjson:        one object per line (e.g. contacts1.json)
+  - concatenated:  pretty-printed objects back to back (e.g. car_data2.json)
+
+The file is read in fixed-size text blocks and objects are decoded one at a
+time with json.JSONDecoder.raw_decode, so memory is bounded by the block size
+plus the batch being built.
+"""
+import io
+import json
+import logging
+import re
+from itertools import islice
+
+from output2sql.compressed import open_data
+
+# --- Configuration ---
+READ_BLOCK_SIZE = 1024 * 1024 # Characters read from the file per refill
+LAYOUT_PROBE_SIZE = 64 * 1024 # Characters inspected to detect the layout
+
+ARRAY = 'array'
+NDJSON = 'ndjson'
+CONCATENATED = 'concatenated'
+
+_SEPARATORS = re.compile(r'[\s,]*')
+_decoder = json.JSONDecoder()
+
+
+def detect_json_layout(file_path):
+    """
+    Looks at the head of the file and returns ARRAY, NDJSON or CONCATENATED.
+    A file whose first line is a complete JSON object is treated as NDJSON.
+    """
+    with open_data(file_path, text=True) as f:
+        head = f.read(LAYOUT_PROBE_SIZE)
+
+    stripped = head.lstrip()
+    if stripped.startswith('['):
+        return ARRAY
+    if not stripped.startswith('{'):
+        raise ValueError("Unsupported JSON structure. Expected an array of objects or a stream of objects.")
+
+    first_line = stripped.split('\n', 1)[0].strip()
+    try:
+        json.loads(first_line)
+        return NDJSON
+    except json.JSONDecodeError:
+        return CONCATENATED
+
+
+def iter_json_records(file_path, start_offset=None, with_offsets=False):
+    """
+    Yields the objects in file_path one at a time, whatever the layout.
+    Separators between objects (whitespace, newlines, array commas) are skipped.
+
+    With with_offsets=True, (record, byte offset just past the record) pairs
+    are yielded instead; passing such an offset back as start_offset resumes
+    reading at the next record without scanning what came before.
+    """
+    layout = detect_json_layout(file_path)
+    logging.info(f"Reading {file_path} as {layout} JSON"
+                 f"{f' from byte {start_offset}' if start_offset else ''}.")
+
+    with open_data(file_path, start_offset or 0) as raw:
+        f = io.TextIOWrapper(raw, encoding='utf-8', newline='') # Keep CRLF so offsets count the bytes on disk
+        buf = f.read(READ_BLOCK_SIZE)
+        pos = _SEPARATORS.match(buf).end()
+        if layout == ARRAY and not start_offset:
+            pos = buf.index('[', pos) + 1
+        # buf[mark] is known to sit at byte mark_offset of the file
+        mark, mark_offset = 0, start_offset or 0
+        eof = False
+
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos >= len(buf) or (layout == ARRAY and buf[pos] == ']'):
+                if pos < len(buf) or eof:
+                    return
+            else:
+                try:
+                    record, pos = _decoder.raw_decode(buf, pos)
+                    if with_offsets:
+                        mark_offset += len(buf[mark:pos].encode('utf-8'))
+                        mark = pos
+                        yield record, mark_offset
+                    else:
+                        yield record
+                    continue
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # Object runs past the end of the buffer; read more below
+
+            block = f.read(READ_BLOCK_SIZE)
+            eof = not block
+            if with_offsets:
+                mark_offset += len(buf[mark:pos].encode('utf-8'))
+            buf = buf[pos:] + block
+            pos = mark = 0
+
+
+def iter_json_batches(file_path, batch_size):
+    """Yields lists of up to batch_size records from file_path."""
+    records = iter_json_records(file_path)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def sample_json_records(file_path, count):
+    """Returns the first count records, reading only as much of the file as needed."""
+    return list(islice(iter_json_records(file_path), count))
@@ -0,0 +1,270 @@
+# output2sql/metrics.py
+#
+"""
+Stage-level instrumentation and machine-readable run metrics.
+
+Code that does measurable work wraps it in stage():
+
+    with stage('coerce', rows=len(df)):
+        ...
+
+Each stage accumulates call count, wall time, CPU time of the calling
+thread, rows and bytes; latencies (e.g. every commit) go into histograms
+with observe(). Collection is process-wide, like logging, and thread-safe,
+so the pipeline and upload threads all report into the same run. At the end
+of a run write_metrics() stores everything, plus peak RSS, as one JSON file,
+and profile_run() optionally wraps the run in cProfile.
+"""
+import bisect
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# --- Configuration ---
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+METRICS_DIR = os.environ.get('OUTPUT2SQL_METRICS_DIR', os.path.join('.output2sql', 'metrics'))
+METRICS_SUFFIX = '.metrics.json'
+
+
+class StageStats:
+    """Totals for one named stage."""
+    __slots__ = ('calls', 'wall_seconds', 'cpu_seconds', 'rows', 'bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'wall_seconds': round(self.wall_seconds, 6),
+            'cpu_seconds': round(self.cpu_seconds, 6),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'rows_per_sec': round(self.rows / self.wall_seconds, 1) if self.rows and self.wall_seconds else None,
+            'bytes_per_sec': round(self.bytes / self.wall_seconds, 1) if self.bytes and self.wall_seconds else None,
+        }
+
+
+class Histogram:
+    """Latency histogram over LATENCY_BUCKETS_MS, with exact count, total, min and max."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def add(self, milliseconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, milliseconds)] += 1
+        self.count += 1
+        self.total_ms += milliseconds
+        self.min_ms = milliseconds if self.min_ms is None else min(self.min_ms, milliseconds)
+        self.max_ms = milliseconds if self.max_ms is None else max(self.max_ms, milliseconds)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations."""
+        if not self.count:
+            return None
+        threshold = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= threshold:
+                return round(min(bound, self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+    def to_dict(self):
+        labels = [f"<={bound}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else None,
+            'min_ms': self.min_ms and round(self.min_ms, 3),
+            'max_ms': self.max_ms and round(self.max_ms, 3),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets_ms': {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+
+class RunMetrics:
+    """Everything measured during one run."""
+
+    def __init__(self, name='output2sql'):
+        self.name = name
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self.stages = {}
+        self.histograms = {}
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, wall_seconds, cpu_seconds=0.0, rows=0, nbytes=0, calls=1):
+        with self._lock:
+            stats = self.stages.setdefault(name, StageStats())
+            stats.calls += calls
+            stats.wall_seconds += wall_seconds
+            stats.cpu_seconds += cpu_seconds
+            stats.rows += rows
+            stats.bytes += nbytes
+
+    def observe(self, name, seconds):
+        """Adds one latency observation (in seconds) to the named histogram."""
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).add(seconds * 1000)
+
+    def set_value(self, name, value):
+        """Records a free-form value for the run, e.g. the file loaded or the table name."""
+        with self._lock:
+            self.values[name] = value
+
+    def merge_stages(self, stages):
+        """Adds stage totals collected elsewhere (e.g. StageStats.to_dict() from a worker process)."""
+        for name, stats in stages.items():
+            self.add_stage(name, stats['wall_seconds'], stats['cpu_seconds'], stats['rows'], stats['bytes'],
+                           stats['calls'])
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'run': {
+                    'name': self.name,
+                    'started_at': self.started_at.isoformat(timespec='seconds'),
+                    'finished_at': datetime.now().isoformat(timespec='seconds'),
+                    'wall_seconds': round(time.perf_counter() - self._started, 6),
+                    'cpu_seconds': round(time.process_time() - self._cpu_started, 6),
+                    'peak_rss_bytes': peak_rss_bytes(),
+                    'peak_rss_children_bytes': peak_rss_bytes(children=True),
+                    'argv': sys.argv,
+                    **self.values,
+                },
+                'stages': {name: stats.to_dict() for name, stats in self.stages.items()},
+                'histograms': {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            }
+
+
+_current = RunMetrics()
+
+
+def start_run(name='output2sql'):
+    """Starts collecting into a fresh RunMetrics and returns it."""
+    global _current
+    _current = RunMetrics(name)
+    return _current
+
+
+def get_metrics():
+    return _current
+
+
+class StageCall:
+    """Rows and bytes handled by one call of a stage; the block may fill them in as it learns them."""
+    __slots__ = ('rows', 'bytes')
+
+    def __init__(self, rows=0, nbytes=0):
+        self.rows = rows
+        self.bytes = nbytes
+
+
+@contextmanager
+def stage(name, rows=0, nbytes=0):
+    """
+    Times the enclosed block as one call of the named stage. Yields a
+    StageCall whose rows and bytes are added to the stage's totals.
+    """
+    call = StageCall(rows, nbytes)
+    started, cpu_started = time.perf_counter(), time.thread_time()
+    try:
+        yield call
+    finally:
+        _current.add_stage(name, time.perf_counter() - started, time.thread_time() - cpu_started,
+                           call.rows, call.bytes)
+
+
+def observe(name, seconds):
+    _current.observe(name, seconds)
+
+
+def peak_rss_bytes(children=False):
+    """
+    Peak resident set size of this process, or with children=True of the
+    largest finished child process (e.g. a parse worker), or None where it
+    cannot be read.
+    """
+    if not children and os.path.exists('/proc/self/status'):
+        # VmHWM starts afresh in a new program; ru_maxrss survives fork + exec on Linux
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024 # kilobytes on Linux
+    try:
+        import psutil
+    except ImportError:
+        return None
+    if children:
+        return None
+    memory = psutil.Process().memory_info()
+    return getattr(memory, 'peak_wset', memory.rss) # peak_wset on Windows
+
+
+def metrics_path_for(log_file, directory=METRICS_DIR):
+    """
+    Metrics file for the run logging to log_file, e.g.
+    .output2sql/metrics/20240101_120000.metrics.json. Kept out of the
+    working directory so the next run does not take it for a data file.
+    """
+    return os.path.join(directory, os.path.splitext(os.path.basename(log_file))[0] + METRICS_SUFFIX)
+
+
+def is_metrics_file(file_path):
+    """True for a metrics file written by write_metrics, which is JSON but not data to load."""
+    return file_path.lower().endswith(METRICS_SUFFIX)
+
+
+def write_metrics(path, metrics=None):
+    """Writes the run's metrics as JSON to path and returns the path."""
+    state = (metrics or _current).to_dict()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, default=str)
+    logging.info(f"Run metrics written to {path}.")
+    return path
+
+
+@contextmanager
+def profile_run(path):
+    """
+    Runs the enclosed block under cProfile and dumps the stats to path (for
+    pstats or snakeviz) when path is set. cProfile only sees the thread that
+    enters the block.
+    """
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logging.info(f"cProfile stats written to {path}.")
@@ -0,0 +1,232 @@
+# output2sql/parallelcsv.py
+#
+"""
+Parallel CSV parsing over memory-mapped byte ranges.
+
+pd.read_csv runs on one core, so a multi-GB file takes as long to parse as
+one core needs for it. Here the file is memory-mapped and cut into byte
+ranges of about chunk_size records, each ending on a record boundary; the
+ranges are parsed (and coerced, or profiled) in a process pool and the
+results handed back in file order, as the same chunks iter_csv_chunks
+yields: continuous row index, source_offset and source_first_row, so
+checkpoints and resume work unchanged.
+
+A newline inside a quoted field is not a record boundary, and a worker
+dropped at an arbitrary byte cannot tell whether it is inside quotes. The
+boundaries are therefore found up front, in this process: each cut point
+is moved forward to the first newline preceded by an even number of quotes
+since the previous boundary (doubled quotes inside fields keep the count
+even). Counting quotes runs at memory speed, a small fraction of parsing;
+files without any quote skip it.
+
+Files that come out as a single range are parsed in this process, so small
+files do not pay for starting a pool. Compressed files cannot be entered at
+a byte offset and are read by iter_csv_chunks.
+"""
+import io
+import logging
+import mmap
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+import pandas as pd
+
+from output2sql.compressed import is_compressed
+from output2sql.metrics import get_metrics, stage, start_run
+from output2sql.readers import (DEFAULT_CHUNK_SIZE, _estimate_record_bytes, _tag_chunk, coerce_dataframe,
+                                iter_csv_chunks, read_csv_header)
+from output2sql.schema import profile_dataframe
+
+# --- Configuration ---
+DEFAULT_PROCESSES = os.cpu_count() or 1
+IN_FLIGHT_PER_PROCESS = 2 # Ranges parsed ahead of the consumer, per process; bounds memory
+SCAN_BLOCK_BYTES = 64 * 1024 * 1024 # Bytes copied out of the map at a time when counting quotes
+
+
+# --- Record Boundaries ---
+def _count_quotes(mm, start, end):
+    count = 0
+    for block_start in range(start, end, SCAN_BLOCK_BYTES):
+        count += mm[block_start:min(block_start + SCAN_BLOCK_BYTES, end)].count(b'"')
+    return count
+
+
+def _next_record_end(mm, start, target, quoted):
+    """
+    Offset just past the first newline at or after target that ends a
+    record, given that start is a record boundary; len(mm) if there is none.
+    """
+    newline = mm.find(b'\n', target)
+    if not quoted:
+        return len(mm) if newline < 0 else newline + 1
+    inside = _count_quotes(mm, start, target) % 2
+    position = target
+    while newline >= 0:
+        inside ^= _count_quotes(mm, position, newline) % 2
+        if not inside:
+            return newline + 1
+        position = newline + 1
+        newline = mm.find(b'\n', position)
+    return len(mm)
+
+
+def split_csv_ranges(file_path, start_offset, range_bytes):
+    """
+    Cuts the file from start_offset (a record boundary) into (start, end)
+    byte ranges of at least range_bytes, each ending on a record boundary.
+    """
+    size = os.path.getsize(file_path)
+    if start_offset >= size:
+        return []
+    with stage('split', nbytes=size - start_offset) as call, open(file_path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        quoted = mm.find(b'"', start_offset) >= 0
+        ranges = []
+        start = start_offset
+        while start < size:
+            end = _next_record_end(mm, start, start + range_bytes, quoted) if start + range_bytes < size else size
+            ranges.append((start, end))
+            start = end
+        call.rows = len(ranges)
+    return ranges
+
+
+# --- Workers ---
+def _read_range(start, end, file_path, columns):
+    """The records in file_path[start:end] as a DataFrame of strings (None if there are none)."""
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    with stage('parse', nbytes=len(data)) as call:
+        try:
+            chunk = pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=str, encoding='utf-8')
+        except pd.errors.EmptyDataError:
+            return None # Nothing but blank lines
+        call.rows = len(chunk)
+    return chunk
+
+
+def _parse_range(start, end, file_path, columns, schema, coerce):
+    """Parses one byte range and coerces it to the schema unless coerce=False."""
+    chunk = _read_range(start, end, file_path, columns)
+    if chunk is not None and coerce:
+        coerce_dataframe(chunk, schema, source=file_path)
+    return chunk
+
+
+def _profile_range(start, end, file_path, columns):
+    """Profiles one byte range. Returns (profiles, records)."""
+    chunk = _read_range(start, end, file_path, columns)
+    if chunk is None:
+        return {}, 0
+    return profile_dataframe(chunk), len(chunk)
+
+
+def _run_range(task, start, end):
+    """Process-pool body: runs task on one range and returns (its result, the stage metrics it recorded)."""
+    metrics = start_run('range')
+    result = task(start, end)
+    return result, metrics.to_dict()['stages']
+
+
+def _map_ranges(task, ranges, processes):
+    """
+    Yields task(start, end) for every range, in order, merging the workers'
+    stage metrics into this run. At most IN_FLIGHT_PER_PROCESS ranges per
+    process are worked on ahead of the consumer; a single range, or a single
+    process, runs here without a pool.
+    """
+    if processes <= 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            yield task(start, end)
+        return
+    # Spawned, not forked: this runs in writer threads and in batch mode's own parse processes, and a forked
+    # child could inherit a lock (logging, stdout) held by another thread and hang on it
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(processes, len(ranges)), mp_context=context) as pool:
+        remaining = iter(ranges)
+        pending = deque(pool.submit(_run_range, task, start, end)
+                        for start, end in islice(remaining, processes * IN_FLIGHT_PER_PROCESS))
+        try:
+            while pending:
+                result, stages = pending.popleft().result()
+                get_metrics().merge_stages(stages)
+                following = next(remaining, None)
+                if following is not None:
+                    pending.append(pool.submit(_run_range, task, *following))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+# --- Readers ---
+def iter_parallel_csv_chunks(file_path, schema, chunk_size=DEFAULT_CHUNK_SIZE, start_offset=None, start_row=0,
+                             skip_rows=0, coerce=True, processes=DEFAULT_PROCESSES):
+    """
+    Drop-in replacement for readers.iter_csv_chunks that parses and coerces
+    the chunks in up to processes worker processes. Chunks are yielded in
+    file order with the same row index and source tags, and resume
+    arguments work the same way. Compressed files are read in one pass.
+    """
+    if is_compressed(file_path):
+        logging.info(f"{file_path} is compressed and cannot be split into byte ranges; reading it in one pass.")
+        yield from iter_csv_chunks(file_path, schema, chunk_size, start_offset, start_row, skip_rows, coerce)
+        return
+    columns, data_offset = read_csv_header(file_path)
+    offset = data_offset if start_offset is None else start_offset
+    range_bytes = chunk_size * _estimate_record_bytes(file_path, offset)
+    ranges = split_csv_ranges(file_path, offset, range_bytes)
+    logging.info(f"Parsing {file_path} as {len(ranges)} ranges of about {chunk_size} records "
+                 f"in up to {processes} processes"
+                 f"{f' from byte {offset}, row {start_row + skip_rows}' if start_offset is not None else ''}...")
+
+    row = start_row
+    task = partial(_parse_range, file_path=file_path, columns=columns, schema=schema, coerce=coerce)
+    results = _map_ranges(task, ranges, processes)
+    for (offset, _), chunk in zip(ranges, results):
+        if chunk is None:
+            continue
+        chunk.index = pd.RangeIndex(row, row + len(chunk))
+        row += len(chunk)
+        if skip_rows >= len(chunk):
+            skip_rows -= len(chunk)
+            continue
+        first_row = chunk.index[0]
+        if skip_rows:
+            chunk = chunk.iloc[skip_rows:].copy()
+            skip_rows = 0
+        yield _tag_chunk(chunk, offset, first_row)
+
+
+def read_csv_parallel(file_path, schema, chunk_size=DEFAULT_CHUNK_SIZE, processes=DEFAULT_PROCESSES):
+    """Reads the whole CSV file, parsed in parallel, into one DataFrame coerced to the schema."""
+    chunks = list(iter_parallel_csv_chunks(file_path, schema, chunk_size, processes=processes))
+    if not chunks:
+        return pd.DataFrame(columns=list(schema))
+    return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def profile_csv_parallel(file_path, chunk_size=DEFAULT_CHUNK_SIZE, processes=DEFAULT_PROCESSES):
+    """
+    Profiles every column of a CSV file with the ranges spread over up to
+    processes worker processes, merging the per-range profiles. Returns
+    (profiles in file order, records profiled).
+    """
+    columns, data_offset = read_csv_header(file_path)
+    range_bytes = chunk_size * _estimate_record_bytes(file_path, data_offset)
+    ranges = split_csv_ranges(file_path, data_offset, range_bytes)
+    profiles = {}
+    rows_seen = 0
+    task = partial(_profile_range, file_path=file_path, columns=columns)
+    for range_profiles, rows in _map_ranges(task, ranges, processes):
+        for col, profile in range_profiles.items():
+            if col in profiles:
+                profiles[col].merge(profile)
+            else:
+                profiles[col] = profile
+        rows_seen += rows
+    return profiles, rows_seen
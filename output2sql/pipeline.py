@@ -0,0 +1,137 @@
+# output2sql/pipeline.py
+#
+"""
+Pipelined reading, coercion and upload.
+
+Run one after another, the stages leave the CPU idle while the database
+works and the database idle while we parse. Here a reader thread parses raw
+chunks and a coercion thread converts them to the schema's types, each
+handing its output to the next stage through a bounded queue:
+
+    reader --[queue]--> coerce --[queue]--> writer (upload_chunks / parallel_upload)
+
+The writer is whatever consumes the chunk iterator, so parsing of chunk N+1
+overlaps with inserting chunk N. Database drivers and the pandas parsers
+release the GIL for most of their work, which is what makes threads enough.
+A full queue blocks the stage feeding it, so at most about
+2 * (queue_size + 1) chunks are in memory regardless of file size.
+"""
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+
+from output2sql.readers import DEFAULT_CHUNK_SIZE, coerce_dataframe, iter_file_chunks
+
+# --- Configuration ---
+DEFAULT_QUEUE_SIZE = 2 # Chunks waiting between two stages
+POLL_SECONDS = 0.1 # How often a blocked stage checks whether the pipeline was stopped
+
+_DONE = object() # End-of-stream marker passed down the queues
+
+
+@dataclass
+class StageTimes:
+    """Seconds each background stage spent working, and waiting on a full queue downstream."""
+    read_seconds: float = 0.0
+    read_blocked: float = 0.0
+    coerce_seconds: float = 0.0
+    coerce_blocked: float = 0.0
+    chunks: int = 0
+
+
+def _put(outbox, item, stop):
+    """Blocking put that gives up once the pipeline is stopped. Returns the seconds spent waiting."""
+    started = time.perf_counter()
+    while not stop.is_set():
+        try:
+            outbox.put(item, timeout=POLL_SECONDS)
+            break
+        except queue.Full:
+            continue
+    return time.perf_counter() - started
+
+
+def _drain(inbox, stop):
+    """Yields items from inbox until the end-of-stream marker, or until the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            item = inbox.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        yield item
+
+
+def _run_stage(name, source, work, outbox, stop, errors, times):
+    """
+    Thread body for one stage: applies work to every item of source and
+    passes the results on. Always ends the stream downstream; an exception
+    stops the whole pipeline and is re-raised to the consumer.
+    """
+    busy = blocked = 0.0
+    try:
+        items = iter(source)
+        while True:
+            started = time.perf_counter()
+            item = next(items, _DONE)
+            if item is _DONE:
+                break
+            result = work(item) if work else item
+            busy += time.perf_counter() - started
+            blocked += _put(outbox, result, stop)
+    except Exception as e:
+        logging.error(f"Pipeline {name} stage failed: {e}", exc_info=True)
+        errors.append(e)
+        stop.set()
+    finally:
+        setattr(times, f"{name}_seconds", busy)
+        setattr(times, f"{name}_blocked", blocked)
+        _put(outbox, _DONE, stop)
+
+
+def iter_pipelined_chunks(file_path, schema, chunk_size=DEFAULT_CHUNK_SIZE, queue_size=DEFAULT_QUEUE_SIZE,
+                          times=None, **resume_arguments):
+    """
+    Drop-in replacement for iter_file_chunks that reads and coerces ahead of
+    the consumer in background threads, keeping at most queue_size chunks
+    waiting between stages. resume_arguments (start_offset, start_row,
+    skip_rows) are passed on to the reader. Stage timings are recorded in
+    times (a StageTimes) if given. Closing the iterator early stops both
+    threads.
+    """
+    times = times if times is not None else StageTimes()
+    raw, coerced = queue.Queue(queue_size), queue.Queue(queue_size)
+    stop = threading.Event()
+    errors = []
+    chunks = iter_file_chunks(file_path, schema, chunk_size, coerce=False, **resume_arguments)
+    coerce = partial(coerce_dataframe, schema=schema, source=file_path)
+    threads = [
+        threading.Thread(target=_run_stage, args=('read', chunks, None, raw, stop, errors, times),
+                         name='pipeline-read', daemon=True),
+        threading.Thread(target=_run_stage, args=('coerce', _drain(raw, stop), coerce, coerced, stop, errors, times),
+                         name='pipeline-coerce', daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    logging.info(f"Pipelined reading of {file_path} started (queue size {queue_size}).")
+
+    started = time.perf_counter()
+    try:
+        for chunk in _drain(coerced, stop):
+            times.chunks += 1
+            yield chunk
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        logging.info(
+            f"Pipeline for {file_path}: {times.chunks} chunks in {time.perf_counter() - started:.2f}s; "
+            f"read {times.read_seconds:.2f}s (blocked {times.read_blocked:.2f}s), "
+            f"coerce {times.coerce_seconds:.2f}s (blocked {times.coerce_blocked:.2f}s)."
+        )
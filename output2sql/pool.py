@@ -0,0 +1,162 @@
+# output2sql/pool.py
+#
+"""
+Parallel upload over several database connections.
+
+A single session is latency-bound: while it waits for a round trip the server
+sits idle. Here N worker threads each hold their own connection from a small
+pool and insert separate slices of the data at the same time, each committing
+on its own cadence. Database drivers release the GIL while they wait on the
+network, so threads are enough.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from output2sql.backends import Backend
+from output2sql.upload import DEFAULT_BATCH_SIZE, UploadResult, _describe_sizing, _upload_frame
+
+# --- Configuration ---
+DEFAULT_WORKERS = 4
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of connections created on demand by connect(), a
+    zero-argument callable such as lambda: pyodbc.connect(conn_str).
+    Connections may be used from a different thread than the one that
+    created them, so sqlite3 stand-ins need check_same_thread=False.
+    """
+
+    def __init__(self, connect, size=DEFAULT_WORKERS):
+        self._connect = connect
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._all = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Returns an idle connection, opening a new one while under the pool size."""
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if not create:
+            return self._idle.get()
+        try:
+            cnxn = self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        with self._lock:
+            self._all.append(cnxn)
+        return cnxn
+
+    def release(self, cnxn):
+        self._idle.put(cnxn)
+
+    @contextmanager
+    def connection(self):
+        cnxn = self.acquire()
+        try:
+            yield cnxn
+        finally:
+            self.release(cnxn)
+
+    def close_all(self):
+        """Closes every connection the pool has opened."""
+        with self._lock:
+            connections, self._all = self._all, []
+            self._created = 0
+        self._idle = queue.LifoQueue()
+        for cnxn in connections:
+            try:
+                cnxn.close()
+            except Exception as e:
+                logging.warning(f"Error closing pooled connection: {e}")
+        logging.info(f"Closed {len(connections)} pooled connections.")
+
+
+def split_dataframe(df, parts):
+    """Splits df into at most parts contiguous slices of near-equal size."""
+    parts = max(1, min(parts, len(df)))
+    size, remainder = divmod(len(df), parts)
+    start = 0
+    for i in range(parts):
+        stop = start + size + (1 if i < remainder else 0)
+        yield df.iloc[start:stop]
+        start = stop
+
+
+def _upload_slice(pool, backend, statement, chunk, batch_size, label, rejects=None, sizer=None):
+    """Worker body: uploads one slice over a pooled connection, tuned by this thread's clone of sizer."""
+    result = UploadResult()
+    started = time.perf_counter()
+    first_row = chunk.index[0] if len(chunk) else None
+    try:
+        with pool.connection() as cnxn:
+            cursor = backend.open_cursor(cnxn)
+            try:
+                _upload_frame(cnxn, cursor, backend, statement, chunk, batch_size, result, started, label=label,
+                              rejects=rejects, sizer=sizer.for_current_thread() if sizer else None)
+            finally:
+                cursor.close()
+    except Exception as e:
+        # Whatever was committed before the failure stays counted in result.rows
+        result.failed += len(chunk) - result.rows - result.failed
+        result.errors.append(f"{label} (slice starting at row {first_row}): {e}")
+        logging.error(f"[{label}] Upload of slice starting at row {first_row} failed: {e}", exc_info=True)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def parallel_upload(connect, chunks, table_name, column_names, workers=DEFAULT_WORKERS,
+                    batch_size=DEFAULT_BATCH_SIZE, backend=None, rejects=None, sizer=None):
+    """
+    Uploads an iterable of DataFrame chunks (e.g. split_dataframe(df, workers)
+    or a streaming reader) using workers concurrent connections opened by
+    connect(). At most 2 * workers chunks are held in memory at once.
+    Per-worker totals and errors are combined into the returned UploadResult;
+    rows isolated from failed batches go to rejects, which is shared by all
+    workers. With an AdaptiveBatchSizer each worker thread tunes its own
+    copy of it.
+    """
+    backend = backend or Backend()
+    statement = backend.prepare(table_name, column_names)
+    logging.info(f"Prepared bulk statement: {backend.describe(statement)} "
+                 f"({workers} workers, {_describe_sizing(batch_size, sizer)})")
+
+    pool = ConnectionPool(connect, workers)
+    in_flight = threading.BoundedSemaphore(2 * workers)
+    futures = []
+    total = UploadResult()
+    started = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upload') as executor:
+            for number, chunk in enumerate(chunks, 1):
+                in_flight.acquire()
+                future = executor.submit(_upload_slice, pool, backend, statement, chunk, batch_size,
+                                         f"slice {number}", rejects, sizer)
+                future.add_done_callback(lambda _: in_flight.release())
+                futures.append(future)
+        for future in futures:
+            total.merge(future.result())
+    finally:
+        pool.close_all()
+
+    total.seconds = time.perf_counter() - started
+    logging.info(
+        f"Parallel upload to '{table_name}' finished: {total.rows} records in {total.seconds:.2f}s "
+        f"({total.rows_per_sec:,.0f} rows/sec, {total.failed} failed, {len(total.errors)} worker errors)."
+    )
+    for error in total.errors:
+        logging.error(f"Worker error: {error}")
+    return total
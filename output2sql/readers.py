@@ -0,0 +1,215 @@
+# output2sql/readers.py
+#
+"""
+Readers that turn data files into DataFrames typed according to an inferred
+schema (a dictionary mapping column names to Python types or ColumnProfiles).
+Compressed files (.gz, .bz2, .xz, .zst) are decompressed as they are read
+(see output2sql.compressed).
+"""
+import csv
+import io
+import logging
+from datetime import datetime
+from itertools import islice
+
+import pandas as pd
+
+from output2sql.compressed import data_extension, open_data
+from output2sql.jsonstream import iter_json_records
+from output2sql.metrics import stage
+
+# --- Configuration ---
+DEFAULT_CHUNK_SIZE = 50_000
+BOOL_STRINGS = {'true': True, 'y': True, 'yes': True, 'false': False, 'n': False, 'no': False}
+
+
+# --- Type Coercion ---
+def coerce_dataframe(df, schema, source=None):
+    """
+    Converts the columns of df in place to the types recorded in schema and
+    returns it. schema values are Python types or ColumnProfiles (whose
+    py_type is used). Values that cannot be converted become missing values.
+    """
+    with stage('coerce', rows=len(df)):
+        for col, spec in schema.items():
+            py_type = getattr(spec, 'py_type', spec)
+            if col in df.columns:
+                if py_type is int:
+                    df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64') # Use Int64 for nullable integers
+                elif py_type is float:
+                    df[col] = pd.to_numeric(df[col], errors='coerce')
+                elif py_type is bool:
+                    df[col] = df[col].astype(str).str.lower().map(BOOL_STRINGS).astype('boolean') # Use boolean for nullable booleans
+                elif py_type is datetime:
+                    df[col] = pd.to_datetime(df[col], errors='coerce', format='mixed')
+            else:
+                logging.warning(f"Column '{col}' from schema not found in '{source}'.")
+    return df
+
+
+# --- Streaming Readers ---
+def _find_record_end(block, start=0):
+    """
+    Returns the index just past the last newline in block[start:] that ends a
+    complete CSV record, i.e. is not inside a quoted field, or -1 if there is
+    none. Doubled quotes inside quoted fields keep the quote count even, so
+    the count of '"' before a newline tells whether it is quoted.
+    """
+    end = block.rfind(b'\n', start)
+    while end >= 0:
+        if block.count(b'"', start, end) % 2 == 0:
+            return end + 1
+        end = block.rfind(b'\n', start, end)
+    return -1
+
+
+def _find_first_record_end(block):
+    """Index just past the first newline in block that ends a complete CSV record, or -1."""
+    newline = block.find(b'\n')
+    while newline >= 0:
+        if block.count(b'"', 0, newline) % 2 == 0:
+            return newline + 1
+        newline = block.find(b'\n', newline + 1)
+    return -1
+
+
+def read_csv_header(file_path):
+    """Returns (column names, byte offset of the first data record)."""
+    with open_data(file_path) as f:
+        block = f.read(64 * 1024)
+        end = _find_first_record_end(block)
+        while end < 0:
+            more = f.read(64 * 1024)
+            if not more:
+                end = len(block)
+                break
+            block += more
+            end = _find_first_record_end(block)
+    columns = next(csv.reader(io.StringIO(block[:end].decode('utf-8-sig'))), [])
+    return columns, end
+
+
+def iter_csv_blocks(file_path, start_offset, block_size):
+    """
+    Yields (byte offset, bytes) for consecutive runs of whole CSV records of
+    roughly block_size bytes, starting at start_offset. Blocks always end on a
+    record boundary, even when quoted fields contain newlines.
+    """
+    with open_data(file_path, start_offset) as f:
+        offset = start_offset
+        pending = b''
+        while True:
+            data = f.read(block_size)
+            if not data:
+                if pending:
+                    yield offset, pending
+                return
+            pending += data
+            end = _find_record_end(pending)
+            if end <= 0:
+                continue # One record longer than the block; keep reading
+            yield offset, pending[:end]
+            offset += end
+            pending = pending[end:]
+
+
+def _estimate_record_bytes(file_path, start_offset, sample_size=64 * 1024):
+    with open_data(file_path, start_offset) as f:
+        sample = f.read(sample_size)
+    lines = sample.count(b'\n')
+    return max(1, len(sample) // lines) if lines else max(1, len(sample))
+
+
+def _tag_chunk(chunk, offset, first_row):
+    """Records where a chunk came from, for checkpoints: byte offset and first row number."""
+    chunk.attrs['source_offset'] = offset
+    chunk.attrs['source_first_row'] = first_row
+    return chunk
+
+
+def iter_csv_chunks(file_path, schema, chunk_size=DEFAULT_CHUNK_SIZE, start_offset=None, start_row=0,
+                    skip_rows=0, coerce=True):
+    """
+    Reads a CSV file about chunk_size records at a time and yields each chunk
+    already coerced to the schema (as strings with coerce=False), so only one
+    chunk is held in memory. The row index continues across chunks. Chunks
+    are cut at record boundaries in the raw bytes, so reading can start at any
+    chunk's source_offset (with start_row its first row number); skip_rows
+    then drops records already loaded from the first chunk.
+    """
+    columns, data_offset = read_csv_header(file_path)
+    offset = data_offset if start_offset is None else start_offset
+    block_size = chunk_size * _estimate_record_bytes(file_path, offset)
+    logging.info(f"Streaming {file_path} in chunks of about {chunk_size} records"
+                 f"{f' from byte {offset}, row {start_row + skip_rows}' if start_offset is not None else ''}...")
+
+    row = start_row
+    for offset, data in iter_csv_blocks(file_path, offset, block_size):
+        try:
+            with stage('parse', nbytes=len(data)) as call:
+                chunk = pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=str, encoding='utf-8')
+                call.rows = len(chunk)
+        except pd.errors.EmptyDataError:
+            continue # Nothing but blank lines
+        chunk.index = pd.RangeIndex(row, row + len(chunk))
+        row += len(chunk)
+        if skip_rows >= len(chunk):
+            skip_rows -= len(chunk)
+            continue
+        first_row = chunk.index[0]
+        if skip_rows:
+            chunk = chunk.iloc[skip_rows:].copy()
+            skip_rows = 0
+        if coerce:
+            coerce_dataframe(chunk, schema, source=file_path)
+        yield _tag_chunk(chunk, offset, first_row)
+
+
+def iter_json_chunks(file_path, schema, chunk_size=DEFAULT_CHUNK_SIZE, start_offset=None, start_row=0,
+                     skip_rows=0, coerce=True):
+    """
+    Reads array, NDJSON or concatenated-object JSON files chunk_size records
+    at a time and yields each chunk as a DataFrame with the schema's columns,
+    coerced to the schema unless coerce=False. Keys that are not in the
+    schema are dropped.
+    start_offset, start_row and skip_rows resume reading as for CSV files.
+    """
+    logging.info(f"Streaming {file_path} in chunks of {chunk_size} records...")
+    records = iter_json_records(file_path, start_offset=start_offset, with_offsets=True)
+    offset = start_offset or 0
+    row = start_row
+    for _, offset in islice(records, skip_rows):
+        row += 1
+    while True:
+        with stage('parse') as call:
+            batch = list(islice(records, chunk_size))
+            if batch:
+                chunk = pd.DataFrame.from_records([record for record, _ in batch], columns=list(schema))
+                call.rows, call.bytes = len(batch), batch[-1][1] - offset
+        if not batch:
+            return
+        chunk.index = pd.RangeIndex(row, row + len(chunk))
+        row += len(chunk)
+        if coerce:
+            coerce_dataframe(chunk, schema, source=file_path)
+        yield _tag_chunk(chunk, offset, chunk.index[0])
+        offset = batch[-1][1]
+
+
+def iter_file_chunks(file_path, schema, chunk_size=DEFAULT_CHUNK_SIZE, start_offset=None, start_row=0,
+                     skip_rows=0, coerce=True):
+    """Dispatches to the streaming reader for the file's extension."""
+    file_extension = data_extension(file_path)
+    if file_extension == '.csv':
+        return iter_csv_chunks(file_path, schema, chunk_size, start_offset, start_row, skip_rows, coerce)
+    elif file_extension == '.json':
+        return iter_json_chunks(file_path, schema, chunk_size, start_offset, start_row, skip_rows, coerce)
+    raise ValueError(f"Unsupported file type: {file_extension}")
+
+
+def read_file(file_path, schema, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Reads the whole file through the streaming reader into one DataFrame."""
+    chunks = list(iter_file_chunks(file_path, schema, chunk_size))
+    if not chunks:
+        return pd.DataFrame(columns=list(schema))
+    return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
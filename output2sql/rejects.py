@@ -0,0 +1,89 @@
+# output2sql/rejects.py
+#
+"""
+Reject files for records the database would not accept.
+
+When a batch fails, the upload engine narrows it down to the offending
+records (see output2sql.upload) and hands each one to a RejectFile together
+with its source row number and the error text. The file is CSV or NDJSON,
+chosen by extension, and is only created once the first record is rejected,
+so a clean load leaves nothing behind. An existing file is appended to, so a
+resumed load adds to the rejects of the interrupted one.
+"""
+import csv
+import json
+import logging
+import os
+import threading
+
+# --- Configuration ---
+REJECT_DIR = os.environ.get('OUTPUT2SQL_REJECT_DIR', 'rejects')
+REJECT_FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.json': 'ndjson'}
+REJECT_SUFFIX = '.rejects' # Comes before the extension, e.g. contacts__contacts2.csv.rejects.csv
+
+
+def reject_path_for(file_path, table_name, directory=REJECT_DIR, fmt='csv'):
+    """Reject file for loading file_path into table_name, e.g. rejects/contacts__contacts2.csv.rejects.csv."""
+    return os.path.join(directory, f"{table_name}__{os.path.basename(file_path)}{REJECT_SUFFIX}.{fmt}")
+
+
+def is_reject_file(file_path):
+    """
+    True for a reject file written by RejectFile. It has a data file's
+    extension but holds records that were already refused, so file
+    selection and watch scans skip it.
+    """
+    return os.path.splitext(os.path.basename(file_path))[0].lower().endswith(REJECT_SUFFIX)
+
+
+class RejectFile:
+    """
+    Appends rejected records to a CSV or NDJSON file. Safe to share between
+    upload threads; nothing is written until the first reject arrives.
+    """
+
+    def __init__(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in REJECT_FORMATS:
+            raise ValueError(f"Unsupported reject file type: {extension} (use .csv or .ndjson)")
+        self.path = path
+        self.format = REJECT_FORMATS[extension]
+        self.count = 0
+        self._file = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def _open(self, fieldnames):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', encoding='utf-8', newline='')
+        if self.format == 'csv':
+            self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='ignore')
+            if new_file:
+                self._writer.writeheader()
+        logging.info(f"Writing rejected records to {self.path}.")
+
+    def write(self, row, record, error):
+        """Records one rejected record (a column -> value dict) with its source row number and error."""
+        with self._lock:
+            if self._file is None:
+                self._open(['source_row', 'reject_error', *record])
+            if self.format == 'csv':
+                self._writer.writerow({**record, 'source_row': row, 'reject_error': str(error)})
+            else:
+                line = json.dumps({'source_row': row, 'reject_error': str(error), 'record': record}, default=str)
+                self._file.write(line + '\n')
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                logging.info(f"{self.count} rejected records written to {self.path}.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,278 @@
+# output2sql/schema.py
+#
+"""
+Schema inference from full-column statistics.
+
+Each column is profiled with vectorized pandas string checks over whole
+chunks (int/float/decimal/bool/datetime compatibility, maximum length,
+null count and numeric range), in a single pass over the file or over its
+first sample_rows records. The profile then picks the Python type used for
+coercion and a right-sized SQL Server column type for the CREATE TABLE.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+
+import pandas as pd
+
+from output2sql.compressed import data_extension, is_compressed, open_data, split_compression
+from output2sql.jsonstream import iter_json_records
+from output2sql.metrics import stage
+from output2sql.readers import BOOL_STRINGS, DEFAULT_CHUNK_SIZE
+
+# --- Configuration ---
+INT_PATTERN = r'[+-]?\d+'
+LEADING_ZERO_PATTERN = r'[+-]?0\d+' # e.g. zip codes; kept as text so the zero survives
+DECIMAL_PATTERN = r'^[+-]?0*(\d*)(?:\.(\d*))?$'
+DATE_PATTERN = r'(?:\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2}/\d{2,4})'
+DATETIME_PATTERN = DATE_PATTERN + r'(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?'
+ASCII_PATTERN = r'[\x00-\x7f]*'
+UNKNOWN_SQL_TYPE = 'NVARCHAR(255)' # Columns with no values to go on
+MAX_DECIMAL_PRECISION = 38
+INTEGER_TYPES = (
+    ('TINYINT', 0, 255),
+    ('SMALLINT', -2**15, 2**15 - 1),
+    ('INT', -2**31, 2**31 - 1),
+    ('BIGINT', -2**63, 2**63 - 1),
+)
+
+
+@dataclass
+class ColumnProfile:
+    """Running statistics for one column, updated a chunk at a time."""
+    name: str
+    count: int = 0
+    nulls: int = 0
+    is_int: bool = True
+    is_float: bool = True
+    is_decimal: bool = True
+    is_bool: bool = True
+    is_datetime: bool = True
+    has_time: bool = False
+    leading_zero: bool = False
+    is_ascii: bool = True
+    max_length: int = 0
+    int_digits: int = 0
+    scale: int = 0
+    min_value: float = None
+    max_value: float = None
+    complete: bool = False # True once every record of the file has been seen
+
+    def update(self, values):
+        """Folds a Series of raw string values (missing values as NA) into the profile."""
+        missing = values.isna()
+        present = values[~missing]
+        stripped = present.str.strip()
+        blank = stripped == ''
+        present, stripped = present[~blank], stripped[~blank]
+        self.count += len(values)
+        self.nulls += int(missing.sum()) + int(blank.sum())
+        if stripped.empty:
+            return
+
+        self.max_length = max(self.max_length, int(present.str.len().max()))
+        self.is_ascii = self.is_ascii and bool(present.str.fullmatch(ASCII_PATTERN).all())
+
+        if self.is_float:
+            numbers = pd.to_numeric(stripped, errors='coerce')
+            self.is_float = bool(numbers.notna().all())
+            self.is_int = self.is_int and self.is_float and bool(stripped.str.fullmatch(INT_PATTERN).all())
+            if self.is_int:
+                self.leading_zero = self.leading_zero or bool(stripped.str.fullmatch(LEADING_ZERO_PATTERN).any())
+            if self.is_float:
+                low, high = numbers.min(), numbers.max()
+                self.min_value = low if self.min_value is None else min(self.min_value, low)
+                self.max_value = high if self.max_value is None else max(self.max_value, high)
+            if self.is_float and self.is_decimal:
+                parts = stripped.str.extract(DECIMAL_PATTERN)
+                self.is_decimal = bool(parts[0].notna().all())
+                if self.is_decimal:
+                    self.int_digits = max(self.int_digits, int(parts[0].str.len().max()))
+                    self.scale = max(self.scale, int(parts[1].fillna('').str.len().max()))
+        else:
+            self.is_int = False
+
+        if self.is_bool:
+            self.is_bool = bool(stripped.str.lower().isin(BOOL_STRINGS.keys()).all())
+
+        if self.is_datetime:
+            self.is_datetime = bool(stripped.str.fullmatch(DATETIME_PATTERN).all())
+            if self.is_datetime:
+                parsed = pd.to_datetime(stripped, errors='coerce', format='mixed')
+                self.is_datetime = bool(parsed.notna().all())
+                self.has_time = self.has_time or bool(stripped.str.contains(':', regex=False).any())
+
+    def merge(self, other):
+        """
+        Folds in the profile of another part of the same column (e.g. a byte
+        range profiled in another process), as if its values had been
+        passed to update().
+        """
+        self.count += other.count
+        self.nulls += other.nulls
+        self.is_int = self.is_int and other.is_int
+        self.is_float = self.is_float and other.is_float
+        self.is_decimal = self.is_decimal and other.is_decimal
+        self.is_bool = self.is_bool and other.is_bool
+        self.is_datetime = self.is_datetime and other.is_datetime
+        self.has_time = self.has_time or other.has_time
+        self.leading_zero = self.leading_zero or other.leading_zero
+        self.is_ascii = self.is_ascii and other.is_ascii
+        self.max_length = max(self.max_length, other.max_length)
+        self.int_digits = max(self.int_digits, other.int_digits)
+        self.scale = max(self.scale, other.scale)
+        if other.min_value is not None:
+            self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+            self.max_value = other.max_value if self.max_value is None else max(self.max_value, other.max_value)
+        return self
+
+    @property
+    def seen_values(self):
+        return self.count > self.nulls
+
+    @property
+    def nullable(self):
+        # A sample cannot prove the rest of the file has no nulls
+        return self.nulls > 0 or not self.complete
+
+    @property
+    def py_type(self):
+        """The Python type the column's values are coerced to."""
+        if not self.seen_values:
+            return str
+        if self.is_int:
+            # Leading zeros (zip codes) and values beyond BIGINT stay text
+            return int if not self.leading_zero and self._integer_sql_type() else str
+        if self.is_float:
+            return float
+        if self.is_bool:
+            return bool
+        if self.is_datetime:
+            return datetime
+        return str
+
+    def _integer_sql_type(self):
+        for sql_type, low, high in INTEGER_TYPES:
+            if low <= self.min_value and self.max_value <= high:
+                return sql_type
+        return None
+
+    @property
+    def sql_type(self):
+        """The smallest SQL Server type that holds every value seen."""
+        if not self.seen_values:
+            return UNKNOWN_SQL_TYPE
+        py_type = self.py_type
+        if py_type is int:
+            return self._integer_sql_type()
+        elif self.is_int and not self.leading_zero and self.int_digits <= MAX_DECIMAL_PRECISION:
+            return f"DECIMAL({self.int_digits}, 0)"
+        elif py_type is float:
+            precision = max(self.int_digits + self.scale, 1)
+            if self.is_decimal and precision <= MAX_DECIMAL_PRECISION:
+                return f"DECIMAL({precision}, {self.scale})"
+            return "FLOAT"
+        elif py_type is bool:
+            return "BIT"
+        elif py_type is datetime:
+            return "DATETIME" if self.has_time else "DATE"
+
+        length = max(self.max_length, 1)
+        if self.is_ascii:
+            return f"VARCHAR({length})" if length <= 8000 else "VARCHAR(MAX)"
+        return f"NVARCHAR({length})" if length <= 4000 else "NVARCHAR(MAX)"
+
+    def sql_definition(self):
+        """Column type plus NULL / NOT NULL for a CREATE TABLE statement."""
+        return f"{self.sql_type} {'NULL' if self.nullable else 'NOT NULL'}"
+
+
+# --- Naming ---
+def table_name_for_file(file_path):
+    """Table name derived from the file name, e.g. 'car-data.v2.csv' or 'car-data.v2.csv.gz' -> 'car_data_v2'."""
+    file_name = split_compression(os.path.basename(file_path))[0]
+    return os.path.splitext(file_name)[0].replace('.', '_').replace('-', '_')
+
+
+def sanitize_column_name(column_name):
+    """Column name usable in SQL (spaces and dots replaced)."""
+    return column_name.replace(' ', '_').replace('.', '_')
+
+
+# --- Profiling ---
+def profile_dataframe(df, profiles=None, rows_seen=0):
+    """
+    Updates (or creates) the profiles for every column of df. Values are
+    profiled as strings, so typed frames (e.g. from JSON) are converted first.
+    rows_seen is the number of records already profiled; columns that first
+    appear in this chunk count those earlier records as nulls.
+    """
+    profiles = {} if profiles is None else profiles
+    for col in df.columns:
+        if col not in profiles:
+            profiles[col] = ColumnProfile(name=col, count=rows_seen, nulls=rows_seen)
+        values = df[col]
+        if not isinstance(values.dtype, pd.StringDtype):
+            values = values.astype('string')
+        profiles[col].update(values)
+    for col, profile in profiles.items():
+        if col not in df.columns:
+            profile.count += len(df)
+            profile.nulls += len(df)
+    return profiles
+
+
+def _iter_raw_chunks(file_path, sample_rows, chunk_size):
+    """Yields (chunk of raw strings, bytes of data read so far) pairs; bytes count decompressed data."""
+    file_extension = data_extension(file_path)
+    if file_extension == '.csv':
+        # Read from the decompressing stream, so a sample decompresses only the head of the file
+        with open_data(file_path) as f, pd.read_csv(f, dtype=str, encoding='utf-8', chunksize=chunk_size,
+                                                     nrows=sample_rows) as reader:
+            for chunk in reader:
+                yield chunk, f.tell()
+    elif file_extension == '.json':
+        records = iter_json_records(file_path, with_offsets=True)
+        remaining = sample_rows
+        while remaining is None or remaining > 0:
+            batch = list(islice(records, chunk_size if remaining is None else min(chunk_size, remaining)))
+            if not batch:
+                return
+            yield pd.DataFrame.from_records([record for record, _ in batch]), batch[-1][1]
+            if remaining is not None:
+                remaining -= len(batch)
+    else:
+        raise ValueError(f"Unsupported file type: {file_extension}")
+
+
+def profile_file(file_path, sample_rows=None, chunk_size=DEFAULT_CHUNK_SIZE, processes=1):
+    """
+    Profiles every column of a CSV or JSON file in a single streaming pass.
+    With sample_rows set only the first sample_rows records are read (and
+    decompressed). A whole uncompressed CSV file is profiled in up to
+    processes worker processes, a byte range each (see output2sql.parallelcsv).
+    The profile stage's bytes count the (decompressed) data actually read.
+    Returns a dictionary mapping column names to ColumnProfile, in file order.
+    """
+    profiles = {}
+    rows_seen = 0
+    with stage('profile') as call:
+        if (processes > 1 and sample_rows is None and data_extension(file_path) == '.csv'
+                and not is_compressed(file_path)):
+            from output2sql.parallelcsv import profile_csv_parallel # Imports this module
+            profiles, rows_seen = profile_csv_parallel(file_path, chunk_size, processes)
+            call.bytes = os.path.getsize(file_path)
+        else:
+            for chunk, bytes_read in _iter_raw_chunks(file_path, sample_rows, chunk_size):
+                profile_dataframe(chunk, profiles, rows_seen)
+                rows_seen += len(chunk)
+                call.bytes = bytes_read
+        call.rows = rows_seen
+
+    complete = sample_rows is None or rows_seen < sample_rows
+    for profile in profiles.values():
+        profile.complete = complete
+    logging.info(f"Profiled {rows_seen} records of {file_path} ({'whole file' if complete else 'sample'}).")
+    return profiles
@@ -0,0 +1,253 @@
+# output2sql/sqlexport.py
+#
+"""
+Offline SQL script export.
+
+Some targets can only be loaded by running a script through sqlcmd (or
+psql, or sqlite3) from inside a restricted zone. Here the records are
+streamed, chunk by chunk, into such a script as multi-row statements
+
+    INSERT INTO contacts ([name], [age]) VALUES
+    (N'Ann', 34),
+    (N'Bob', NULL);
+
+written after the table's CREATE TABLE statement. SQL Server takes at most
+1000 rows in one VALUES list and 2100 parameters in one request, so a
+statement holds at most 1000 rows and 2100 values. Statements are grouped
+into transactions of transaction_statements statements each, followed by a
+GO batch separator on SQL Server, so a failure rolls back one group and the
+server never has to parse more than one group at a time.
+
+Literals are built a column at a time with vectorised string operations
+(see column_literals), which keeps export close to parsing speed for files
+of tens of millions of records. With split_bytes the script is cut into
+numbered parts (contacts.001.sql, contacts.002.sql, ...) at transaction
+boundaries; each part is written under a temporary name and renamed once
+complete, so a half-written script is never mistaken for a finished one.
+"""
+import codecs
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from output2sql.backends import Backend
+from output2sql.metrics import stage
+from output2sql.readers import DEFAULT_CHUNK_SIZE
+
+# --- Configuration ---
+MAX_ROWS_PER_INSERT = 1000 # SQL Server's limit on row value expressions in one VALUES list
+MAX_PARAMETERS_PER_INSERT = 2100 # SQL Server's limit on parameters in one request
+DEFAULT_TRANSACTION_STATEMENTS = 50 # INSERT statements per transaction and GO batch; 0 writes no transactions
+
+
+@dataclass
+class ExportResult:
+    """Totals for one export: rows and statements written, elapsed time and the script files."""
+    rows: int = 0
+    statements: int = 0
+    seconds: float = 0.0
+    paths: list = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def rows_per_statement(column_count, max_rows=MAX_ROWS_PER_INSERT):
+    """Rows in one INSERT statement that keep it within the row and parameter limits."""
+    return max(1, min(max_rows, MAX_PARAMETERS_PER_INSERT // max(column_count, 1)))
+
+
+def script_path_for(table_name, directory='.', source=None):
+    """Script file for table_name, or for one source file when several files are exported to one table."""
+    name = f"{table_name}__{os.path.basename(source)}" if source else table_name
+    return os.path.join(directory, name + '.sql')
+
+
+# --- Literals ---
+def _datetime_literals(series, backend):
+    # ISO 8601 with a T is read the same under every language and DATEFORMAT setting, into DATE or DATETIME;
+    # numpy formats it a good ten times faster than Series.dt.strftime
+    if series.dt.tz is not None:
+        series = series.dt.tz_localize(None)
+    text = np.datetime_as_string(series.to_numpy(dtype='datetime64[ns]'), unit='ms') # DATETIME keeps milliseconds
+    return backend.text_literals(pd.Series(text, dtype=object)).to_numpy(dtype=object)
+
+
+def column_literals(series, backend):
+    """
+    SQL literals for one DataFrame column, as an object array of str.
+    Missing values (and infinite floats, which SQL cannot hold) become
+    NULL. Categorical columns format each category once.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = column_literals(pd.Series(series.cat.categories), backend)
+        lookup = np.append(categories, 'NULL').astype(object) # Code -1 (missing) picks the trailing NULL
+        return lookup[series.cat.codes.to_numpy()]
+    missing = series.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(series.dtype):
+        true_literal, false_literal = backend.boolean_literals
+        values = series.to_numpy(dtype=bool, na_value=False)
+        literals = np.where(values, true_literal, false_literal).astype(object)
+    elif pd.api.types.is_integer_dtype(series.dtype):
+        literals = series.astype(str).to_numpy(dtype=object)
+    elif pd.api.types.is_float_dtype(series.dtype):
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        missing = missing | ~np.isfinite(values)
+        literals = values.astype(str).astype(object) # Shortest repr that reads back as the same float
+    elif pd.api.types.is_datetime64_any_dtype(series.dtype):
+        literals = _datetime_literals(series, backend)
+    else:
+        literals = backend.text_literals(series.astype(str)).to_numpy(dtype=object)
+    return np.where(missing, 'NULL', literals)
+
+
+def insert_statements(df, table_name, column_names, backend=None, rows=MAX_ROWS_PER_INSERT):
+    """Yields multi-row INSERT statements for df, at most rows rows each."""
+    backend = backend or Backend()
+    if df.empty:
+        return
+    with stage('export_format', rows=len(df)):
+        literals = [column_literals(df.iloc[:, i], backend) for i in range(df.shape[1])]
+        values = literals[0]
+        for column in literals[1:]:
+            values = values + ', ' + column
+        values = '(' + values + ')'
+    head = f"INSERT INTO {table_name} ({', '.join(backend.quote(col) for col in column_names)}) VALUES\n"
+    for start in range(0, len(values), rows):
+        yield head + ',\n'.join(values[start:start + rows]) + ';\n'
+
+
+# --- Script Files ---
+class SqlScriptWriter:
+    """
+    Writes one script, or numbered parts of about split_bytes each. header
+    (e.g. the CREATE TABLE statement) opens the first part; the backend's
+    script preamble opens every part, as sqlcmd runs each in a new session.
+    Use as a context manager: the parts are renamed into place on a clean
+    exit and removed if the export fails.
+    """
+
+    def __init__(self, path, backend=None, header=None, split_bytes=None):
+        self.path = path
+        self.backend = backend or Backend()
+        self.header = header
+        self.split_bytes = split_bytes
+        self.paths = []
+        self._file = None
+        self._written = 0
+
+    def _part_path(self):
+        if not self.split_bytes:
+            return self.path
+        root, extension = os.path.splitext(self.path)
+        return f"{root}.{len(self.paths) + 1:03d}{extension}"
+
+    def _open_part(self):
+        self.paths.append(self._part_path())
+        os.makedirs(os.path.dirname(self.paths[-1]) or '.', exist_ok=True)
+        self._file = open(self.paths[-1] + '.tmp', 'wb')
+        self._written = 0
+        if self.backend.script_bom:
+            self._file.write(codecs.BOM_UTF8)
+        opening = list(self.backend.script_preamble)
+        if self.header and len(self.paths) == 1:
+            opening.append(self.header)
+        if opening:
+            self.write('\n'.join(opening) + '\n' + self._separator())
+
+    def _separator(self):
+        return f"{self.backend.batch_separator}\n" if self.backend.batch_separator else ''
+
+    def write(self, text):
+        """Appends text that ends on a batch boundary, starting a new part if the current one is full."""
+        if self._file is None or (self.split_bytes and self._written >= self.split_bytes):
+            self._close_part()
+            self._open_part()
+        data = text.encode('utf-8')
+        self._file.write(data)
+        self._written += len(data)
+
+    def write_batch(self, statements, transaction=True):
+        """Appends statements as one batch, inside a transaction unless transaction=False."""
+        if transaction:
+            statements = [self.backend.begin_sql + '\n', *statements, self.backend.commit_sql + '\n']
+        self.write(''.join(statements) + self._separator())
+
+    def _close_part(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is None and exc_type is None:
+            self._open_part() # Nothing was written: the script still creates the table
+        self._close_part()
+        for path in self.paths:
+            if exc_type is None:
+                os.replace(path + '.tmp', path)
+            elif os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+        return False
+
+
+def export_chunks(chunks, path, table_name, column_names, backend=None, header=None,
+                  transaction_statements=DEFAULT_TRANSACTION_STATEMENTS, split_bytes=None,
+                  max_rows=MAX_ROWS_PER_INSERT, label=None):
+    """
+    Writes an iterable of DataFrame chunks to the script at path (or to
+    numbered parts of about split_bytes) as multi-row INSERT statements in
+    backend's dialect, after header (e.g. a CREATE TABLE statement).
+    Statements are grouped transaction_statements to a transaction; 0
+    writes them without transactions. Returns an ExportResult.
+    """
+    backend = backend or Backend()
+    result = ExportResult()
+    prefix = f"[{label}] " if label else ""
+    rows = rows_per_statement(len(column_names), max_rows)
+    group_size = transaction_statements or DEFAULT_TRANSACTION_STATEMENTS
+    logging.info(f"{prefix}Exporting to {path} as INSERT statements of up to {rows} rows"
+                 f"{f', {transaction_statements} to a transaction' if transaction_statements else ''}"
+                 f"{f', split every {split_bytes:,} bytes' if split_bytes else ''}.")
+    started = time.perf_counter()
+    pending = []
+    with SqlScriptWriter(path, backend, header, split_bytes) as writer:
+        for chunk in chunks:
+            for statement in insert_statements(chunk, table_name, column_names, backend, rows):
+                pending.append(statement)
+                if len(pending) == group_size:
+                    with stage('export_write'):
+                        writer.write_batch(pending, transaction=bool(transaction_statements))
+                    result.statements += len(pending)
+                    pending = []
+            result.rows += len(chunk)
+            elapsed = time.perf_counter() - started
+            logging.info(f"{prefix}Exported {result.rows} records "
+                         f"({result.rows / elapsed if elapsed else 0:,.0f} rows/sec).")
+        if pending:
+            with stage('export_write'):
+                writer.write_batch(pending, transaction=bool(transaction_statements))
+            result.statements += len(pending)
+    result.paths = writer.paths
+    result.seconds = time.perf_counter() - started
+    logging.info(f"{prefix}Exported {result.rows} records as {result.statements} INSERT statements to "
+                 f"{', '.join(result.paths)} in {result.seconds:.2f}s ({result.rows_per_sec:,.0f} rows/sec).")
+    return result
+
+
+def export_dataframe(df, path, table_name, column_names=None, chunk_size=DEFAULT_CHUNK_SIZE, **kwargs):
+    """
+    Writes a whole DataFrame to a script, formatting chunk_size rows at a
+    time so the literals never take more memory than one chunk's worth;
+    see export_chunks for the options.
+    """
+    column_names = column_names or list(df.columns)
+    chunks = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+    return export_chunks(chunks, path, table_name, column_names, **kwargs)
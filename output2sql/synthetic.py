@@ -0,0 +1,129 @@
+# output2sql/synthetic.py
+#
+"""
+Synthetic data files shaped like our exports, for benchmarks.
+
+Two datasets mirror the sample files:
+  - contacts: name, address, city, state, zipcode (contacts1.json, contacts2.csv)
+  - cars:     manufacturer, model, approximate_cost_usd (car_data1.csv, car_data2.json)
+
+Each can be written as CSV, NDJSON, concatenated pretty-printed objects or
+a JSON array. Values are drawn with a seeded numpy generator a block at a
+time, so the same (dataset, rows, seed) always gives the same file and
+memory stays flat up to tens of millions of rows. Zip codes keep their
+leading zeros, as in the real data.
+"""
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+GENERATE_BLOCK_ROWS = 100_000
+DEFAULT_SEED = 42
+LAYOUTS = ('csv', 'ndjson', 'concatenated', 'array')
+LAYOUT_EXTENSIONS = {'csv': '.csv', 'ndjson': '.json', 'concatenated': '.json', 'array': '.json'}
+
+FIRST_NAMES = ('Allison', 'Kimberly', 'Calvin', 'Jesse', 'Maria', 'David', 'Sarah', 'Michael', 'Linda', 'James',
+               'Patricia', 'Robert', 'Jennifer', 'John', 'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan',
+               'Joseph', 'Jessica', 'Thomas', 'Karen', 'Charles', 'Nancy', 'Christopher', 'Lisa', 'Daniel')
+LAST_NAMES = ('Hill', 'Robinson', 'Nielsen', 'Flowers', 'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia',
+              'Miller', 'Davis', 'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson',
+              'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Perez', 'Thompson', 'White')
+STREET_NAMES = ('Anthony', 'Susan', 'Janet', 'Amanda', 'Oak', 'Maple', 'Cedar', 'Pine', 'Elm', 'Washington',
+                'Lake', 'Hill', 'Park', 'River', 'Spring', 'Sunset', 'Highland', 'Meadow', 'Forest', 'Valley')
+STREET_SUFFIXES = ('Forge', 'Junction', 'Cape', 'Gardens', 'Street', 'Avenue', 'Road', 'Lane', 'Drive', 'Court',
+                   'Way', 'Place', 'Circle', 'Trail', 'Parkway', 'Crossing')
+CITIES = ('New Carolyn', 'Melanieview', 'Port Keith', 'South Jennifer', 'East Michael', 'Lake David',
+          'North Sarah', 'West Thomas', 'Springfield', 'Riverside', 'Fairview', 'Georgetown', 'Salem', 'Madison',
+          'Clinton', 'Arlington', 'Ashland', 'Burlington', 'Dover', 'Franklin')
+STATES = ('AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY',
+          'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND',
+          'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY')
+MANUFACTURERS = ('Chevrolet', 'Jeep', 'Volvo', 'Subaru', 'Kia', 'BMW', 'Ford', 'Toyota', 'Honda', 'Nissan',
+                 'Hyundai', 'Audi', 'Mazda', 'Tesla', 'Dodge', 'Lexus')
+MODELS = ('Silverado', 'Soul', 'Altima', 'Wrangler', 'Elantra', 'X5', 'F-150', 'Camry', 'Civic', 'Outback',
+          'Model 3', 'CX-5', 'A4', 'Charger', 'RX', 'Sorento', 'Mustang', 'Corolla', 'Accord', 'XC90')
+
+
+def _pick(rng, values, size):
+    return np.array(values, dtype=object)[rng.integers(0, len(values), size)]
+
+
+def contacts_block(rng, size):
+    """One block of contact records."""
+    numbers = rng.integers(1, 99999, size).astype(str).astype(object)
+    apartments = np.where(rng.random(size) < 0.2,
+                          ' Apt. ' + rng.integers(1, 999, size).astype(str).astype(object), '')
+    return pd.DataFrame({
+        'name': _pick(rng, FIRST_NAMES, size) + ' ' + _pick(rng, LAST_NAMES, size),
+        'address': numbers + ' ' + _pick(rng, STREET_NAMES, size) + ' ' + _pick(rng, STREET_SUFFIXES, size)
+                   + apartments,
+        'city': _pick(rng, CITIES, size),
+        'state': _pick(rng, STATES, size),
+        'zipcode': pd.Series(rng.integers(501, 99951, size)).astype(str).str.zfill(5).to_numpy(dtype=object),
+    })
+
+
+def cars_block(rng, size):
+    """One block of car records."""
+    return pd.DataFrame({
+        'manufacturer': _pick(rng, MANUFACTURERS, size),
+        'model': _pick(rng, MODELS, size),
+        'approximate_cost_usd': np.round(rng.uniform(15000, 100000, size), 2),
+    })
+
+
+DATASETS = {'contacts': contacts_block, 'cars': cars_block}
+
+
+def iter_blocks(dataset, rows, seed=DEFAULT_SEED, block_rows=GENERATE_BLOCK_ROWS):
+    """Yields DataFrames of at most block_rows records, rows records in total."""
+    make_block = DATASETS[dataset]
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, block_rows):
+        yield make_block(rng, min(block_rows, rows - start))
+
+
+def _write_block(f, block, layout, first):
+    if layout == 'csv':
+        block.to_csv(f, index=False, header=first, lineterminator='\n')
+        return
+    records = block.to_dict(orient='records')
+    if layout == 'ndjson':
+        f.write(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records))
+    elif layout == 'concatenated':
+        f.write(''.join(json.dumps(record, indent=4) + '\n' for record in records))
+    else:
+        separator = '[\n' if first else ',\n'
+        f.write(separator + ',\n'.join(json.dumps(record) for record in records))
+
+
+def synthetic_file_name(dataset, layout, rows, seed=DEFAULT_SEED):
+    return f"{dataset}_{layout}_{rows}_s{seed}{LAYOUT_EXTENSIONS[layout]}"
+
+
+def write_synthetic_file(directory, dataset, layout, rows, seed=DEFAULT_SEED):
+    """
+    Writes rows synthetic records of dataset in layout to directory and
+    returns the path. A file that already exists for the same parameters is
+    reused, since generation is deterministic.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}'; expected one of {', '.join(LAYOUTS)}.")
+    path = os.path.join(directory, synthetic_file_name(dataset, layout, rows, seed))
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    logging.info(f"Generating {rows:,} {dataset} records as {layout} in {path}...")
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+        for number, block in enumerate(iter_blocks(dataset, rows, seed)):
+            _write_block(f, block, layout, first=number == 0)
+        if layout == 'array':
+            f.write('\n]\n' if rows else '[]\n')
+    os.replace(temp_path, path)
+    return path
@@ -0,0 +1,362 @@
+# output2sql/upload.py
+#
+"""
+Batched upload engine.
+
+Instead of walking df.iterrows() and sending one cursor.execute per record,
+rows are converted to native Python values one column at a time and bound as
+whole parameter arrays through cursor.executemany. How a batch reaches the database
+is decided by a bulk-load backend (see output2sql.backends); the default
+sends qmark ('?') INSERT statements, so any DB-API connection such as sqlite3
+can stand in for SQL Server when testing.
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from output2sql.adaptive import estimate_batch_bytes
+from output2sql.backends import Backend
+from output2sql.metrics import observe, stage
+
+# --- Configuration ---
+DEFAULT_BATCH_SIZE = 1000
+DATA_ERRORS = ('DataError', 'IntegrityError') # DB-API errors caused by a bad value or a violated constraint
+SYSTEMIC_ERRORS = ('OperationalError', 'ProgrammingError', 'InterfaceError', 'InternalError',
+                   'NotSupportedError') # Lost connections, missing tables, permissions: no record is to blame
+
+
+@dataclass
+class UploadResult:
+    """
+    Totals for one upload: rows inserted, rows rejected (with their index
+    labels), rows skipped as unchanged by a delta load, elapsed time and
+    errors.
+    """
+    rows: int = 0
+    failed: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+    rejected: list = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def merge(self, other):
+        """Adds the row counts and errors of another result to this one."""
+        self.rows += other.rows
+        self.failed += other.failed
+        self.skipped += other.skipped
+        self.errors.extend(other.errors)
+        self.rejected.extend(other.rejected)
+
+
+# --- Value Conversion ---
+def build_insert_sql(table_name, column_names):
+    """Builds a parameterised INSERT statement for the given column names."""
+    return Backend().prepare(table_name, column_names)
+
+
+def column_to_native(series):
+    """
+    Converts one DataFrame column into a list of native Python values for the
+    driver. Missing values (NaN, NaT, pd.NA) become None. Categorical
+    columns convert each category once and expand the values by code.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = column_to_native(pd.Series(series.cat.categories))
+        lookup = np.array(categories + [None], dtype=object) # Code -1 (missing) picks the trailing None
+        return lookup[series.cat.codes.to_numpy()].tolist()
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = np.array(series.dt.to_pydatetime(), dtype=object)
+        values[series.isna().to_numpy()] = None
+        return values.tolist()
+    return series.to_numpy(dtype=object, na_value=None).tolist()
+
+
+def dataframe_to_rows(df):
+    """Converts a DataFrame column by column and returns a list of row tuples."""
+    columns = [column_to_native(df.iloc[:, i]) for i in range(df.shape[1])]
+    return list(zip(*columns))
+
+
+def iter_row_batches(df, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yields (start position, list of row tuples) for consecutive slices of df.
+    batch_size is a number of rows, or a callable asked for the size of each
+    next batch (e.g. lambda: sizer.batch_size) so it can change mid-frame.
+    """
+    start = 0
+    while start < len(df):
+        size = batch_size() if callable(batch_size) else batch_size
+        with stage('convert') as call:
+            rows = dataframe_to_rows(df.iloc[start:start + size])
+            call.rows = len(rows)
+        yield start, rows
+        start += len(rows)
+
+
+# --- Upload ---
+def _commit(cnxn):
+    """Commits, recording the latency in the commit_latency histogram. Returns the latency in seconds."""
+    with stage('commit'):
+        started = time.perf_counter()
+        cnxn.commit()
+        seconds = time.perf_counter() - started
+        observe('commit_latency', seconds)
+    return seconds
+
+
+def _reject_row(rejects, column_names, label, values, error, prefix=""):
+    """Sends one rejected record to the reject file, or to the log when there is none."""
+    if rejects is not None:
+        rejects.write(label, dict(zip(column_names, values)), error)
+    else:
+        logging.error(f"{prefix}Error inserting row {label}: {error}. Row data: {values}")
+
+
+def _error_names(error):
+    return {cls.__name__ for cls in type(error).__mro__}
+
+
+def is_data_error(error):
+    """
+    True for an error that one record can cause: a DB-API DataError or
+    IntegrityError from any driver, or a value the driver could not bind.
+    """
+    return bool(_error_names(error) & set(DATA_ERRORS)) or isinstance(error, (ValueError, OverflowError))
+
+
+def is_systemic_error(error):
+    """
+    True for an error no record is to blame for, such as a lost connection,
+    a missing table or a permission error. Retrying smaller parts of the
+    batch would only fail the same way, so it is raised instead.
+    """
+    if is_data_error(error):
+        return False
+    return bool(_error_names(error) & set(SYSTEMIC_ERRORS)) or isinstance(error, OSError)
+
+
+def _same_error(error, other):
+    return type(error) is type(other) and str(error) == str(other)
+
+
+def _isolate_failed_rows(cnxn, cursor, backend, statement, rows, index_labels, error, column_names, rejects,
+                         prefix="", check_systemic=False):
+    """
+    Error isolation for a batch that failed with error (and was rolled back):
+    the batch is split in half and each half is retried as a bulk call,
+    recursing into the halves that fail again. Good rows keep going in
+    through bulk binds; a single row that still fails is rejected. A few bad
+    rows in a batch of n cost about 2 * log2(n) extra round trips each,
+    instead of n single-row inserts. Returns the index labels of the
+    rejected rows.
+
+    A systemic error (see is_systemic_error) in any retry is raised. With
+    check_systemic, used when error itself is neither a data error nor a
+    systemic one, the first half failing with the very same error as the
+    whole batch is taken as a systemic failure too, and error is raised.
+    """
+    if len(rows) == 1:
+        _reject_row(rejects, column_names, index_labels[0], rows[0], error, prefix)
+        return [index_labels[0]]
+
+    middle = len(rows) // 2
+    rejected = []
+    for low, high in ((0, middle), (middle, len(rows))):
+        part = rows[low:high]
+        try:
+            backend.write_batch(cursor, statement, part)
+            _commit(cnxn)
+        except Exception as part_err:
+            cnxn.rollback()
+            if is_systemic_error(part_err):
+                raise
+            if check_systemic and low == 0 and _same_error(error, part_err):
+                raise error from part_err
+            rejected += _isolate_failed_rows(cnxn, cursor, backend, statement, part, index_labels[low:high],
+                                             part_err, column_names, rejects, prefix)
+    return rejected
+
+
+def _recover_batch(cnxn, cursor, backend, statement, df, start, rows, error, result, rejects, prefix=""):
+    """
+    Isolates the bad rows of a rolled-back batch and adds the outcome to
+    result. Only data errors are bisected; a systemic error is raised.
+    """
+    if is_systemic_error(error):
+        raise error
+    logging.warning(f"{prefix}Batch starting at row {df.index[start]} failed ({error}); isolating the bad rows.")
+    index_labels = df.index[start:start + len(rows)]
+    with stage('isolate_errors', rows=len(rows)):
+        rejected = _isolate_failed_rows(cnxn, cursor, backend, statement, rows, index_labels, error,
+                                        list(df.columns), rejects, prefix, check_systemic=not is_data_error(error))
+    result.rows += len(rows) - len(rejected)
+    result.failed += len(rejected)
+    result.rejected.extend(rejected)
+    logging.warning(f"{prefix}{len(rejected)} of {len(rows)} rows rejected from the batch "
+                    f"starting at row {df.index[start]}.")
+
+
+def _resend_batches(cnxn, cursor, backend, statement, df, batches, result, rejects, prefix=""):
+    """
+    Writes and commits batches one at a time after a rollback took them
+    along with a failed batch of the same transaction. They went in once
+    already, so each is expected to succeed; any that does not is isolated.
+    """
+    if batches:
+        logging.info(f"{prefix}Resending {sum(len(rows) for _, rows in batches)} uncommitted rows rolled back "
+                     f"with the failed batch.")
+    for start, rows in batches:
+        try:
+            backend.write_batch(cursor, statement, rows)
+            _commit(cnxn)
+            result.rows += len(rows)
+        except Exception as batch_err:
+            cnxn.rollback()
+            _recover_batch(cnxn, cursor, backend, statement, df, start, rows, batch_err, result, rejects, prefix)
+
+
+def _upload_frame(cnxn, cursor, backend, statement, df, batch_size, result, started, label=None,
+                  on_commit=None, rejects=None, sizer=None):
+    """
+    Sends one DataFrame through the open cursor, accumulating into result.
+    label prefixes the progress messages when several uploads run at once.
+    After every commit on_commit(df, next_row) is called, where next_row is
+    the row number (index label) following the last committed record.
+    Rows isolated from failed batches go to rejects (a RejectFile), or are
+    logged when it is None.
+
+    Without a sizer every batch_size rows are committed on their own. With
+    an AdaptiveBatchSizer it picks each batch's size and whether to commit
+    after it; the frame's last batch is always committed.
+    """
+    prefix = f"[{label}] " if label else ""
+    pending = [] # (start, rows) of batches written since the last commit
+    batches = iter_row_batches(df, (lambda: sizer.batch_size) if sizer else batch_size)
+    for start, rows in batches:
+        last = start + len(rows) >= len(df)
+        try:
+            with stage('execute', rows=len(rows)):
+                write_started = time.perf_counter()
+                backend.write_batch(cursor, statement, rows)
+                write_seconds = time.perf_counter() - write_started
+        except Exception as batch_err:
+            cnxn.rollback()
+            if is_systemic_error(batch_err):
+                raise
+            if sizer:
+                sizer.discard_uncommitted()
+            _resend_batches(cnxn, cursor, backend, statement, df, pending, result, rejects, prefix)
+            pending = []
+            _recover_batch(cnxn, cursor, backend, statement, df, start, rows, batch_err, result, rejects, prefix)
+        else:
+            pending.append((start, rows))
+            if sizer:
+                sizer.observe_batch(len(rows), write_seconds, estimate_batch_bytes(rows))
+                due = sizer.should_commit()
+                if not due and not last:
+                    continue
+            commit_seconds = _commit(cnxn)
+            if sizer:
+                sizer.observe_commit(commit_seconds, scheduled=due)
+            result.rows += sum(len(pending_rows) for _, pending_rows in pending)
+            pending = []
+
+        if on_commit:
+            on_commit(df, int(df.index[start + len(rows) - 1]) + 1)
+        result.seconds = time.perf_counter() - started
+        logging.info(f"{prefix}Committed {result.rows} records ({result.rows_per_sec:,.0f} rows/sec).")
+        print(f"{prefix}Uploaded {result.rows} records...")
+
+
+def _describe_sizing(batch_size, sizer):
+    if sizer:
+        return f"adaptive batch size {sizer.min_batch}-{sizer.max_batch}, starting at {sizer.batch_size}"
+    return f"batch size {batch_size}"
+
+
+def upload_in_batches(cnxn, df, table_name, batch_size=DEFAULT_BATCH_SIZE, column_names=None, backend=None,
+                      label=None, on_commit=None, rejects=None, sizer=None):
+    """
+    Inserts the DataFrame into table_name, sending batch_size rows per call
+    through the backend's bulk path and committing after every batch. The
+    default backend binds each batch through cursor.executemany, with
+    fast_executemany switched on when the driver supports it (pyodbc).
+    Given an AdaptiveBatchSizer, batch size and commit interval are tuned
+    from measured latencies instead.
+
+    A batch that fails with a data error is rolled back and bisected until
+    the offending records are found; they are written to rejects (a
+    RejectFile) if given, otherwise logged. A systemic error (lost
+    connection, missing table, permissions) is raised instead, leaving what
+    was committed in place. label prefixes progress messages when several uploads
+    run at once; on_commit is called after every commit (e.g.
+    Checkpoint.record). Returns an UploadResult.
+    """
+    backend = backend or Backend()
+    column_names = list(column_names if column_names is not None else df.columns)
+    statement = backend.prepare(table_name, column_names)
+    logging.info(f"Prepared bulk statement: {backend.describe(statement)} ({_describe_sizing(batch_size, sizer)})")
+
+    result = UploadResult()
+    cursor = backend.open_cursor(cnxn)
+    started = time.perf_counter()
+    try:
+        _upload_frame(cnxn, cursor, backend, statement, df, batch_size, result, started, label=label,
+                      on_commit=on_commit, rejects=rejects, sizer=sizer)
+    finally:
+        cursor.close()
+
+    result.seconds = time.perf_counter() - started
+    logging.info(
+        f"Uploaded {result.rows} records to '{table_name}' in {result.seconds:.2f}s "
+        f"({result.rows_per_sec:,.0f} rows/sec, {result.failed} failed)."
+    )
+    return result
+
+
+def upload_chunks(cnxn, chunks, table_name, column_names, batch_size=DEFAULT_BATCH_SIZE, backend=None,
+                  label=None, on_commit=None, rejects=None, sizer=None, result=None):
+    """
+    Streaming counterpart of upload_in_batches: uploads an iterable of
+    DataFrame chunks one after another. Each chunk is finished (and can be
+    released) before the next one is read, so memory use does not grow with
+    the size of the source file. Progress is reported after every chunk.
+    Returns an UploadResult for the whole stream; pass result to have the
+    totals added to an UploadResult of your own, which then also holds the
+    rows committed and rejected so far if the upload raises.
+    """
+    backend = backend or Backend()
+    statement = backend.prepare(table_name, column_names)
+    logging.info(f"Prepared bulk statement: {backend.describe(statement)} ({_describe_sizing(batch_size, sizer)})")
+
+    result = result if result is not None else UploadResult()
+    records_read = 0
+    cursor = backend.open_cursor(cnxn)
+    started = time.perf_counter()
+    try:
+        for number, chunk in enumerate(chunks, 1):
+            records_read += len(chunk)
+            _upload_frame(cnxn, cursor, backend, statement, chunk, batch_size, result, started, label=label,
+                          on_commit=on_commit, rejects=rejects, sizer=sizer)
+            prefix = f"[{label}] " if label else ""
+            logging.info(
+                f"{prefix}Chunk {number}: {records_read} records read, {result.rows} uploaded, "
+                f"{result.failed} failed ({result.rows_per_sec:,.0f} rows/sec)."
+            )
+            print(f"{prefix}Chunk {number} complete: {result.rows} records uploaded so far.")
+    finally:
+        cursor.close()
+
+    result.seconds = time.perf_counter() - started
+    logging.info(
+        f"Streamed {result.rows} records to '{table_name}' in {result.seconds:.2f}s "
+        f"({result.rows_per_sec:,.0f} rows/sec, {result.failed} failed)."
+    )
+    return result
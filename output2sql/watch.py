@@ -0,0 +1,397 @@
+# output2sql/watch.py
+#
+"""
+Watch mode: a long-running loader for directories that files keep arriving in.
+
+    python -m output2sql landing/ --watch --create-table --target loads.db
+    python -m output2sql.watch --status
+
+Every --interval seconds the directories are scanned recursively with
+os.scandir. A data file (.csv or .json, compressed or not; hidden files and
+directories, and the loader's own output such as rejects and metrics, are
+ignored) is taken to be completely written once its size
+and mtime have not changed between two scans and its mtime is at least
+--settle seconds old. It is then queued for one of --db-writers loader
+threads, which parse it in a shared process pool and upload it over a
+connection pool that stays open for the life of the daemon.
+
+No file is loaded twice. Each loaded file's content hash and table go into
+an append-only ledger, checked before every load, so a file that is
+renamed, copied into another folder or dropped again after a restart is
+skipped. A load interrupted by a crash or stop continues from its
+checkpoint on the next start (watch mode always resumes). A file that
+failed is retried only once it changes, or on the next start. A file that
+is changed after it was loaded counts as a new file; use --delta for
+extracts that are rewritten in place.
+
+The daemon's status (queue depth, files in progress, totals and rows/sec
+over the last few minutes) is rewritten to a JSON file after every scan
+and printed by python -m output2sql.watch --status.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from output2sql.compressed import data_extension
+from output2sql.metrics import is_metrics_file, stage
+from output2sql.pool import ConnectionPool
+from output2sql.rejects import is_reject_file
+
+# --- Configuration ---
+WATCH_DIR = os.environ.get('OUTPUT2SQL_WATCH_DIR', os.path.join('.output2sql', 'watch'))
+DEFAULT_SCAN_INTERVAL = 10.0 # Seconds between directory scans
+DEFAULT_SETTLE_SECONDS = 30.0 # A file unchanged for this long is taken to be completely written
+THROUGHPUT_WINDOW_SECONDS = 300 # Recent throughput is measured over this many seconds
+HASH_BLOCK_SIZE = 1024 * 1024
+SUPPORTED_EXTENSIONS = ('.csv', '.json') # As in batch mode
+
+
+# --- Scanning ---
+def scan_directories(directories, exclude=()):
+    """
+    Yields (path, size, mtime_ns) for every data file below directories,
+    recursively. Skipped are hidden files and directories (such as
+    .output2sql), the directories in exclude (the loader's own output:
+    rejects, exported scripts, cache, checkpoints, metrics), reject and
+    metrics files wherever they are, and entries that vanish or cannot be
+    read mid-scan.
+    """
+    exclude = {os.path.abspath(path) for path in exclude}
+    pending = list(directories)
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if os.path.abspath(entry.path) not in exclude:
+                                pending.append(entry.path)
+                        elif (entry.is_file() and data_extension(entry.name) in SUPPORTED_EXTENSIONS
+                              and not is_reject_file(entry.name) and not is_metrics_file(entry.name)):
+                            stat = entry.stat()
+                            yield entry.path, stat.st_size, stat.st_mtime_ns
+                    except OSError as e:
+                        logging.warning(f"Skipping {entry.path}: {e}")
+        except OSError as e:
+            logging.warning(f"Cannot scan {directory}: {e}")
+
+
+def content_hash(file_path):
+    """BLAKE2 hash of the file's whole contents (as stored, i.e. compressed if it is)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StabilityTracker:
+    """Decides from successive scans when a file has finished being written."""
+
+    def __init__(self, settle_seconds=DEFAULT_SETTLE_SECONDS):
+        self.settle_seconds = settle_seconds
+        self._seen = {} # path -> (size, mtime_ns) at the previous scan
+
+    def update(self, entries, now=None):
+        """
+        Takes one scan's (path, size, mtime_ns) entries and returns those
+        whose size and mtime are unchanged since the previous scan and whose
+        mtime is at least settle_seconds old. Vanished files are forgotten.
+        """
+        now = time.time() if now is None else now
+        seen = {path: (size, mtime_ns) for path, size, mtime_ns in entries}
+        settled = [(path, size, mtime_ns) for path, (size, mtime_ns) in seen.items()
+                   if self._seen.get(path) == (size, mtime_ns) and now - mtime_ns / 1e9 >= self.settle_seconds]
+        for path, _, _ in settled:
+            del seen[path]
+        self._seen = seen
+        return settled
+
+    @property
+    def waiting(self):
+        """Files seen but not settled yet."""
+        return len(self._seen)
+
+
+class LoadLedger:
+    """
+    Append-only JSON-lines record of every file loaded: content hash,
+    table, path, size, mtime, rows and time. Survives restarts; a (hash,
+    table) pair in it is never loaded again, and a file still at the same
+    path, size and mtime is recognised without hashing it again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._loaded = set()
+        self._files = set() # (path, size, mtime_ns) of loaded files
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue # A line cut short by a crash
+                    self._loaded.add((entry['hash'], entry['table']))
+                    self._files.add((entry.get('path'), entry.get('size'), entry.get('mtime_ns')))
+            logging.info(f"Load ledger {path}: {len(self._loaded)} files already loaded.")
+
+    def __len__(self):
+        return len(self._loaded)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._loaded
+
+    def has_file(self, path, size, mtime_ns):
+        with self._lock:
+            return (os.path.abspath(path), size, mtime_ns) in self._files
+
+    def add(self, content, table, path, size, mtime_ns, **details):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'hash': content, 'table': table, 'path': os.path.abspath(path), 'size': size,
+                                    'mtime_ns': mtime_ns, **details,
+                                    'loaded_at': datetime.now().isoformat(timespec='seconds')}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._loaded.add((content, table))
+            self._files.add((os.path.abspath(path), size, mtime_ns))
+
+
+# --- Daemon ---
+class WatchDaemon:
+    """
+    Scans directories and loads settled files with a BatchLoader until
+    stopped. exclude lists output directories that may lie inside the
+    watched tree and are never scanned; the loader's reject and export
+    directories and the daemon's own state directory are always excluded.
+    """
+
+    def __init__(self, loader, directories, interval=DEFAULT_SCAN_INTERVAL, settle_seconds=DEFAULT_SETTLE_SECONDS,
+                 directory=WATCH_DIR, exclude=()):
+        self.loader = loader
+        self.directories = list(directories)
+        self.exclude = [path for path in (*exclude, loader.reject_dir, loader.export_dir, directory) if path]
+        self.interval = interval
+        self.tracker = StabilityTracker(settle_seconds)
+        self.ledger = LoadLedger(os.path.join(directory, 'loaded.jsonl'))
+        self.status_path = os.path.join(directory, 'status.json')
+        self.queue = queue.Queue()
+        self.workers = loader.db_writers
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._handled = {} # path -> (size, mtime_ns) it was queued with; not queued again unless changed
+        self._claimed = set() # (hash, table) being loaded right now
+        self._in_progress = {} # path -> start time
+        self._recent = deque() # (finished at, rows) of recent loads
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.totals = {'loaded': 0, 'skipped': 0, 'failed': 0, 'rows': 0, 'rows_failed': 0}
+        self.last_scan_seconds = 0.0
+
+    def stop(self):
+        """Asks the daemon to stop; files being loaded are finished first."""
+        self._stop.set()
+
+    def run(self, once=False):
+        """
+        Scans and loads until stop() is called. With once=True the
+        directories are scanned until nothing is left waiting to settle,
+        everything queued is loaded, and the daemon returns.
+        Ctrl-C stops it the same way, after the files being loaded.
+        The loader should resume (BatchLoader(resume=True)), so a file
+        interrupted in an earlier run continues where it left off.
+        """
+        pool = ConnectionPool(self.loader.backend.connect, self.workers)
+        logging.info(f"Watching {', '.join(self.directories)} every {self.interval:g}s "
+                     f"(settle {self.tracker.settle_seconds:g}s, {self.workers} loaders).")
+        try:
+            # Spawned, like batch mode's parse processes: they start their own range-parsing pools
+            with ProcessPoolExecutor(max_workers=self.loader.parse_workers,
+                                     mp_context=multiprocessing.get_context('spawn')) as parsers:
+                # Start the parse processes now, so the first file to settle does not wait for them
+                parsers.submit(os.getpid).result()
+                threads = [threading.Thread(target=self._work, args=(pool, parsers), name=f'loader-{i}', daemon=True)
+                           for i in range(self.workers)]
+                for thread in threads:
+                    thread.start()
+                try:
+                    while not self._stop.is_set():
+                        self._scan()
+                        self._write_status()
+                        if once and not self.tracker.waiting:
+                            self.queue.join()
+                            break
+                        self._stop.wait(self.interval)
+                except KeyboardInterrupt:
+                    logging.info("Interrupted; stopping once the files being loaded are done.")
+                self._stop.set()
+                for thread in threads:
+                    thread.join()
+        finally:
+            pool.close_all()
+            self._write_status()
+            logging.info(f"Watch mode stopped: {self.totals['loaded']} files, {self.totals['rows']:,} rows loaded.")
+
+    def _scan(self):
+        started = time.perf_counter()
+        with stage('watch_scan') as call:
+            entries = list(scan_directories(self.directories, self.exclude))
+            call.rows = len(entries)
+            with self._lock:
+                fresh = [entry for entry in entries if self._handled.get(entry[0]) != entry[1:]]
+            settled = self.tracker.update(fresh)
+            for path, size, mtime_ns in settled:
+                with self._lock:
+                    self._handled[path] = (size, mtime_ns)
+                self.queue.put((path, size, mtime_ns))
+                logging.info(f"Queued {path} ({size:,} bytes).")
+        self.last_scan_seconds = time.perf_counter() - started
+
+    def _work(self, pool, parsers):
+        """Loader-thread body: loads queued files until the daemon stops."""
+        while not self._stop.is_set():
+            try:
+                path, size, mtime_ns = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._load(path, size, mtime_ns, pool, parsers)
+            except Exception as e:
+                logging.error(f"Loading {path} failed: {e}", exc_info=True)
+                with self._lock:
+                    self.totals['failed'] += 1
+            finally:
+                self.queue.task_done()
+
+    def _skip(self, path, reason):
+        logging.info(f"Skipping {path}: {reason}.")
+        with self._lock:
+            self.totals['skipped'] += 1
+
+    def _load(self, path, size, mtime_ns, pool, parsers):
+        table = self.loader.table_for(path)
+        if self.ledger.has_file(path, size, mtime_ns):
+            self._skip(path, f"already loaded into '{table}'")
+            return
+        content = content_hash(path)
+        key = (content, table)
+        with self._lock:
+            duplicate = key in self.ledger or key in self._claimed
+            if not duplicate:
+                self._claimed.add(key)
+                self._in_progress[path] = time.perf_counter()
+        if duplicate:
+            self._skip(path, f"the same contents were already loaded into '{table}'")
+            return
+
+        try:
+            report = self.loader.load_file(path, pool, parsers)
+            if report.status in ('ok', 'partial', 'skipped'):
+                self.ledger.add(content, table, path, size, mtime_ns, rows=report.rows_uploaded,
+                                rows_failed=report.rows_failed, status=report.status)
+        finally:
+            with self._lock:
+                self._claimed.discard(key)
+                del self._in_progress[path]
+        with self._lock:
+            if report.status == 'failed':
+                self.totals['failed'] += 1
+            elif report.status == 'skipped':
+                self.totals['skipped'] += 1
+            else:
+                self.totals['loaded'] += 1
+                self.totals['rows'] += report.rows_uploaded
+                self.totals['rows_failed'] += report.rows_failed
+                self._recent.append((time.perf_counter(), report.rows_uploaded))
+        logging.info(f"Watch: {path} -> {table}: {report.status}, {report.rows_uploaded:,} rows "
+                     f"in {report.parse_seconds + report.upload_seconds:.2f}s. {self.format_status()}")
+        if report.status == 'failed':
+            logging.warning(f"{path} will be retried once it changes or the daemon restarts.")
+
+    # --- Status ---
+    def status(self):
+        """Queue depth, files in progress, totals and throughput, as a dictionary."""
+        now = time.perf_counter()
+        with self._lock:
+            while self._recent and now - self._recent[0][0] > THROUGHPUT_WINDOW_SECONDS:
+                self._recent.popleft()
+            window = min(THROUGHPUT_WINDOW_SECONDS, now - self._started)
+            return {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'updated_at': datetime.now().isoformat(timespec='seconds'),
+                'directories': self.directories,
+                'queued': self.queue.qsize(),
+                'in_progress': {path: round(now - started, 1) for path, started in self._in_progress.items()},
+                'waiting_to_settle': self.tracker.waiting,
+                'last_scan_seconds': round(self.last_scan_seconds, 3),
+                'ledger_files': len(self.ledger),
+                **self.totals,
+                'rows_per_sec_recent': round(sum(rows for _, rows in self._recent) / window, 1) if window else 0.0,
+                'rows_per_sec_overall': round(self.totals['rows'] / (now - self._started), 1),
+                'recent_window_seconds': THROUGHPUT_WINDOW_SECONDS,
+            }
+
+    def format_status(self):
+        return format_status(self.status())
+
+    def _write_status(self):
+        os.makedirs(os.path.dirname(self.status_path) or '.', exist_ok=True)
+        temp_path = self.status_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.status(), f, indent=2)
+        os.replace(temp_path, self.status_path)
+
+
+def format_status(status):
+    """One line summarising a status dictionary."""
+    return (f"Queue {status['queued']}, loading {len(status['in_progress'])}, "
+            f"settling {status['waiting_to_settle']}; {status['loaded']} loaded, {status['skipped']} skipped, "
+            f"{status['failed']} failed; {status['rows']:,} rows, "
+            f"{status['rows_per_sec_recent']:,.0f} rows/sec recently.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m output2sql.watch',
+                                     description="Show the status of a running watch-mode loader.")
+    parser.add_argument('--status', action='store_true', help="Print the daemon's status (the default action).")
+    parser.add_argument('--dir', default=WATCH_DIR, help="The daemon's state directory (default: %(default)s).")
+    parser.add_argument('--json', action='store_true', help="Print the raw status JSON.")
+    args = parser.parse_args(argv)
+
+    path = os.path.join(args.dir, 'status.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            status = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"No status at {path}: {e}")
+        return 1
+    if args.json:
+        print(json.dumps(status, indent=2))
+        return 0
+    print(f"Watching {', '.join(status['directories'])} since {status['started_at']} "
+          f"(status of {status['updated_at']}).")
+    print(format_status(status))
+    for path, seconds in status['in_progress'].items():
+        print(f"  loading {path} ({seconds:,.0f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+# tests/conftest.py
+#
+"""
+Shared fixtures. The engine is exercised against SQLite, the stand-in the
+upload code is written to accept (see output2sql.upload); every test runs in
+its own temporary working directory, so checkpoints, row-hash indexes and
+reject files never touch the repository.
+"""
+import pandas as pd
+import pytest
+
+from output2sql.backends import SQLiteBackend
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def backend(tmp_path):
+    """SQLite file database, so several connections (parallel uploads) see the same tables."""
+    return SQLiteBackend(str(tmp_path / 'target.db'))
+
+
+@pytest.fixture
+def cnxn(backend):
+    cnxn = backend.connect()
+    cnxn.execute('CREATE TABLE contacts (id INTEGER PRIMARY KEY, name TEXT NOT NULL, age INTEGER)')
+    cnxn.commit()
+    yield cnxn
+    cnxn.close()
+
+
+@pytest.fixture
+def contacts():
+    """500 records, every tenth age missing."""
+    return pd.DataFrame({
+        'id': range(500),
+        'name': [f"name{i}" for i in range(500)],
+        'age': pd.array([None if i % 10 == 0 else 20 + i % 50 for i in range(500)], dtype='Int64'),
+    })
+
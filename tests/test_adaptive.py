@@ -0,0 +1,86 @@
+# tests/test_adaptive.py
+#
+"""Adaptive sizing: commit decisions from measured latency, and hill-climbing the batch size."""
+import threading
+
+import pytest
+
+from output2sql.adaptive import WINDOW_BATCHES, AdaptiveBatchSizer, estimate_batch_bytes
+from output2sql.upload import upload_in_batches
+
+
+def run_windows(sizer, rows_per_sec, windows):
+    """Feeds sizer windows of batches whose speed is rows_per_sec(batch size); returns the sizes chosen."""
+    sizes = []
+    for _ in range(windows):
+        for _ in range(WINDOW_BATCHES):
+            sizer.observe_batch(sizer.batch_size, sizer.batch_size / rows_per_sec(sizer.batch_size), 0)
+        sizer.observe_commit(0.001)
+        sizes.append(sizer.batch_size)
+    return sizes
+
+
+def test_initial_batch_must_be_within_bounds():
+    with pytest.raises(ValueError):
+        AdaptiveBatchSizer(50, min_batch=100)
+
+
+def test_commit_when_its_cost_is_small_next_to_the_inserts():
+    sizer = AdaptiveBatchSizer(1000, commit_overhead=0.05)
+    assert sizer.should_commit() # Nothing measured yet
+    sizer.observe_batch(1000, 0.1, 0)
+    sizer.observe_commit(0.01)
+    sizer.observe_batch(1000, 0.1, 0)
+    assert not sizer.should_commit()
+    sizer.observe_batch(1000, 0.1, 0)
+    assert sizer.should_commit() # 0.2s of inserts; the commit costs 5% of that
+
+
+@pytest.mark.parametrize('limit', [dict(max_commit_rows=1500), dict(log_budget_bytes=15_000)])
+def test_commit_limits(limit):
+    sizer = AdaptiveBatchSizer(1000, **limit)
+    sizer.observe_commit(10.0) # A very slow commit would otherwise put it off indefinitely
+    sizer.observe_batch(1000, 0.1, 10_000)
+    assert not sizer.should_commit()
+    sizer.observe_batch(1000, 0.1, 10_000)
+    assert sizer.should_commit()
+
+
+def test_batch_size_climbs_to_the_fastest_size():
+    sizer = AdaptiveBatchSizer(1000, min_batch=100, max_batch=100_000)
+    sizes = run_windows(sizer, lambda size: 50_000 - abs(size - 8000), 30) # Peak at 8,000 rows per batch
+    assert max(sizes) < 20_000
+    assert all(3000 <= size <= 20_000 for size in sizes[-10:])
+
+
+def test_batch_size_stays_within_bounds():
+    sizer = AdaptiveBatchSizer(1000, min_batch=100, max_batch=2000)
+    assert max(run_windows(sizer, lambda size: float(size), 20)) == 2000 # Always faster when bigger
+    sizer = AdaptiveBatchSizer(1000, min_batch=500, max_batch=2000)
+    assert min(run_windows(sizer, lambda size: 1e6 / size, 20)) == 500
+
+
+def test_each_thread_tunes_its_own_copy():
+    sizer = AdaptiveBatchSizer(1000)
+    clones = []
+    thread = threading.Thread(target=lambda: clones.extend([sizer.for_current_thread(), sizer.for_current_thread()]))
+    thread.start()
+    thread.join()
+    assert clones[0] is clones[1] and clones[0] is not sizer.for_current_thread()
+    assert clones[0].batch_size == 1000
+
+
+def test_estimate_batch_bytes():
+    rows = [(i, 'x' * 10, None) for i in range(1000)]
+    assert estimate_batch_bytes([]) == 0
+    assert 25_000 <= estimate_batch_bytes(rows) <= 32_000 # Text length plus 8 bytes per non-null value
+
+
+def test_adaptive_upload_loads_every_row(cnxn, backend, contacts):
+    commits = []
+    result = upload_in_batches(cnxn, contacts, 'contacts', backend=backend,
+                               sizer=AdaptiveBatchSizer(100, min_batch=10, max_batch=200),
+                               on_commit=lambda df, next_row: commits.append(next_row))
+    assert (result.rows, result.failed) == (500, 0)
+    assert commits[-1] == 500
+    assert cnxn.execute('SELECT COUNT(*) FROM contacts').fetchone() == (500,)
@@ -0,0 +1,40 @@
+# tests/test_backends.py
+#
+"""Backends: target selection and the CSV stream PostgreSQL's COPY is fed."""
+from output2sql.backends import PostgresBackend, SQLiteBackend, SqlServerBackend, get_backend
+
+
+class CopyCursor:
+    """Stands in for a psycopg2 cursor, keeping what copy_expert was given."""
+
+    def copy_expert(self, statement, buffer):
+        self.statement = statement
+        self.data = buffer.read()
+
+
+def copy(rows):
+    backend = PostgresBackend()
+    cursor = CopyCursor()
+    backend.write_batch(cursor, backend.prepare('contacts', ['id', 'name', 'note']), rows)
+    return cursor
+
+
+def test_copy_statement():
+    assert copy([]).statement == \
+        'COPY contacts ("id", "name", "note") FROM STDIN WITH (FORMAT csv, NULL \'\\N\')'
+
+
+def test_copy_tells_null_from_empty_and_literal_marker():
+    data = copy([(1, None, ''), (2, 'say "hi"', 'a,b\nc'), (3, '\\N', None)]).data
+    assert data.splitlines(keepends=True) == [
+        '1,\\N,\n',
+        '2,"say ""hi""","a,b\n', 'c"\n',
+        '"3","\\N",\\N\n', # Only an unquoted \N is NULL
+    ]
+
+
+def test_get_backend():
+    assert isinstance(get_backend('postgresql://loader@db/warehouse'), PostgresBackend)
+    assert isinstance(get_backend('sqlite:///loads.db'), SQLiteBackend)
+    assert get_backend('loads.sqlite').path == 'loads.sqlite'
+    assert isinstance(get_backend('DRIVER={ODBC Driver 18 for SQL Server};SERVER=db'), SqlServerBackend)
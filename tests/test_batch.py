@@ -0,0 +1,84 @@
+# tests/test_batch.py
+#
+"""Headless batch mode: file selection, table mapping and whole runs against a SQLite target."""
+import json
+import os
+import sqlite3
+
+import pytest
+
+from output2sql.batch import expand_patterns, main, parse_key_map, parse_table_map, resolve_table_name
+
+
+def write_csv(path, rows=300, first_id=0):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('id,name,age\n')
+        for i in range(first_id, first_id + rows):
+            f.write(f"{i},name{i},{'' if i % 10 == 0 else 20 + i % 50}\n")
+
+
+def write_ndjson(path, rows=200):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(rows):
+            f.write(json.dumps({'make': f"make{i % 7}", 'year': 1990 + i % 30}) + '\n')
+
+
+def run(*args):
+    return main([*args, '--target', 'target.db', '--create-table', '--yes', '--parse-workers', '1',
+                 '--log-file', 'batch.log'])
+
+
+def count(table):
+    with sqlite3.connect('target.db') as cnxn:
+        return cnxn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_expand_patterns_picks_distinct_data_files():
+    write_csv('a.csv')
+    write_csv('sub/b.csv')
+    write_ndjson('c.json')
+    for name in ('notes.txt', 'a.csv.rejects.csv', '.output2sql/metrics/run.metrics.json'):
+        os.makedirs(os.path.dirname(name) or '.', exist_ok=True)
+        open(name, 'w').close()
+    with open('a.csv', 'rb') as f, open('d.csv.gz', 'wb') as out:
+        out.write(f.read())
+    assert expand_patterns(['*.csv', 'a.csv', '**/*.json', '**/*.gz', 'sub/*.csv', '*.txt', 'missing*']) == \
+        ['a.csv', 'c.json', 'd.csv.gz', os.path.join('sub', 'b.csv')]
+
+
+def test_table_mapping():
+    table_map = parse_table_map(['contacts_*=contacts', 'extracts/*=staging'])
+    assert resolve_table_name('in/contacts_2024.csv', table_map) == 'contacts'
+    assert resolve_table_name('extracts/x.csv', table_map) == 'staging'
+    assert resolve_table_name('car-data.v2.json.gz', table_map) == 'car_data_v2'
+    with pytest.raises(ValueError):
+        parse_table_map(['contacts'])
+    assert parse_key_map(['id', 'cars=make, year']) == {'*': ['id'], 'cars': ['make', 'year']}
+    with pytest.raises(ValueError):
+        parse_key_map(['=id'])
+
+
+def test_run_loads_every_file():
+    write_csv('contacts_1.csv')
+    write_csv('contacts_2.csv', first_id=300)
+    write_ndjson('cars.json')
+    assert run('contacts_*.csv', 'cars.json', '--table', 'contacts_*=contacts', '--db-writers', '2') == 0
+    assert (count('contacts'), count('cars')) == (600, 200)
+    metrics_files = os.listdir(os.path.join('.output2sql', 'metrics'))
+    assert metrics_files == ['batch.metrics.json']
+
+
+def test_streamed_run_resumes_and_skips_loaded_files():
+    write_csv('contacts.csv', rows=1000)
+    assert run('contacts.csv', '--pipeline', '--chunk-size', '100') == 0
+    assert run('contacts.csv', '--resume') == 0 # Already loaded: skipped
+    assert count('contacts') == 1000
+
+
+def test_failed_file_sets_the_exit_status():
+    write_csv('contacts.csv')
+    with open('broken.json', 'w', encoding='utf-8') as f:
+        f.write('{"id": 1}\n{"id": ')
+    assert run('contacts.csv', 'broken.json') == 1
+    assert count('contacts') == 300
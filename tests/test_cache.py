@@ -0,0 +1,74 @@
+# tests/test_cache.py
+#
+"""Parse cache: hits for unchanged files, misses after a change, and least-recently-used eviction."""
+import os
+
+import pandas as pd
+
+from output2sql.cache import META_FILE, ParseCache, main
+from output2sql.readers import read_file
+from output2sql.schema import profile_file
+
+
+def write_csv(path, rows=200, name='name'):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('id,name,age\n')
+        for i in range(rows):
+            f.write(f"{i},{name}{i},{'' if i % 10 == 0 else 20 + i % 50}\n")
+
+
+def cached(cache, path, sample_rows=None):
+    schema = profile_file(path, sample_rows=sample_rows)
+    cache.store_schema(path, schema, sample_rows)
+    cache.store_data(path, read_file(path, schema), sample_rows)
+    return schema
+
+
+def test_unchanged_file_hits():
+    write_csv('contacts.csv')
+    cache = ParseCache('cache')
+    schema = cached(cache, 'contacts.csv')
+    assert cache.load_schema('contacts.csv') == schema
+    assert cache.load_schema('contacts.csv', sample_rows=50) is None # Other sample sizes are cached apart
+    pd.testing.assert_frame_equal(ParseCache('cache').load_data('contacts.csv'), read_file('contacts.csv', schema))
+
+
+def test_changed_file_misses_and_replaces_the_old_entry():
+    write_csv('contacts.csv')
+    cache = ParseCache('cache')
+    cached(cache, 'contacts.csv')
+    write_csv('contacts.csv', name='NAME') # Same size, different contents
+    os.utime('contacts.csv', ns=(0, 0))
+
+    cache = ParseCache('cache')
+    assert cache.load_schema('contacts.csv') is None and cache.load_data('contacts.csv') is None
+    cached(cache, 'contacts.csv')
+    assert len(cache.entries()) == 1
+    assert cache.load_data('contacts.csv')['name'][1] == 'NAME1'
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ParseCache('cache')
+    for number in range(3):
+        write_csv(f"data{number}.csv")
+        cached(cache, f"data{number}.csv")
+        os.utime(os.path.join(cache.directory, cache.key(f"data{number}.csv"), META_FILE), (number, number))
+    cache.load_schema('data0.csv') # Now the most recently used
+    entry_bytes = cache.entries()[0]['bytes']
+
+    cache.size_limit = 2 * entry_bytes + entry_bytes // 2
+    assert cache.evict() == 1
+    assert sorted(entry['source'] for entry in cache.entries()) == \
+        [os.path.abspath('data0.csv'), os.path.abspath('data2.csv')]
+
+
+def test_invalidate_and_command_line(capsys):
+    cache = ParseCache('cache')
+    for number in range(2):
+        write_csv(f"data{number}.csv")
+        cached(cache, f"data{number}.csv")
+    assert main(['--dir', 'cache', '--invalidate', 'data0.csv']) == 0
+    assert [entry['source'] for entry in cache.entries()] == [os.path.abspath('data1.csv')]
+    main(['--dir', 'cache', '--list'])
+    assert '1 entries' in capsys.readouterr().out
+    assert cache.invalidate() == 1 and cache.entries() == []
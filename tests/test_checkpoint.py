@@ -0,0 +1,106 @@
+# tests/test_checkpoint.py
+#
+"""Checkpointed loads: a load that fails part way resumes after its last committed record."""
+import json
+import os
+
+import pytest
+
+from output2sql.checkpoint import Checkpoint
+from output2sql.readers import iter_file_chunks
+from output2sql.schema import profile_file
+from output2sql.upload import upload_chunks
+
+COLUMNS = ['id', 'name', 'age']
+
+
+def write_csv(path, rows=1000):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('id,name,age\n')
+        for i in range(rows):
+            f.write(f"{i},name{i},{'' if i % 10 == 0 else 20 + i % 50}\n")
+
+
+def write_ndjson(path, rows=1000, newline='\r\n'):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for i in range(rows):
+            f.write(json.dumps({'id': i, 'name': f"näme{i}", 'age': None if i % 10 == 0 else 20 + i % 50}) + newline)
+
+
+def fail_after(chunks, count):
+    for number, chunk in enumerate(chunks, 1):
+        if number > count:
+            raise ConnectionError('connection lost')
+        yield chunk
+
+
+def load(cnxn, backend, path, schema, fail_after_chunks=None):
+    """Loads path with checkpointing, like batch mode; returns the checkpoint it started from."""
+    checkpoint = Checkpoint.load(path, 'contacts')
+    chunks = iter_file_chunks(path, schema, chunk_size=100, **checkpoint.resume_arguments())
+    if fail_after_chunks:
+        chunks = fail_after(chunks, fail_after_chunks)
+    upload_chunks(cnxn, chunks, 'contacts', COLUMNS, batch_size=30, backend=backend, on_commit=checkpoint.record)
+    checkpoint.mark_complete()
+    return checkpoint
+
+
+@pytest.mark.parametrize('file_name, write', [
+    ('contacts.csv', write_csv),
+    ('contacts.json', write_ndjson), # CRLF line endings: offsets must count the bytes on disk
+    ('contacts_lf.json', lambda path: write_ndjson(path, newline='\n')),
+])
+def test_resume_after_failure_loads_every_record_once(cnxn, backend, file_name, write):
+    write(file_name)
+    schema = profile_file(file_name)
+    with pytest.raises(ConnectionError):
+        load(cnxn, backend, file_name, schema, fail_after_chunks=3)
+
+    checkpoint = Checkpoint.load(file_name, 'contacts')
+    committed = cnxn.execute('SELECT COUNT(*) FROM contacts').fetchone()[0]
+    assert checkpoint.resumable
+    assert checkpoint.rows_committed == committed > 0
+
+    load(cnxn, backend, file_name, schema)
+    assert cnxn.execute('SELECT COUNT(*), COUNT(DISTINCT id), MAX(id), COUNT(age) FROM contacts').fetchone() == \
+        (1000, 1000, 999, 900)
+    assert Checkpoint.load(file_name, 'contacts').complete
+
+
+def test_checkpoint_resumes_mid_chunk():
+    write_csv('contacts.csv')
+    schema = profile_file('contacts.csv')
+    checkpoint = Checkpoint.load('contacts.csv', 'contacts')
+    first_chunk = next(iter_file_chunks('contacts.csv', schema, chunk_size=100))
+    checkpoint.record(first_chunk, 42) # Committed part way into the first chunk
+
+    resumed = Checkpoint.load('contacts.csv', 'contacts').resume_arguments()
+    chunks = list(iter_file_chunks('contacts.csv', schema, chunk_size=100, **resumed))
+    assert chunks[0].index[0] == 42
+    assert sum(len(chunk) for chunk in chunks) == 958
+
+
+def test_checkpoint_for_changed_file_starts_over(cnxn, backend):
+    write_csv('contacts.csv')
+    schema = profile_file('contacts.csv')
+    with pytest.raises(ConnectionError):
+        load(cnxn, backend, 'contacts.csv', schema, fail_after_chunks=2)
+    assert Checkpoint.load('contacts.csv', 'contacts').resumable
+
+    write_csv('contacts.csv', rows=1200)
+    checkpoint = Checkpoint.load('contacts.csv', 'contacts')
+    assert (checkpoint.rows_committed, checkpoint.resumable) == (0, False)
+
+
+def test_same_named_files_get_their_own_checkpoints():
+    for directory, rows in (('a', 1000), ('b', 500)):
+        os.makedirs(directory)
+        write_csv(os.path.join(directory, 'contacts.csv'), rows=rows)
+    schema = profile_file(os.path.join('a', 'contacts.csv'))
+    first = Checkpoint.load(os.path.join('a', 'contacts.csv'), 'contacts')
+    first.record(next(iter_file_chunks(first.source, schema, chunk_size=100)), 100)
+
+    second = Checkpoint.load(os.path.join('b', 'contacts.csv'), 'contacts')
+    assert second.path != first.path and not second.resumable
+    second.mark_complete()
+    assert Checkpoint.load(os.path.join('a', 'contacts.csv'), 'contacts').rows_committed == 100
@@ -0,0 +1,53 @@
+# tests/test_compact.py
+#
+"""Compact DataFrames: lossless narrower dtypes, and the same rows uploaded as before compaction."""
+import pandas as pd
+import pytest
+
+from output2sql.compact import compact_column, compact_dataframe
+from output2sql.upload import upload_in_batches
+
+
+@pytest.mark.parametrize('values, dtype', [
+    ([0, -128, 127, None], 'Int8'),
+    ([0, 300, None], 'Int16'),
+    ([-70_000, 0], 'Int32'),
+    ([2**40, 0], 'Int64'),
+])
+def test_integers_are_downcast_to_the_observed_range(values, dtype):
+    compacted = compact_column(pd.Series(pd.array(values, dtype='Int64')))
+    assert str(compacted.dtype) == dtype
+    assert compacted.astype('Int64').equals(pd.Series(pd.array(values, dtype='Int64')))
+
+
+def test_floats_narrow_only_when_lossless():
+    assert compact_column(pd.Series([0.5, 1.25, None])).dtype == 'float32'
+    assert compact_column(pd.Series([0.1, 2.5])).dtype == 'float64' # 0.1 has no exact float32
+
+
+def test_text_columns():
+    repeated = pd.Series(['NY', 'CA', None, 'NY'] * 50, dtype=object)
+    assert isinstance(compact_column(repeated).dtype, pd.CategoricalDtype)
+    unique = pd.Series([f"name{i}" for i in range(200)], dtype=object)
+    assert not isinstance(compact_column(unique).dtype, pd.CategoricalDtype)
+    mixed = pd.Series([['a'], 'b', None] * 10, dtype=object) # Raw JSON lists are left alone
+    assert compact_column(mixed).dtype == object
+
+
+def test_compaction_report(contacts):
+    contacts['state'] = pd.Series(['NY', 'CA', 'TX'] * 166 + ['NY', 'CA'], dtype=object)
+    report = compact_dataframe(contacts)
+    assert (report.dtypes['id'], report.dtypes['age'], report.dtypes['state']) == ('Int16', 'Int8', 'category')
+    assert report.bytes_after < report.bytes_before
+    assert report.after['state'] < report.before['state'] / 4
+    assert 'state' in report.format_table() and 'smaller' in report.summary()
+
+
+def test_compacted_frame_uploads_the_same_rows(cnxn, backend, contacts):
+    contacts['name'] = pd.Series([f"name{i % 7}" for i in range(500)], dtype=object)
+    expected = [tuple(row) for row in contacts.astype(object).where(contacts.notna(), None).itertuples(index=False)]
+    compact_dataframe(contacts)
+    assert isinstance(contacts['name'].dtype, pd.CategoricalDtype)
+
+    upload_in_batches(cnxn, contacts, 'contacts', batch_size=64, backend=backend)
+    assert cnxn.execute('SELECT id, name, age FROM contacts ORDER BY id').fetchall() == expected
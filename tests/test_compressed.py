@@ -0,0 +1,90 @@
+# tests/test_compressed.py
+#
+"""Compressed inputs: gzip, bzip2, xz and zstd files read like the plain ones, offsets counting data bytes."""
+import bz2
+import gzip
+import importlib.util
+import json
+import lzma
+
+import pandas as pd
+import pytest
+
+from output2sql.compressed import data_extension, estimated_data_size, is_compressed, open_data, split_compression
+from output2sql.jsonstream import iter_json_records
+from output2sql.readers import iter_file_chunks
+from output2sql.schema import profile_file, table_name_for_file
+
+HAVE_ZSTD = importlib.util.find_spec('zstandard') is not None
+
+
+def compress_zstd(data):
+    import zstandard
+    return zstandard.ZstdCompressor().compress(data)
+
+
+CODECS = [
+    ('.gz', gzip.compress),
+    ('.bz2', bz2.compress),
+    ('.xz', lzma.compress),
+    pytest.param('.zst', compress_zstd,
+                 marks=pytest.mark.skipif(not HAVE_ZSTD, reason="zstandard is not installed")),
+]
+
+
+def csv_bytes(rows=1000):
+    lines = ['id,name,age'] + [f"{i},name{i},{'' if i % 10 == 0 else 20 + i % 50}" for i in range(rows)]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def json_bytes(rows=1000):
+    return ''.join(json.dumps({'id': i, 'name': f"näme{i}"}) + '\r\n' for i in range(rows)).encode('utf-8')
+
+
+def write(path, data, compress=None):
+    with open(path, 'wb') as f:
+        f.write(compress(data) if compress else data)
+
+
+def test_names():
+    assert split_compression('a.csv.gz') == ('a.csv', 'gzip')
+    assert [data_extension(name) for name in ('a.CSV.BZ2', 'a.json', 'a.txt.xz')] == ['.csv', '.json', '.txt']
+    assert is_compressed('a.json.zst') and not is_compressed('a.csv')
+    assert table_name_for_file('dir/car-data.v2.json.gz') == 'car_data_v2'
+
+
+@pytest.mark.parametrize('suffix, compress', CODECS)
+def test_compressed_csv_reads_like_the_plain_file(suffix, compress):
+    write('data.csv', csv_bytes())
+    write('data.csv' + suffix, csv_bytes(), compress)
+    schema = profile_file('data.csv')
+    assert {col: p.sql_definition() for col, p in profile_file('data.csv' + suffix).items()} == \
+        {col: p.sql_definition() for col, p in schema.items()}
+    plain = list(iter_file_chunks('data.csv', schema, chunk_size=100))
+    packed = list(iter_file_chunks('data.csv' + suffix, schema, chunk_size=100))
+    pd.testing.assert_frame_equal(pd.concat(packed), pd.concat(plain))
+    assert [c.attrs['source_offset'] for c in packed] == [c.attrs['source_offset'] for c in plain]
+
+    # Resuming skips to an offset in the decompressed data
+    third = packed[2]
+    resumed = list(iter_file_chunks('data.csv' + suffix, schema, chunk_size=100,
+                                    start_offset=third.attrs['source_offset'],
+                                    start_row=third.attrs['source_first_row']))
+    pd.testing.assert_frame_equal(pd.concat(resumed), pd.concat(plain[2:]))
+
+
+@pytest.mark.parametrize('suffix, compress', CODECS)
+def test_compressed_json_offsets_count_data_bytes(suffix, compress):
+    write('data.json', json_bytes())
+    write('data.json' + suffix, json_bytes(), compress)
+    plain = list(iter_json_records('data.json', with_offsets=True))
+    assert list(iter_json_records('data.json' + suffix, with_offsets=True)) == plain
+    _, offset = plain[499]
+    assert [r['id'] for r in iter_json_records('data.json' + suffix, start_offset=offset)] == list(range(500, 1000))
+
+
+def test_open_data_and_size_estimate():
+    write('data.csv.gz', csv_bytes(), gzip.compress)
+    with open_data('data.csv.gz', offset=12, text=True) as f:
+        assert f.readline() == '0,name0,\n'
+    assert estimated_data_size('data.csv.gz') > len(gzip.compress(csv_bytes()))
@@ -0,0 +1,130 @@
+# tests/test_delta.py
+#
+"""Delta loads: splitting rows into new, changed and unchanged, and keeping the row-hash index honest."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from output2sql import delta
+from output2sql.compact import compact_dataframe
+from output2sql.delta import DUPLICATE_KEY_ERROR, DeltaFilter, RowHashIndex, delta_upload, hash_rows
+from output2sql.rejects import RejectFile
+
+COLUMNS = ['id', 'name', 'age']
+
+
+def chunked(df, size=120):
+    return (df.iloc[start:start + size] for start in range(0, len(df), size))
+
+
+def edited(contacts):
+    """contacts with every fifth name changed and 50 new records appended."""
+    df = contacts.copy()
+    df['name'] = df['name'].astype(object)
+    df.loc[::5, 'name'] = 'renamed'
+    new = contacts.iloc[:50].copy()
+    new.index = range(500, 550)
+    new['id'] += 500
+    return pd.concat([df, new])
+
+
+def test_hash_rows_ignores_representation(contacts):
+    assert np.array_equal(hash_rows(contacts), hash_rows(contacts.astype({'name': 'category', 'age': 'Int32'})))
+    assert not np.array_equal(hash_rows(contacts), hash_rows(edited(contacts).iloc[:500]))
+
+
+def test_hash_rows_is_stable_across_compaction(contacts):
+    contacts['id'] -= 250 # Negative values hash differently in narrow integer types
+    contacts['score'] = contacts['id'] / 4
+    contacts['state'] = pd.Series(['NY', 'CA'] * 250, dtype=object)
+    before = hash_rows(contacts)
+    compact_dataframe(contacts)
+    assert (str(contacts['id'].dtype), str(contacts['score'].dtype)) == ('Int16', 'float32')
+    assert np.array_equal(hash_rows(contacts), before)
+
+
+def test_filter_splits_new_changed_and_unchanged(contacts):
+    index = RowHashIndex('index.npz', ['id'])
+    index.update(hash_rows(contacts[['id']]), hash_rows(contacts))
+    split = DeltaFilter(index, COLUMNS, ['id'])
+
+    new, changed = split.split(edited(contacts))
+    assert list(new.index) == list(range(500, 550))
+    assert list(changed.index) == list(range(0, 500, 5))
+    assert split.unchanged == 400
+
+
+def test_filter_without_keys_treats_edits_as_new_rows(contacts):
+    index = RowHashIndex('index.npz')
+    index.update(hash_rows(contacts), hash_rows(contacts))
+    split = DeltaFilter(index, COLUMNS)
+
+    new, changed = split.split(edited(contacts))
+    assert (len(new), len(changed), split.unchanged) == (150, 0, 400)
+
+
+def test_filter_drops_repeated_keys(contacts):
+    split = DeltaFilter(RowHashIndex('index.npz', ['id']), COLUMNS, ['id'])
+    new, _ = split.split(contacts.iloc[:100])
+    again, _ = split.split(contacts.iloc[50:150])
+    assert (len(new), len(again), split.duplicates) == (100, 50, 50)
+
+
+def test_repeated_keys_are_rejected(cnxn, backend, contacts):
+    repeated = contacts.iloc[[3, 4]].copy()
+    repeated.index = [500, 501]
+    with RejectFile('rejects/contacts.rejects.csv') as rejects:
+        result = delta_upload(cnxn, chunked(pd.concat([contacts, repeated])), 'contacts', COLUMNS,
+                              key_columns=['id'], backend=backend, rejects=rejects)
+    assert (result.rows, result.failed, sorted(result.rejected)) == (500, 2, [500, 501])
+    with open('rejects/contacts.rejects.csv', encoding='utf-8') as f:
+        assert f.read().count(DUPLICATE_KEY_ERROR) == 2
+
+
+def test_keyed_delta_upload_inserts_merges_and_skips(cnxn, backend, contacts):
+    first = delta_upload(cnxn, chunked(contacts), 'contacts', COLUMNS, key_columns=['id'], backend=backend)
+    assert (first.rows, first.skipped) == (500, 0)
+
+    second = delta_upload(cnxn, chunked(edited(contacts)), 'contacts', COLUMNS, key_columns=['id'],
+                          backend=backend, batch_size=30)
+    assert (second.rows, second.skipped, second.failed) == (150, 400, 0)
+    assert cnxn.execute("SELECT COUNT(*), SUM(name = 'renamed') FROM contacts").fetchone() == (550, 100)
+
+    third = delta_upload(cnxn, chunked(edited(contacts)), 'contacts', COLUMNS, key_columns=['id'], backend=backend)
+    assert (third.rows, third.skipped) == (0, 550)
+
+
+def test_changed_rows_are_staged_as_they_arrive(cnxn, backend, contacts, monkeypatch):
+    delta_upload(cnxn, chunked(contacts), 'contacts', COLUMNS, key_columns=['id'], backend=backend)
+    staged = []
+    add = delta.StagingTable.add
+    monkeypatch.setattr(delta.StagingTable, 'add', lambda self, df: staged.append(len(df)) or add(self, df))
+
+    delta_upload(cnxn, chunked(edited(contacts), 60), 'contacts', COLUMNS, key_columns=['id'], backend=backend,
+                 batch_size=20)
+    assert sum(staged) == 100
+    assert len(staged) > 1 and max(staged) < 20 + 60 # Never more than a batch plus one chunk held
+
+
+def test_keyless_delta_upload_skips_loaded_rows(cnxn, backend, contacts):
+    delta_upload(cnxn, chunked(contacts.iloc[:300]), 'contacts', COLUMNS, backend=backend)
+    result = delta_upload(cnxn, chunked(contacts), 'contacts', COLUMNS, backend=backend)
+    assert (result.rows, result.skipped) == (200, 300)
+    assert cnxn.execute('SELECT COUNT(*) FROM contacts').fetchone() == (500,)
+
+
+def test_rejected_rows_are_not_indexed_when_the_load_fails(cnxn, backend, contacts):
+    contacts['name'] = contacts['name'].astype(object)
+    contacts.loc[7, 'name'] = None
+
+    def failing():
+        yield contacts.iloc[:200]
+        raise ConnectionError('connection lost')
+
+    with pytest.raises(ConnectionError):
+        delta_upload(cnxn, failing(), 'contacts', COLUMNS, backend=backend, batch_size=50)
+    result = delta_upload(cnxn, chunked(contacts), 'contacts', COLUMNS, backend=backend, batch_size=50)
+
+    # Row 7 is tried again (and rejected again); the 199 committed rows are not sent twice
+    assert (result.rows, result.skipped, result.rejected) == (300, 199, [7])
+    assert cnxn.execute('SELECT COUNT(*) FROM contacts').fetchone() == (499,)
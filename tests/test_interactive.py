@@ -0,0 +1,74 @@
+# tests/test_interactive.py
+#
+"""Interactive loader: optional features off by default, upload outcomes and checkpoints when pooled."""
+import os
+
+import pandas as pd
+import pytest
+
+from output2sql import interactive
+from output2sql.checkpoint import Checkpoint
+
+
+@pytest.fixture
+def pooled(monkeypatch, backend):
+    """Two upload workers against the SQLite backend; the first connection attempt fails."""
+    calls = []
+    connect = backend.connect
+
+    def failing_connect():
+        calls.append(None)
+        if len(calls) == 1:
+            raise ConnectionError('login failed')
+        return connect()
+
+    backend.connect = failing_connect
+    monkeypatch.setattr(interactive, 'UPLOAD_WORKERS', 2)
+    monkeypatch.setattr(interactive, 'get_upload_backend', lambda: backend)
+    return backend
+
+
+def write_csv(path, rows=500):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('id,name,age\n')
+        for i in range(rows):
+            f.write(f"{i},name{i},{20 + i % 50}\n")
+
+
+def test_failed_worker_leaves_checkpoint_incomplete(cnxn, contacts, pooled):
+    write_csv('contacts.csv')
+    checkpoint = Checkpoint.load('contacts.csv', 'contacts')
+    assert interactive.upload_dataframe_to_sql(contacts, 'contacts', checkpoint) == 0
+    assert not Checkpoint.load('contacts.csv', 'contacts').complete
+
+
+def test_failed_worker_fails_a_streamed_upload(cnxn, pooled, monkeypatch):
+    monkeypatch.setattr(interactive, 'STREAM_CHUNK_SIZE', 50)
+    write_csv('contacts.csv')
+    schema = {'id': int, 'name': str, 'age': int}
+    checkpoint = Checkpoint.load('contacts.csv', 'contacts')
+    assert interactive.stream_file_to_sql('contacts.csv', schema, 'contacts', checkpoint) == 0
+    assert not Checkpoint.load('contacts.csv', 'contacts').complete
+
+
+def test_pooled_upload_without_errors_completes(cnxn, contacts, backend, monkeypatch):
+    monkeypatch.setattr(interactive, 'UPLOAD_WORKERS', 2)
+    monkeypatch.setattr(interactive, 'get_upload_backend', lambda: backend)
+    write_csv('contacts.csv')
+    checkpoint = Checkpoint.load('contacts.csv', 'contacts')
+    assert interactive.upload_dataframe_to_sql(contacts, 'contacts', checkpoint) == 500
+    assert Checkpoint.load('contacts.csv', 'contacts').complete
+
+
+def test_optional_features_are_off_by_default(monkeypatch):
+    """A plain read parses here, keeps the parsed types and leaves no cached copy behind."""
+    monkeypatch.setattr(interactive, '_parse_cache', None)
+    write_csv('contacts.csv')
+    assert (interactive.ADAPTIVE_BATCHING, interactive.PARSE_PROCESSES, interactive.CACHE_PARSED_DATA,
+            interactive.COMPACT_DATAFRAMES) == (False, 1, False, False)
+    assert interactive.get_batch_sizer() is None
+    df = interactive.read_data_to_dataframe('contacts.csv', {'id': int, 'name': str, 'age': int})
+    assert len(df) == 500 and not isinstance(df['name'].dtype, pd.CategoricalDtype)
+    assert str(df['age'].dtype) == 'Int64' # Not downcast
+    cache_dir = os.path.join('.output2sql', 'cache')
+    assert not any(name.startswith('data-') for _, _, names in os.walk(cache_dir) for name in names)
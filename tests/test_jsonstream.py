@@ -0,0 +1,70 @@
+# tests/test_jsonstream.py
+#
+"""Incremental JSON reader: layout detection, records across block boundaries, and byte offsets."""
+import json
+
+import pytest
+
+from output2sql import jsonstream
+from output2sql.jsonstream import (ARRAY, CONCATENATED, NDJSON, detect_json_layout, iter_json_batches,
+                                   iter_json_records)
+
+RECORDS = [{'id': i, 'name': f"näme {i} ✓", 'tags': ['a', {'nested': i}]} for i in range(300)]
+
+
+def write_layout(path, layout, newline='\n'):
+    if layout == ARRAY:
+        text = '[' + f',{newline}'.join(json.dumps(r, ensure_ascii=False) for r in RECORDS) + f']{newline}'
+    elif layout == NDJSON:
+        text = ''.join(json.dumps(r, ensure_ascii=False) + newline for r in RECORDS)
+    else:
+        text = newline.join(json.dumps(r, ensure_ascii=False, indent=2).replace('\n', newline) for r in RECORDS)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(jsonstream, 'READ_BLOCK_SIZE', 256) # Most records straddle a block boundary
+
+
+@pytest.mark.parametrize('layout', [ARRAY, NDJSON, CONCATENATED])
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_every_layout_reads_every_record(layout, newline):
+    write_layout('data.json', layout, newline)
+    assert detect_json_layout('data.json') == layout
+    assert list(iter_json_records('data.json')) == RECORDS
+
+
+@pytest.mark.parametrize('layout', [ARRAY, NDJSON, CONCATENATED])
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_offsets_count_bytes_on_disk_and_resume(layout, newline):
+    write_layout('data.json', layout, newline)
+    with open('data.json', 'rb') as f:
+        content = f.read()
+    pairs = list(iter_json_records('data.json', with_offsets=True))
+    assert [record for record, _ in pairs] == RECORDS
+    for record, offset in pairs[::37]:
+        assert content[:offset].rstrip().endswith(b'}')
+        assert list(iter_json_records('data.json', start_offset=offset)) == RECORDS[record['id'] + 1:]
+
+
+def test_batches():
+    write_layout('data.json', NDJSON)
+    batches = list(iter_json_batches('data.json', 128))
+    assert [len(batch) for batch in batches] == [128, 128, 44]
+
+
+def test_unsupported_structure():
+    with open('data.json', 'w', encoding='utf-8') as f:
+        f.write('"just a string"')
+    with pytest.raises(ValueError, match='Unsupported JSON structure'):
+        detect_json_layout('data.json')
+
+
+def test_truncated_file_raises():
+    write_layout('data.json', NDJSON)
+    with open('data.json', 'rb+') as f:
+        f.truncate(f.seek(0, 2) - 10)
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_records('data.json'))
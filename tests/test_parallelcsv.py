@@ -0,0 +1,62 @@
+# tests/test_parallelcsv.py
+#
+"""Parallel CSV parsing: byte ranges cut on record boundaries, even with newlines inside quoted fields."""
+import csv
+
+import pandas as pd
+import pytest
+
+from output2sql.parallelcsv import iter_parallel_csv_chunks, split_csv_ranges
+from output2sql.readers import iter_file_chunks, read_csv_header
+from output2sql.schema import profile_file
+
+SCHEMA = {'id': int, 'note': str, 'score': float}
+
+
+@pytest.fixture(autouse=True)
+def csv_file():
+    """Long quoted notes full of newlines, commas and doubled quotes, so range cuts land inside them."""
+    with open('data.csv', 'w', encoding='utf-8', newline='') as f:
+        f.write('id,note,score\n')
+        for i in range(2000):
+            note = f'"line {i}\n' + 'more, text\n' * (i % 5) + f'say ""{i}""\n"' if i % 3 else f"plain{i}"
+            f.write(f"{i},{note},{i / 8}\n")
+
+
+def test_ranges_end_on_record_boundaries():
+    _, data_offset = read_csv_header('data.csv')
+    ranges = split_csv_ranges('data.csv', data_offset, 500)
+    with open('data.csv', 'rb') as f:
+        content = f.read()
+    assert len(ranges) > 10
+    assert ranges[0][0] == data_offset and ranges[-1][1] == len(content)
+    for (start, end), following in zip(ranges, ranges[1:] + [(len(content), None)]):
+        assert end == following[0]
+        part = content[start:end]
+        assert part.count(b'"') % 2 == 0
+        assert next(csv.reader([part.decode('utf-8').split('\n', 1)[0]]))[0].isdigit()
+
+
+def test_parallel_chunks_match_a_plain_read():
+    parallel = pd.concat(iter_parallel_csv_chunks('data.csv', SCHEMA, chunk_size=150, processes=2))
+    plain = pd.concat(iter_file_chunks('data.csv', SCHEMA, chunk_size=150))
+    pd.testing.assert_frame_equal(parallel, plain)
+    assert parallel.loc[4, 'note'] == 'line 4\nmore, text\nmore, text\nmore, text\nmore, text\nsay "4"\n'
+
+
+def test_resume_from_a_parallel_chunk():
+    chunks = list(iter_parallel_csv_chunks('data.csv', SCHEMA, chunk_size=150, processes=2))
+    fourth = chunks[3]
+    resumed = list(iter_parallel_csv_chunks('data.csv', SCHEMA, chunk_size=150, processes=2,
+                                            start_offset=fourth.attrs['source_offset'],
+                                            start_row=fourth.attrs['source_first_row'], skip_rows=7))
+    assert resumed[0].index[0] == fourth.index[0] + 7
+    assert [int(v) for chunk in resumed for v in chunk['id']] == list(range(fourth.index[0] + 7, 2000))
+
+
+def test_parallel_profile_matches_a_single_pass():
+    parallel = profile_file('data.csv', chunk_size=150, processes=2) # Through profile_csv_parallel
+    single = profile_file('data.csv', chunk_size=150)
+    assert parallel['id'].count == 2000
+    assert {col: p.sql_definition() for col, p in parallel.items()} == \
+        {col: p.sql_definition() for col, p in single.items()}
@@ -0,0 +1,69 @@
+# tests/test_pipeline.py
+#
+"""Pipelined reading: the same chunks as a plain read, errors raised to the consumer, threads stopped."""
+import threading
+
+import pandas as pd
+import pytest
+
+from output2sql import pipeline
+from output2sql.pipeline import StageTimes, iter_pipelined_chunks
+from output2sql.readers import iter_file_chunks
+
+SCHEMA = {'id': int, 'name': str, 'age': int}
+
+
+@pytest.fixture(autouse=True)
+def csv_file():
+    with open('data.csv', 'w', encoding='utf-8', newline='') as f:
+        f.write('id,name,age\n')
+        for i in range(1000):
+            f.write(f"{i},name{i},{20 + i % 50}\n")
+
+
+def pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith('pipeline-')]
+
+
+@pytest.mark.parametrize('queue_size', [1, 4])
+def test_same_chunks_as_a_plain_read(queue_size):
+    times = StageTimes()
+    piped = list(iter_pipelined_chunks('data.csv', SCHEMA, chunk_size=100, queue_size=queue_size, times=times))
+    plain = list(iter_file_chunks('data.csv', SCHEMA, chunk_size=100))
+    assert len(piped) == len(plain) == times.chunks
+    for a, b in zip(piped, plain):
+        pd.testing.assert_frame_equal(a, b)
+    assert not pipeline_threads()
+
+
+def test_read_error_reaches_the_consumer(monkeypatch):
+    def failing_reader(*args, **kwargs):
+        yield from list(iter_file_chunks(*args, **kwargs))[:2]
+        raise OSError('disk gone')
+
+    monkeypatch.setattr(pipeline, 'iter_file_chunks', failing_reader)
+    received = []
+    with pytest.raises(OSError, match='disk gone'):
+        for chunk in iter_pipelined_chunks('data.csv', SCHEMA, chunk_size=100):
+            received.append(chunk)
+    assert len(received) <= 2 # Chunks still queued when the reader fails are dropped, never committed
+    assert not pipeline_threads()
+
+
+def test_coerce_error_reaches_the_consumer(monkeypatch):
+    def failing_coerce(df, schema, source=None):
+        if df.index[0] >= 300:
+            raise ValueError('bad value')
+        return df
+
+    monkeypatch.setattr(pipeline, 'coerce_dataframe', failing_coerce)
+    with pytest.raises(ValueError, match='bad value'):
+        list(iter_pipelined_chunks('data.csv', SCHEMA, chunk_size=100))
+    assert not pipeline_threads()
+
+
+def test_closing_early_stops_the_threads():
+    chunks = iter_pipelined_chunks('data.csv', SCHEMA, chunk_size=10, queue_size=1)
+    next(chunks)
+    chunks.close()
+    assert not pipeline_threads()
@@ -0,0 +1,68 @@
+# tests/test_pool.py
+#
+"""Parallel upload over a connection pool: totals across workers and per-worker errors."""
+import pytest
+
+from output2sql.pool import ConnectionPool, parallel_upload, split_dataframe
+from output2sql.rejects import RejectFile
+
+COLUMNS = ['id', 'name', 'age']
+
+
+def test_split_dataframe_covers_every_row_once(contacts):
+    parts = list(split_dataframe(contacts, 3))
+    assert [len(part) for part in parts] == [167, 167, 166]
+    assert [label for part in parts for label in part.index] == list(range(500))
+
+
+@pytest.mark.parametrize('workers', [1, 2, 4])
+def test_parallel_upload_totals(cnxn, backend, contacts, workers):
+    result = parallel_upload(backend.connect, split_dataframe(contacts, 2 * workers), 'contacts', COLUMNS,
+                             workers=workers, batch_size=40, backend=backend)
+    assert (result.rows, result.failed, result.errors) == (500, 0, [])
+    assert cnxn.execute('SELECT COUNT(*), COUNT(DISTINCT id) FROM contacts').fetchone() == (500, 500)
+
+
+def test_parallel_upload_reports_the_failing_worker(cnxn, backend, contacts):
+    calls = []
+
+    def connect():
+        calls.append(None)
+        if len(calls) == 1:
+            raise ConnectionError('login failed')
+        return backend.connect()
+
+    result = parallel_upload(connect, split_dataframe(contacts, 5), 'contacts', COLUMNS, workers=2,
+                             batch_size=40, backend=backend)
+    assert len(result.errors) == 1 and 'login failed' in result.errors[0]
+    assert result.failed == 100 # The whole slice that could not get a connection
+    assert result.rows == 400
+    assert cnxn.execute('SELECT COUNT(*) FROM contacts').fetchone() == (400,)
+
+
+def test_parallel_upload_systemic_error_fails_each_slice(backend, contacts):
+    result = parallel_upload(backend.connect, split_dataframe(contacts, 4), 'missing', COLUMNS, workers=2,
+                             batch_size=40, backend=backend)
+    assert (result.rows, result.failed, len(result.errors)) == (0, 500, 4)
+    assert all('no such table' in error for error in result.errors)
+
+
+def test_parallel_upload_shares_the_reject_file(cnxn, backend, contacts):
+    contacts['name'] = contacts['name'].astype(object)
+    contacts.loc[[10, 260, 490], 'name'] = None
+    with RejectFile('rejects/contacts.rejects.ndjson') as rejects:
+        result = parallel_upload(backend.connect, split_dataframe(contacts, 4), 'contacts', COLUMNS, workers=4,
+                                 batch_size=40, backend=backend, rejects=rejects)
+    assert sorted(result.rejected) == [10, 260, 490]
+    assert rejects.count == 3
+    assert cnxn.execute('SELECT COUNT(*) FROM contacts').fetchone() == (497,)
+
+
+def test_connection_pool_reuses_connections(backend):
+    opened = []
+    pool = ConnectionPool(lambda: opened.append(backend.connect()) or opened[-1], size=2)
+    for _ in range(5):
+        with pool.connection():
+            pass
+    assert len(opened) == 1
+    pool.close_all()
@@ -0,0 +1,75 @@
+# tests/test_readers.py
+#
+"""Streaming readers: chunking, row numbering, coercion and record boundaries."""
+from datetime import datetime
+
+import pandas as pd
+
+from output2sql.readers import coerce_dataframe, iter_csv_blocks, iter_file_chunks, read_csv_header, read_file
+
+
+def write_csv(path, rows=1000):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('id,name,score,joined,active\n')
+        for i in range(rows):
+            name = f'"line one\nline two, ""{i}"""' if i % 7 == 0 else f"name{i}" # Quoted newlines and quotes
+            f.write(f"{i},{name},{i / 4},2024-01-{i % 28 + 1:02d},{'yes' if i % 2 else 'no'}\n")
+
+
+SCHEMA = {'id': int, 'name': str, 'score': float, 'joined': datetime, 'active': bool}
+
+
+def test_csv_chunks_are_bounded_and_numbered_continuously():
+    write_csv('data.csv')
+    chunks = list(iter_file_chunks('data.csv', SCHEMA, chunk_size=100))
+    assert len(chunks) > 5
+    assert max(len(chunk) for chunk in chunks) < 300 # About chunk_size records each
+    assert [label for chunk in chunks for label in chunk.index] == list(range(1000))
+    assert [int(v) for chunk in chunks for v in chunk['id']] == list(range(1000))
+
+
+def test_csv_chunks_match_a_whole_file_read():
+    write_csv('data.csv')
+    streamed = read_file('data.csv', SCHEMA, chunk_size=64)
+    whole = coerce_dataframe(pd.read_csv('data.csv', dtype=str), SCHEMA)
+    pd.testing.assert_frame_equal(streamed, whole, check_index_type=False)
+    assert streamed.loc[7, 'name'] == 'line one\nline two, "7"'
+
+
+def test_coercion_types_and_missing_values():
+    df = pd.DataFrame({'id': ['1', 'x', None], 'score': ['1.5', '', '2'], 'joined': ['2024-01-02', 'never', None],
+                       'active': ['Yes', 'n', 'maybe']})
+    coerce_dataframe(df, SCHEMA)
+    assert str(df['id'].dtype) == 'Int64' and df['id'].isna().tolist() == [False, True, True]
+    assert df['score'].isna().tolist() == [False, True, False]
+    assert df['joined'].isna().tolist() == [False, True, True]
+    assert df['active'].tolist()[:2] == [True, False] and pd.isna(df['active'][2])
+
+
+def test_blocks_end_on_record_boundaries():
+    write_csv('data.csv')
+    _, data_offset = read_csv_header('data.csv')
+    blocks = list(iter_csv_blocks('data.csv', data_offset, 200))
+    with open('data.csv', 'rb') as f:
+        content = f.read()
+    assert b''.join(data for _, data in blocks) == content[data_offset:]
+    for offset, data in blocks:
+        assert content[offset:offset + len(data)] == data
+        assert data.count(b'"') % 2 == 0 and data.endswith(b'\n')
+
+
+def test_header_with_byte_order_mark():
+    with open('bom.csv', 'wb') as f:
+        f.write('\ufeffid,name\n1,a\n'.encode('utf-8'))
+    columns, offset = read_csv_header('bom.csv')
+    assert (columns, offset) == (['id', 'name'], len('\ufeffid,name\n'.encode('utf-8')))
+
+
+def test_resume_from_chunk_offset_skips_committed_rows():
+    write_csv('data.csv')
+    chunks = list(iter_file_chunks('data.csv', SCHEMA, chunk_size=100))
+    third = chunks[2]
+    resumed = list(iter_file_chunks('data.csv', SCHEMA, chunk_size=100, start_offset=third.attrs['source_offset'],
+                                    start_row=third.attrs['source_first_row'], skip_rows=5))
+    assert resumed[0].index[0] == third.index[0] + 5
+    assert sum(len(chunk) for chunk in resumed) == 1000 - third.index[0] - 5
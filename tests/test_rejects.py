@@ -0,0 +1,72 @@
+# tests/test_rejects.py
+#
+"""Reject files: CSV and NDJSON contents, appending on resume, and telling them apart from data files."""
+import csv
+import json
+import os
+
+import pytest
+
+from output2sql.rejects import RejectFile, is_reject_file, reject_path_for
+from output2sql.upload import upload_in_batches
+
+
+def bad_contacts(contacts, rows):
+    contacts['name'] = contacts['name'].astype(object)
+    contacts.loc[rows, 'name'] = None # NOT NULL violations
+    return contacts
+
+
+def read_csv_rejects(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_clean_load_leaves_no_file(cnxn, backend, contacts):
+    with RejectFile('rejects/contacts.rejects.csv') as rejects:
+        upload_in_batches(cnxn, contacts, 'contacts', batch_size=100, backend=backend, rejects=rejects)
+    assert rejects.count == 0 and not os.path.exists('rejects')
+
+
+def test_csv_rejects_hold_the_record_row_and_error(cnxn, backend, contacts):
+    bad_contacts(contacts, [5, 321])
+    with RejectFile('rejects/contacts.rejects.csv') as rejects:
+        upload_in_batches(cnxn, contacts, 'contacts', batch_size=100, backend=backend, rejects=rejects)
+
+    header, *rows = read_csv_rejects('rejects/contacts.rejects.csv')
+    assert header == ['source_row', 'reject_error', 'id', 'name', 'age']
+    assert [row[0] for row in rows] == ['5', '321']
+    assert rows[0][2:] == ['5', '', '25']
+    assert all('NOT NULL' in row[1] for row in rows)
+
+
+def test_ndjson_rejects(cnxn, backend, contacts):
+    bad_contacts(contacts, [40])
+    with RejectFile('rejects/contacts.rejects.ndjson') as rejects:
+        upload_in_batches(cnxn, contacts, 'contacts', batch_size=100, backend=backend, rejects=rejects)
+
+    with open('rejects/contacts.rejects.ndjson', encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 1
+    assert (lines[0]['source_row'], lines[0]['record']) == (40, {'id': 40, 'name': None, 'age': None})
+    assert 'NOT NULL' in lines[0]['reject_error']
+
+
+def test_resumed_load_appends_without_a_second_header(cnxn, backend, contacts):
+    bad_contacts(contacts, [10, 410])
+    for part in (contacts.iloc[:200], contacts.iloc[200:]):
+        with RejectFile('rejects/contacts.rejects.csv') as rejects:
+            upload_in_batches(cnxn, part, 'contacts', batch_size=50, backend=backend, rejects=rejects)
+
+    header, *rows = read_csv_rejects('rejects/contacts.rejects.csv')
+    assert header[0] == 'source_row'
+    assert [row[0] for row in rows] == ['10', '410']
+
+
+def test_reject_paths():
+    path = reject_path_for(os.path.join('in', 'contacts2.csv'), 'contacts', 'rejects', 'ndjson')
+    assert path == os.path.join('rejects', 'contacts__contacts2.csv.rejects.ndjson')
+    assert is_reject_file(path) and is_reject_file('contacts__contacts2.csv.REJECTS.csv')
+    assert not is_reject_file('contacts2.csv') and not is_reject_file('rejects.csv')
+    with pytest.raises(ValueError):
+        RejectFile('rejects/contacts.rejects.txt')
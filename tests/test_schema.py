@@ -0,0 +1,88 @@
+# tests/test_schema.py
+#
+"""Schema inference: right-sized SQL Server column types, nullability and profiling statistics."""
+import gzip
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from output2sql.metrics import get_metrics, start_run
+from output2sql.schema import ColumnProfile, profile_dataframe, profile_file
+
+
+def profile(values, complete=True):
+    column = ColumnProfile('column')
+    column.update(pd.Series(values, dtype=object))
+    column.complete = complete
+    return column
+
+
+@pytest.mark.parametrize('values, sql_type, py_type', [
+    (['0', '255'], 'TINYINT', int),
+    (['-1', '255'], 'SMALLINT', int),
+    (['40000'], 'INT', int),
+    (['-3000000000'], 'BIGINT', int),
+    (['99999999999999999999'], 'DECIMAL(20, 0)', str), # Beyond BIGINT
+    (['01234', '90210'], 'VARCHAR(5)', str), # Zip codes keep their leading zero
+    (['1.5', '-12.25'], 'DECIMAL(4, 2)', float),
+    (['1e10'], 'FLOAT', float),
+    (['yes', 'No'], 'BIT', bool),
+    (['2024-01-02', '3/4/2024'], 'DATE', datetime),
+    (['2024-01-02 10:11:12'], 'DATETIME', datetime),
+    (['abc', 'abcdef'], 'VARCHAR(6)', str),
+    (['näme'], 'NVARCHAR(4)', str),
+    (['x' * 9000], 'VARCHAR(MAX)', str),
+    (['ü' * 5000], 'NVARCHAR(MAX)', str),
+    ([None, ' '], 'NVARCHAR(255)', str), # Nothing to go on
+])
+def test_column_types_are_sized_to_the_values(values, sql_type, py_type):
+    column = profile(values)
+    assert (column.sql_type, column.py_type) == (sql_type, py_type)
+
+
+def test_nullability():
+    assert profile(['1', '2']).sql_definition() == 'TINYINT NOT NULL'
+    assert profile(['1', '']).sql_definition() == 'TINYINT NULL'
+    assert profile(['1', '2'], complete=False).sql_definition() == 'TINYINT NULL' # A sample proves nothing
+
+
+def test_merged_profiles_match_a_single_pass():
+    values = [str(i) for i in range(-50, 300)] + ['', None]
+    whole = profile(values)
+    merged = profile(values[:100]).merge(profile(values[100:]))
+    assert (merged.sql_definition(), merged.count, merged.nulls) == (whole.sql_definition(), 352, 2)
+
+
+def test_profile_dataframe_counts_missing_columns():
+    profiles = profile_dataframe(pd.DataFrame({'a': ['1'] * 3}))
+    profile_dataframe(pd.DataFrame({'a': ['2'] * 2, 'b': ['x'] * 2}), profiles, rows_seen=3)
+    assert (profiles['b'].count, profiles['b'].nulls) == (5, 3)
+
+
+def write_csv(path, rows=2000):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('id,price,note\n')
+        for i in range(rows):
+            f.write(f"{i},{i / 4:.2f},{'' if i % 3 else 'some text'}\n")
+
+
+@pytest.mark.parametrize('sample_rows', [None, 500])
+def test_profile_file_sizes_a_file_or_a_sample(sample_rows):
+    write_csv('data.csv')
+    profiles = profile_file('data.csv', sample_rows=sample_rows, chunk_size=300)
+    assert [p.sql_definition() for p in profiles.values()] == (
+        ['SMALLINT NOT NULL', 'DECIMAL(5, 2) NOT NULL', 'VARCHAR(9) NULL'] if sample_rows is None else
+        ['SMALLINT NULL', 'DECIMAL(5, 2) NULL', 'VARCHAR(9) NULL'])
+    assert profiles['id'].count == (sample_rows or 2000)
+
+
+def test_profile_counts_the_decompressed_bytes_read():
+    write_csv('data.csv')
+    with open('data.csv', 'rb') as f, gzip.open('data.csv.gz', 'wb') as out:
+        content = f.read()
+        out.write(content)
+    for path in ('data.csv', 'data.csv.gz'):
+        start_run('test')
+        profile_file(path, chunk_size=300)
+        assert get_metrics().stages['profile'].bytes == len(content)
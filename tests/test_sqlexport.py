@@ -0,0 +1,89 @@
+# tests/test_sqlexport.py
+#
+"""SQL script export: literals that survive sqlcmd and sqlite3, statement size limits and split parts."""
+import glob
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from output2sql.backends import Backend, SQLiteBackend
+from output2sql.metrics import start_run
+from output2sql.sqlexport import (MAX_PARAMETERS_PER_INSERT, MAX_ROWS_PER_INSERT, column_literals, export_chunks,
+                                  export_dataframe, insert_statements, rows_per_statement)
+
+TRICKY = ["O'Brien", 'costs $(price)', 'two\nlines', 'crlf\r\nend', 'GO', None]
+
+
+def test_sqlcmd_literals_keep_quotes_variables_and_line_breaks_out_of_the_text():
+    literals = list(column_literals(pd.Series(TRICKY, dtype=object), Backend()))
+    assert literals == ["N'O''Brien'", "N'costs $' + N'(price)'", "N'two' + NCHAR(10) + N'lines'",
+                        "N'crlf' + NCHAR(13) + N'' + NCHAR(10) + N'end'", "N'GO'", 'NULL']
+    assert not any('\n' in literal or '$(' in literal for literal in literals)
+
+
+def test_other_literals():
+    df = pd.DataFrame({'flag': pd.array([True, False, None], dtype='boolean'),
+                       'n': pd.array([1, None, -3], dtype='Int64'),
+                       'x': [1.5, np.inf, np.nan],
+                       'when': pd.to_datetime(['2024-01-02 03:04:05.678', None, '2024-12-31'], format='ISO8601'),
+                       'kind': pd.Categorical(['a', None, 'a'])})
+    literals = {col: list(column_literals(df[col], Backend())) for col in df}
+    assert literals == {'flag': ['1', '0', 'NULL'], 'n': ['1', 'NULL', '-3'], 'x': ['1.5', 'NULL', 'NULL'],
+                        'when': ["N'2024-01-02T03:04:05.678'", 'NULL', "N'2024-12-31T00:00:00.000'"],
+                        'kind': ["N'a'", 'NULL', "N'a'"]}
+
+
+@pytest.mark.parametrize('columns, rows', [(1, MAX_ROWS_PER_INSERT), (2, MAX_ROWS_PER_INSERT), (3, 700),
+                                           (7, 300), (2100, 1), (5000, 1)])
+def test_statements_stay_within_the_row_and_parameter_limits(columns, rows):
+    assert rows_per_statement(columns) == rows
+    assert rows * columns <= MAX_PARAMETERS_PER_INSERT or rows == 1
+
+
+def test_insert_statements_split_at_the_row_limit():
+    df = pd.DataFrame({'a': range(2500), 'b': ['x'] * 2500})
+    statements = list(insert_statements(df, 'contacts', ['a', 'b'], rows=rows_per_statement(2)))
+    assert [s.count('\n') - 1 for s in statements] == [1000, 1000, 500]
+    assert statements[0].startswith('INSERT INTO contacts ([a], [b]) VALUES\n(0, N\'x\'),\n')
+
+
+def test_sqlite_script_round_trips_the_text():
+    df = pd.DataFrame({'id': range(len(TRICKY)), 'name': TRICKY})
+    backend = SQLiteBackend()
+    header = backend.create_table_sql('contacts', [('id', 'INTEGER'), ('name', 'TEXT')])
+    metrics = start_run('export')
+    result = export_dataframe(df, 'contacts.sql', 'contacts', backend=backend, header=header, chunk_size=4)
+    assert (result.rows, result.statements, result.paths) == (6, 2, ['contacts.sql'])
+    assert metrics.stages['export_write'].calls == 1 # The last, partial transaction is timed too
+    with open('contacts.sql', encoding='utf-8', newline='') as f, sqlite3.connect(':memory:') as cnxn:
+        cnxn.executescript(f.read())
+        assert [row[0] for row in cnxn.execute('SELECT name FROM contacts ORDER BY id')] == TRICKY
+
+
+def test_split_parts_each_hold_whole_transactions():
+    df = pd.DataFrame({'id': range(5000), 'name': [f"name{i}" for i in range(5000)]})
+    backend = SQLiteBackend()
+    header = backend.create_table_sql('contacts', [('id', 'INTEGER'), ('name', 'TEXT')])
+    result = export_dataframe(df, 'out/contacts.sql', 'contacts', backend=backend, header=header, max_rows=100,
+                              transaction_statements=5, split_bytes=20_000)
+    assert len(result.paths) > 2 and result.paths[0] == 'out/contacts.001.sql'
+    assert sorted(glob.glob('out/*')) == result.paths # No temporary files left behind
+    with sqlite3.connect(':memory:') as cnxn:
+        for path in result.paths:
+            with open(path, encoding='utf-8') as f:
+                script = f.read()
+            assert script.count('BEGIN;') == script.count('COMMIT;')
+            cnxn.executescript(script)
+        assert cnxn.execute('SELECT COUNT(*), SUM(id) FROM contacts').fetchone() == (5000, sum(range(5000)))
+
+
+def test_failed_export_leaves_no_script():
+    def chunks():
+        yield pd.DataFrame({'id': [1]})
+        raise ValueError('reader failed')
+
+    with pytest.raises(ValueError):
+        export_chunks(chunks(), 'contacts.sql', 'contacts', ['id'])
+    assert glob.glob('contacts*') == []
@@ -0,0 +1,118 @@
+# tests/test_upload.py
+#
+"""Batched upload engine: row counts, NULL handling and error isolation."""
+import csv
+import math
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from output2sql.backends import SQLiteBackend
+from output2sql.rejects import RejectFile
+from output2sql.upload import UploadResult, is_data_error, is_systemic_error, upload_chunks, upload_in_batches
+
+COLUMNS = ['id', 'name', 'age']
+
+
+class CountingBackend(SQLiteBackend):
+    """SQLite backend that counts bulk calls and can fail every one of them with a given error."""
+
+    def __init__(self, path, error=None):
+        super().__init__(path)
+        self.error = error
+        self.calls = 0
+
+    def write_batch(self, cursor, statement, rows):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        super().write_batch(cursor, statement, rows)
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 100, 500, 1000])
+def test_upload_in_batches_row_counts(cnxn, backend, contacts, batch_size):
+    commits = []
+    result = upload_in_batches(cnxn, contacts, 'contacts', batch_size=batch_size, backend=backend,
+                               on_commit=lambda df, next_row: commits.append(next_row))
+
+    assert (result.rows, result.failed, result.rejected) == (500, 0, [])
+    assert cnxn.execute('SELECT COUNT(*), COUNT(age) FROM contacts').fetchone() == (500, 450)
+    assert len(commits) == math.ceil(500 / batch_size)
+    assert commits[-1] == 500
+
+
+def test_upload_in_batches_converts_missing_values_to_null(cnxn, backend):
+    df = pd.DataFrame({'id': [1, 2, 3], 'name': ['a', 'b', 'c'], 'age': [1.5, float('nan'), None]})
+    upload_in_batches(cnxn, df, 'contacts', backend=backend)
+    assert cnxn.execute('SELECT id, age FROM contacts ORDER BY id').fetchall() == [(1, 1.5), (2, None), (3, None)]
+
+
+def test_upload_chunks_streams_every_chunk(cnxn, backend, contacts):
+    chunks = (contacts.iloc[start:start + 120] for start in range(0, len(contacts), 120))
+    result = upload_chunks(cnxn, chunks, 'contacts', COLUMNS, batch_size=50, backend=backend)
+    assert (result.rows, result.failed) == (500, 0)
+    assert cnxn.execute('SELECT COUNT(*) FROM contacts').fetchone() == (500,)
+
+
+def test_bisection_rejects_only_the_bad_rows(cnxn, backend, contacts):
+    contacts['name'] = contacts['name'].astype(object)
+    contacts.loc[[3, 250, 499], 'name'] = None # NOT NULL violations
+    contacts.loc[100, 'id'] = 99 # Duplicate primary key
+    with RejectFile('rejects/contacts.rejects.csv') as rejects:
+        result = upload_in_batches(cnxn, contacts, 'contacts', batch_size=128, backend=backend, rejects=rejects)
+
+    assert sorted(result.rejected) == [3, 100, 250, 499]
+    assert (result.rows, result.failed) == (496, 4)
+    assert cnxn.execute('SELECT COUNT(*) FROM contacts').fetchone() == (496,)
+    with open('rejects/contacts.rejects.csv', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(int(row['source_row']) for row in rows) == [3, 100, 250, 499]
+    assert all(row['reject_error'] for row in rows)
+
+
+def test_bisection_takes_a_few_round_trips_per_bad_row(cnxn, backend, contacts):
+    counting = CountingBackend(backend.path)
+    contacts['name'] = contacts['name'].astype(object)
+    contacts.loc[300, 'name'] = None
+    result = upload_in_batches(cnxn, contacts, 'contacts', batch_size=500, backend=counting)
+    assert result.rejected == [300]
+    assert counting.calls <= 1 + 2 * math.ceil(math.log2(500))
+
+
+def test_missing_table_is_raised_not_bisected(backend, contacts):
+    counting = CountingBackend(backend.path)
+    cnxn = counting.connect()
+    with pytest.raises(sqlite3.OperationalError, match='no such table'):
+        upload_in_batches(cnxn, contacts, 'missing', batch_size=100, backend=counting)
+    assert counting.calls == 1
+
+
+def test_unclassified_error_repeated_by_first_half_is_raised(cnxn, backend, contacts):
+    failing = CountingBackend(backend.path, error=RuntimeError('server went away'))
+    with pytest.raises(RuntimeError, match='server went away'):
+        upload_in_batches(cnxn, contacts, 'contacts', batch_size=100, backend=failing)
+    assert failing.calls == 2 # The batch, then its first half
+
+
+def test_error_classification():
+    assert is_data_error(sqlite3.IntegrityError('NOT NULL constraint failed'))
+    assert is_data_error(OverflowError('Python int too large to convert to SQLite INTEGER'))
+    assert is_systemic_error(sqlite3.OperationalError('no such table: missing'))
+    assert is_systemic_error(ConnectionResetError())
+    assert not is_systemic_error(sqlite3.DataError('bad value'))
+    assert not is_data_error(RuntimeError()) and not is_systemic_error(RuntimeError())
+
+
+def test_upload_chunks_result_survives_a_failure(cnxn, backend, contacts):
+    contacts['name'] = contacts['name'].astype(object)
+    contacts.loc[7, 'name'] = None
+
+    def chunks():
+        yield contacts.iloc[:200]
+        raise OSError('connection lost')
+
+    result = UploadResult()
+    with pytest.raises(OSError):
+        upload_chunks(cnxn, chunks(), 'contacts', COLUMNS, batch_size=50, backend=backend, result=result)
+    assert (result.rows, result.rejected) == (199, [7])
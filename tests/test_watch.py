@@ -0,0 +1,73 @@
+# tests/test_watch.py
+#
+"""Watch mode: when a file counts as written, the load ledger, and loading each file's contents once."""
+import os
+import shutil
+import sqlite3
+
+from output2sql.backends import SQLiteBackend
+from output2sql.batch import BatchLoader
+from output2sql.watch import LoadLedger, StabilityTracker, WatchDaemon, scan_directories
+
+
+def write_csv(path, rows=200):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('id,name\n')
+        for i in range(rows):
+            f.write(f"{i},name{i}\n")
+
+
+def test_file_settles_after_two_equal_scans_and_the_settle_time():
+    tracker = StabilityTracker(settle_seconds=30)
+    entry = ('a.csv', 100, 1_000 * 10**9) # Modified at t=1000s
+    assert tracker.update([entry], now=1_040) == [] # First sighting
+    assert tracker.update([('a.csv', 200, 1_035 * 10**9)], now=1_045) == [] # Still growing
+    assert tracker.update([('a.csv', 200, 1_035 * 10**9)], now=1_050) == [] # Unchanged, but only 15s old
+    assert tracker.update([('a.csv', 200, 1_035 * 10**9)], now=1_070) == [('a.csv', 200, 1_035 * 10**9)]
+    assert tracker.waiting == 0
+    tracker.update([entry], now=1_080)
+    assert tracker.update([], now=1_090) == [] and tracker.waiting == 0 # Vanished files are forgotten
+
+
+def test_ledger_survives_a_restart_and_a_torn_line():
+    ledger = LoadLedger('watch/loaded.jsonl')
+    ledger.add('abc', 'contacts', 'in/a.csv', 100, 5, rows=10)
+    with open('watch/loaded.jsonl', 'a', encoding='utf-8') as f:
+        f.write('{"hash": "def", "tab') # Cut short by a crash
+
+    reopened = LoadLedger('watch/loaded.jsonl')
+    assert len(reopened) == 1 and ('abc', 'contacts') in reopened and ('abc', 'other') not in reopened
+    assert reopened.has_file('in/a.csv', 100, 5) and not reopened.has_file('in/a.csv', 100, 6)
+
+
+def test_scan_skips_hidden_excluded_and_output_files():
+    write_csv('landing/a.csv')
+    write_csv('landing/deep/b.csv.gz')
+    for name in ('landing/.hidden.csv', 'landing/.output2sql/x.csv', 'landing/rejects/r.csv',
+                 'landing/a.csv.rejects.csv', 'landing/run.metrics.json', 'landing/notes.txt'):
+        write_csv(name)
+    found = sorted(path for path, _, _ in scan_directories(['landing'], exclude=['landing/rejects']))
+    assert found == [os.path.join('landing', 'a.csv'), os.path.join('landing', 'deep', 'b.csv.gz')]
+
+
+def run_daemon(directory='landing'):
+    loader = BatchLoader(SQLiteBackend('target.db'), create_table=True, parse_workers=1, db_writers=2,
+                         resume=True, table_map=[('*', 'contacts')])
+    daemon = WatchDaemon(loader, [directory], interval=0.05, settle_seconds=0)
+    daemon.run(once=True)
+    return daemon.totals
+
+
+def test_daemon_loads_each_content_once():
+    write_csv('landing/a.csv')
+    write_csv('landing/b.csv', rows=50)
+    write_csv('landing/copy/a.csv') # Same contents as landing/a.csv
+    totals = run_daemon()
+    assert (totals['loaded'], totals['skipped'], totals['failed'], totals['rows']) == (2, 1, 0, 250)
+
+    shutil.move('landing/b.csv', 'landing/b_renamed.csv')
+    totals = run_daemon() # A restart: the ledger remembers what was loaded
+    assert (totals['loaded'], totals['skipped']) == (0, 3)
+    with sqlite3.connect('target.db') as cnxn:
+        assert cnxn.execute('SELECT COUNT(*) FROM contacts').fetchone() == (250,)